@@ -1,10 +1,54 @@
-from flask import Flask, jsonify, request
-from datetime import datetime
+from flask import Flask, Response, jsonify, request
+from datetime import datetime, timezone
+import csv
+import gzip
+import json
+import math
+import os
+import platform
+import sys
+import threading
+import time
+
+from columnar import MappedCatalog, is_columnar
+from search import SearchIndex
+from snapshot import Snapshotter
+from speedups import check_speedups
+from storage import RevisionMismatch
+from store import BookStore
+from wal import WriteAheadLog
 
 app = Flask(__name__)
 
-# In-memory data storage
-books = [
+# Set to True to reject PUT/DELETE requests that do not send If-Match
+app.config.setdefault("REQUIRE_IF_MATCH", False)
+
+# Opt-in gzip compression of large JSON responses
+app.config.setdefault("COMPRESS_RESPONSES", os.environ.get("COMPRESS_RESPONSES", "").lower() in ("1", "true", "yes"))
+app.config.setdefault("COMPRESS_MIN_SIZE", 1024)
+app.config.setdefault("COMPRESS_LEVEL", 6)
+
+# Storage backend: "memory" keeps the catalog in process memory, "sqlite"
+# in the database file at SQLITE_PATH, "dynamodb" in the DynamoDB table
+# DYNAMODB_TABLE (DYNAMODB_ENDPOINT overrides the regional endpoint)
+app.config.setdefault("STORAGE_BACKEND", os.environ.get("STORAGE_BACKEND", "memory"))
+app.config.setdefault("SQLITE_PATH", os.environ.get("SQLITE_PATH", "catalog.db"))
+app.config.setdefault("DYNAMODB_TABLE", os.environ.get("DYNAMODB_TABLE", "library-books"))
+app.config.setdefault("DYNAMODB_ENDPOINT", os.environ.get("DYNAMODB_ENDPOINT"))
+app.config.setdefault("DYNAMODB_REGION", os.environ.get("AWS_REGION", "us-east-1"))
+
+# Durable in-memory catalog: set WAL_PATH to log every mutation and replay it on startup
+app.config.setdefault("WAL_PATH", os.environ.get("WAL_PATH"))
+app.config.setdefault("WAL_FLUSH_INTERVAL", float(os.environ.get("WAL_FLUSH_INTERVAL", "0.01")))
+
+# With a WAL, also set SNAPSHOT_PATH to snapshot the catalog in the background
+# and truncate the log; startup then loads the snapshot plus the log tail
+app.config.setdefault("SNAPSHOT_PATH", os.environ.get("SNAPSHOT_PATH"))
+app.config.setdefault("SNAPSHOT_INTERVAL", float(os.environ.get("SNAPSHOT_INTERVAL", "300")))
+app.config.setdefault("SNAPSHOT_MIN_RECORDS", int(os.environ.get("SNAPSHOT_MIN_RECORDS", "1000")))
+
+# Catalog every new store starts with
+SEED_BOOKS = [
     {
         "id": 1,
         "title": "To Kill a Mockingbird",
@@ -28,12 +72,115 @@ books = [
     }
 ]
 
-# Counter for auto-generating IDs
-next_id = 4
+def create_store():
+    """Open the storage backend selected by STORAGE_BACKEND"""
+    backend = app.config["STORAGE_BACKEND"]
+    if backend == "sqlite":
+        from sqlite_store import SqliteStore
+        sqlite_store = SqliteStore(app.config["SQLITE_PATH"])
+        if sqlite_store.created:
+            sqlite_store.load(SEED_BOOKS)
+        return sqlite_store
+    if backend == "dynamodb":
+        from dynamo_store import DynamoClient, DynamoStore
+        client = DynamoClient(app.config["DYNAMODB_ENDPOINT"], app.config["DYNAMODB_REGION"])
+        dynamo_store = DynamoStore(client, app.config["DYNAMODB_TABLE"])
+        if dynamo_store.ensure_catalog():
+            dynamo_store.load(SEED_BOOKS)
+        return dynamo_store
+    if backend != "memory":
+        raise ValueError(f"Unknown STORAGE_BACKEND {backend!r}")
+
+    # Full-text index over titles and authors, kept current by the store
+    memory_store = BookStore(SEED_BOOKS)
+    memory_store.add_index(SearchIndex())
+    return memory_store
+
+store = create_store()
+
+# Load the latest snapshot (if any) in place of the seed data, replay the
+# logged mutations made since, then log every new one
+mutation_log = None
+snapshotter = None
+if app.config["WAL_PATH"] and app.config["STORAGE_BACKEND"] == "memory":
+    mutation_log = WriteAheadLog(app.config["WAL_PATH"], app.config["WAL_FLUSH_INTERVAL"])
+    if app.config["SNAPSHOT_PATH"]:
+        snapshotter = Snapshotter(
+            store, mutation_log, app.config["SNAPSHOT_PATH"],
+            app.config["SNAPSHOT_INTERVAL"], app.config["SNAPSHOT_MIN_RECORDS"],
+        )
+        snapshotter.load()
+    mutation_log.replay(store)
+    store.attach_journal(mutation_log)
+    if snapshotter is not None:
+        snapshotter.start()
+
+# Page sizes for GET /api/books
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+# Skipping costs one step per book, so deeper pages must use `cursor`
+MAX_OFFSET = 10000
+
+# Largest number of operations accepted by POST /api/books:batch
+MAX_BATCH_SIZE = 10000
+
+# Streaming import tuning for POST /api/books/import
+IMPORT_CHUNK_SIZE = 64 * 1024
+IMPORT_BATCH_SIZE = 1000
+MAX_IMPORT_ERRORS = 100
+
+# Columnar snapshot mapped by load_catalog_snapshot(). Until a request needs
+# more than a lookup by ID it is served straight from the file, so a cold
+# container answers GET /api/books/<id> without loading the whole catalog.
+mapped_catalog = None
+mapped_catalog_lock = threading.Lock()
+
+# Endpoints that can be answered while the catalog is still only mapped
+MAPPED_ENDPOINTS = {"welcome", "health_check", "runtime_check", "get_book_by_id"}
 
 def find_book_by_id(book_id):
     """Helper function to find a book by ID"""
-    return next((book for book in books if book["id"] == book_id), None)
+    catalog = mapped_catalog
+    if catalog is not None:
+        return catalog.get(book_id)
+    return store.get(book_id)
+
+def find_book_revision(book_id):
+    """Helper function to get the (revision, modified time) of a book"""
+    catalog = mapped_catalog
+    if catalog is not None:
+        return 1, catalog.modified
+    return store.revision(book_id)
+
+def load_catalog_snapshot(path):
+    """Replace the catalog with the books in a snapshot file
+
+    NDJSON exports are loaded into the store right away; columnar snapshots
+    are only mapped until materialize_catalog() is needed. Only the memory
+    backend takes snapshots: the others persist the catalog themselves, so
+    loading one would discard every write made since it was taken.
+    """
+    global mapped_catalog
+    backend = app.config["STORAGE_BACKEND"]
+    if backend != "memory":
+        raise ValueError(f"Catalog snapshots cannot be loaded into the {backend} backend")
+    if is_columnar(path):
+        with mapped_catalog_lock:
+            mapped_catalog = MappedCatalog(path)
+        return len(mapped_catalog)
+    with open(path, "rb") as f:
+        store.load(json.loads(line) for line in f if line.strip())
+    return len(store)
+
+def materialize_catalog():
+    """Load a mapped columnar snapshot into the store, if one is pending"""
+    global mapped_catalog
+    with mapped_catalog_lock:
+        if mapped_catalog is None:
+            return
+        store.load(mapped_catalog)
+        mapped_catalog = None
 
 def validate_book_data(data, is_update=False):
     """Helper function to validate book data"""
@@ -57,6 +204,237 @@ def validate_book_data(data, is_update=False):
     
     return errors
 
+def book_fields(data, is_update=False):
+    """Helper function to pick the stored book fields out of validated data"""
+    fields = {}
+    for field in ("title", "author", "genre", "year"):
+        if field in data or not is_update:
+            fields[field] = int(data[field]) if field == "year" else data[field]
+    return fields
+
+def parse_batch_operations():
+    """Helper function to read batch operations from a JSON or NDJSON body"""
+    if request.mimetype in ("application/x-ndjson", "application/jsonl"):
+        lines = request.get_data().splitlines()
+        return [json.loads(line) for line in lines if line.strip()]
+
+    data = request.get_json(silent=True)
+    if isinstance(data, dict):
+        data = data.get("operations")
+    if not isinstance(data, list):
+        raise ValueError("Request must contain a JSON list of operations")
+    return data
+
+def prepare_batch_operation(operation, deleted):
+    """Helper function to validate one batch operation without applying it
+
+    Returns the (op, book id, fields) to apply and a list of errors.
+    `deleted` tracks IDs removed earlier in the same batch.
+    """
+    if not isinstance(operation, dict):
+        return None, ["Operation must be a JSON object"]
+
+    op = operation.get("op")
+    if op not in ("create", "update", "delete"):
+        return None, ["'op' must be one of create, update, delete"]
+
+    book_id = None
+    if op != "create":
+        book_id = operation.get("id")
+        current = store.revision(book_id) if isinstance(book_id, int) else None
+        if current is None or book_id in deleted:
+            return None, [f"Book with ID {book_id} not found"]
+        # An optional "revision" makes the operation conditional, like If-Match
+        revision, _ = current
+        if operation.get("revision", revision) != revision:
+            return None, [f"Book with ID {book_id} has been modified (revision {revision})"]
+        if op == "delete":
+            deleted.add(book_id)
+            return (op, book_id, None), []
+
+    data = operation.get("book")
+    if not isinstance(data, dict) or not data:
+        return None, ["'book' must be a non-empty JSON object"]
+    errors = validate_book_data(data, is_update=(op == "update"))
+    if errors:
+        return None, errors
+    try:
+        fields = book_fields(data, is_update=(op == "update"))
+    except (ValueError, TypeError):
+        return None, ["'year' must be a valid integer"]
+    return (op, book_id, fields), []
+
+def apply_batch_operation(entry, key=None):
+    """Helper function to apply an operation from prepare_batch_operation
+
+    `key` makes a create idempotent (see Storage.add); a repeat is reported
+    with status 200 and no book.
+    """
+    op, book_id, fields = entry
+    if op == "create":
+        book = store.add(fields, key=key)
+        return {"op": op, "status": 200 if book is None else 201, "book": book}
+    if op == "update":
+        return {"op": op, "status": 200, "book": store.update(book_id, fields)}
+    store.delete(book_id)
+    return {"op": op, "status": 200, "id": book_id}
+
+def iter_stream_lines(stream, chunk_size):
+    """Helper function to yield decoded lines from a binary stream chunk by chunk"""
+    pending = b""
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        pending += chunk
+        lines = pending.split(b"\n")
+        pending = lines.pop()
+        for line in lines:
+            yield line.decode("utf-8", errors="replace") + "\n"
+    if pending:
+        yield pending.decode("utf-8", errors="replace")
+
+def iter_import_rows(lines, is_csv):
+    """Helper function to yield (row number, data) pairs from NDJSON or CSV lines
+
+    Rows that cannot be parsed are yielded with data set to None.
+    """
+    if is_csv:
+        reader = csv.DictReader(lines)
+        for row in reader:
+            yield reader.line_num, row
+        return
+
+    for row_number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            data = json.loads(line)
+        except ValueError:
+            data = None
+        yield row_number, data if isinstance(data, dict) else None
+
+def write_stamp(modified):
+    """Helper function to encode a modified time exactly for use in an ETag
+
+    Revisions and the catalog version start over whenever a catalog is
+    created or loaded, e.g. in every new container of the memory backend.
+    The time of the write they count up to does not, so adding it keeps an
+    ETag from one catalog from matching another's.
+    """
+    return format(int(modified * 1000000), "x")
+
+def book_etag(book_id, revision, modified):
+    """Helper function to build the strong ETag of a book revision"""
+    return f"book-{book_id}-{revision}-{write_stamp(modified)}"
+
+def books_etag(version, modified):
+    """Helper function to build the strong ETag of a catalog version"""
+    return f"books-{version}-{write_stamp(modified)}"
+
+def check_if_match(book_id):
+    """Helper function to evaluate an If-Match precondition on a book
+
+    Returns the revision the client's write is conditional on (None for an
+    unconditional write) and an error response when the precondition fails
+    or the book is gone.
+    """
+    if not request.if_match:
+        if app.config["REQUIRE_IF_MATCH"]:
+            return None, (jsonify({"error": "If-Match header is required"}), 428)
+        return None, None
+
+    current = store.revision(book_id)
+    if current is None:
+        # Deleted since the route looked it up
+        return None, (jsonify({"error": f"Book with ID {book_id} not found"}), 404)
+    revision, modified = current
+    # The weak form is this revision's ETag on a gzipped response, so it
+    # is accepted as well
+    if not request.if_match.contains_weak(book_etag(book_id, revision, modified)):
+        return None, precondition_failed(book_id, revision, modified)
+    return revision, None
+
+def precondition_failed(book_id, revision, modified):
+    """Helper function to build the 412 response for a stale If-Match"""
+    response = jsonify({
+        "error": f"Book with ID {book_id} has been modified",
+        "revision": revision
+    })
+    response.set_etag(book_etag(book_id, revision, modified))
+    return response, 412
+
+def conditional_response(etag, modified, build):
+    """Helper function to answer conditional GETs before serializing the body
+
+    `build` is only called when the client's cached copy is out of date.
+    """
+    # HTTP dates have whole seconds. Last-Modified is rounded up, so that
+    # If-Modified-Since can be compared against the exact time, but only
+    # once that second is over: until then a second write could still land
+    # in it and be hidden by the rounded value.
+    rounded = math.ceil(modified)
+    if rounded > time.time():
+        rounded = math.floor(modified)
+    last_modified = datetime.fromtimestamp(rounded, tz=timezone.utc)
+    if request.if_none_match:
+        # Weak comparison, so gzip-encoded (weak) ETags still match
+        not_modified = request.if_none_match.contains_weak(etag)
+    else:
+        since = request.if_modified_since
+        not_modified = since is not None and modified <= since.timestamp()
+
+    response = Response(status=304) if not_modified else build()
+    response.set_etag(etag)
+    response.last_modified = last_modified
+    # Let browsers cache but always revalidate, which is now a cheap 304
+    response.headers["Cache-Control"] = "no-cache"
+    return response
+
+def parse_page_args(args):
+    """Helper function to parse and validate pagination query parameters"""
+    errors = []
+    params = {"after": None, "offset": 0, "limit": DEFAULT_PAGE_SIZE}
+
+    for name, key, minimum in (("cursor", "after", 0), ("offset", "offset", 0), ("limit", "limit", 1)):
+        if name not in args:
+            continue
+        try:
+            value = int(args[name])
+        except ValueError:
+            errors.append(f"'{name}' must be a valid integer")
+            continue
+        if value < minimum:
+            errors.append(f"'{name}' must be at least {minimum}")
+            continue
+        params[key] = value
+
+    if params["offset"] > MAX_OFFSET:
+        errors.append(f"'offset' must be at most {MAX_OFFSET}; use 'cursor' to page further")
+
+    # Clamp rather than reject oversized pages so every call stays bounded
+    params["limit"] = min(params["limit"], MAX_PAGE_SIZE)
+    return params, errors
+
+def parse_filter_args(args):
+    """Helper function to parse and validate catalog filter query parameters"""
+    errors = []
+    filters = {}
+
+    for field in ("author", "genre"):
+        if args.get(field):
+            filters[field] = args[field]
+
+    for field in ("year_from", "year_to"):
+        if field not in args:
+            continue
+        try:
+            filters[field] = int(args[field])
+        except ValueError:
+            errors.append(f"'{field}' must be a valid integer")
+
+    return filters, errors
+
 @app.route('/', methods=['GET'])
 def welcome():
     """Welcome endpoint that provides basic information about the API"""
@@ -66,11 +444,16 @@ def welcome():
         "endpoints": {
             "GET /": "This welcome message",
             "GET /health": "Health check",
-            "GET /api/books": "Get all books",
+            "GET /health/runtime": "Python runtime and accelerated module report",
+            "GET /api/books": "Get books (paginated with limit, cursor and offset; filter by author, genre, year_from and year_to)",
+            "GET /api/books/search?q=": "Search titles and authors (append * for prefix matches)",
+            "GET /api/books/export": "Stream the whole catalog as NDJSON",
             "GET /api/books/<id>": "Get book by ID",
             "POST /api/books": "Create new book",
             "PUT /api/books/<id>": "Update book by ID",
             "DELETE /api/books/<id>": "Delete book by ID",
+            "POST /api/books:batch": "Apply create/update/delete operations atomically (JSON or NDJSON)",
+            "POST /api/books/import": "Stream-import books from NDJSON or CSV",
             "GET /api/info": "API information"
         }
     })
@@ -80,28 +463,88 @@ def health_check():
     """Health check endpoint"""
     return jsonify({"status": "OK"})
 
+@app.route('/health/runtime', methods=['GET'])
+def runtime_check():
+    """Report the Python runtime and which accelerated modules loaded"""
+    return jsonify({
+        "python": platform.python_version(),
+        "platform": sys.platform,
+        "machine": platform.machine(),
+        "accelerated_modules": check_speedups()
+    })
+
 @app.route('/api/books', methods=['GET'])
 def get_all_books():
-    """Get all the books from the library"""
+    """Get a page of books from the library"""
+    params, errors = parse_page_args(request.args)
+    filters, filter_errors = parse_filter_args(request.args)
+    errors.extend(filter_errors)
+    if errors:
+        return jsonify({"error": "Invalid query parameters", "details": errors}), 400
+
+    def build():
+        page, next_cursor = store.page(**params, **filters)
+        return jsonify({
+            "books": page,
+            "count": len(page),
+            "total": store.count(**filters),
+            "next_cursor": next_cursor
+        })
+
+    # One consistent view of the catalog; for DynamoDB also one read of its counters
+    with store.read_lock():
+        return conditional_response(books_etag(store.version, store.last_modified), store.last_modified, build)
+
+@app.route('/api/books/search', methods=['GET'])
+def search_books():
+    """Search book titles and authors, best match first"""
+    query = request.args.get("q", "").strip()
+    if not query:
+        return jsonify({"error": "'q' is required"}), 400
+
+    params, errors = parse_page_args(request.args)
+    if errors:
+        return jsonify({"error": "Invalid query parameters", "details": errors}), 400
+
+    results = []
+    for book, score in store.search(query, limit=params["limit"]):
+        results.append(dict(book, score=round(score, 4)))
     return jsonify({
-        "books": books,
-        "count": len(books)
+        "query": query,
+        "books": results,
+        "count": len(results)
     })
 
+@app.route('/api/books/export', methods=['GET'])
+def export_books():
+    """Stream the whole catalog as newline-delimited JSON"""
+    def generate():
+        # Encode one record at a time so memory stays flat for any catalog size
+        for book in store:
+            yield json.dumps(book, separators=(",", ":")) + "\n"
+
+    return Response(
+        generate(),
+        mimetype="application/x-ndjson",
+        headers={"Content-Disposition": "attachment; filename=books.ndjson"}
+    )
+
 @app.route('/api/books/<int:book_id>', methods=['GET'])
 def get_book_by_id(book_id):
     """Get a single book by ID"""
+    # Read the revision first: a write in between then leaves the ETag older
+    # than the body, so a later request fetches the book again
+    current = find_book_revision(book_id)
     book = find_book_by_id(book_id)
-    if book is None:
+    if book is None or current is None:
         return jsonify({"error": f"Book with ID {book_id} not found"}), 404
-    
-    return jsonify(book)
+
+    revision, modified = current
+    return conditional_response(book_etag(book_id, revision, modified), modified, lambda: jsonify(book))
 
 @app.route('/api/books', methods=['POST'])
 def create_book():
     """Create a new book"""
-    global next_id
-    
     if not request.json:
         return jsonify({"error": "Request must contain JSON data"}), 400
     
@@ -111,21 +554,16 @@ def create_book():
         return jsonify({"error": "Validation failed", "details": errors}), 400
     
     # Create new book
-    new_book = {
-        "id": next_id,
-        "title": request.json["title"],
-        "author": request.json["author"],
-        "genre": request.json["genre"],
-        "year": int(request.json["year"])
-    }
+    new_book = store.add(book_fields(request.json))
+    revision, modified = store.revision(new_book["id"])
     
-    books.append(new_book)
-    next_id += 1
-    
-    return jsonify({
+    response = jsonify({
         "message": "Book created successfully",
-        "book": new_book
-    }), 201
+        "book": new_book,
+        "revision": revision
+    })
+    response.set_etag(book_etag(new_book["id"], revision, modified))
+    return response, 201
 
 @app.route('/api/books/<int:book_id>', methods=['PUT'])
 def update_book(book_id):
@@ -136,6 +574,10 @@ def update_book(book_id):
     book = find_book_by_id(book_id)
     if book is None:
         return jsonify({"error": f"Book with ID {book_id} not found"}), 404
+
+    expected_revision, error = check_if_match(book_id)
+    if error:
+        return error
     
     # Validate input data
     errors = validate_book_data(request.json, is_update=True)
@@ -143,34 +585,136 @@ def update_book(book_id):
         return jsonify({"error": "Validation failed", "details": errors}), 400
     
     # Update book fields
-    if "title" in request.json:
-        book["title"] = request.json["title"]
-    if "author" in request.json:
-        book["author"] = request.json["author"]
-    if "genre" in request.json:
-        book["genre"] = request.json["genre"]
-    if "year" in request.json:
-        book["year"] = int(request.json["year"])
+    try:
+        book = store.update(book_id, book_fields(request.json, is_update=True), expected_revision)
+    except RevisionMismatch as e:
+        return precondition_failed(book_id, e.revision, e.modified)
+    current = store.revision(book_id)
+    if book is None or current is None:
+        # Deleted before or right after the update
+        return jsonify({"error": f"Book with ID {book_id} not found"}), 404
+    revision, modified = current
     
-    return jsonify({
+    response = jsonify({
         "message": "Book updated successfully",
-        "book": book
+        "book": book,
+        "revision": revision
     })
+    response.set_etag(book_etag(book_id, revision, modified))
+    return response
 
 @app.route('/api/books/<int:book_id>', methods=['DELETE'])
 def delete_book(book_id):
     """Delete a book by ID"""
-    book = find_book_by_id(book_id)
+    if find_book_by_id(book_id) is None:
+        return jsonify({"error": f"Book with ID {book_id} not found"}), 404
+
+    expected_revision, error = check_if_match(book_id)
+    if error:
+        return error
+
+    try:
+        book = store.delete(book_id, expected_revision)
+    except RevisionMismatch as e:
+        return precondition_failed(book_id, e.revision, e.modified)
     if book is None:
         return jsonify({"error": f"Book with ID {book_id} not found"}), 404
     
-    books.remove(book)
-    
     return jsonify({
         "message": f"Book with ID {book_id} deleted successfully",
         "deleted_book": book
     })
 
+@app.route('/api/books:batch', methods=['POST'])
+def batch_books():
+    """Apply many create, update and delete operations atomically"""
+    try:
+        operations = parse_batch_operations()
+    except ValueError as e:
+        return jsonify({"error": "Invalid batch body", "details": [str(e)]}), 400
+
+    if not operations:
+        return jsonify({"error": "Batch must contain at least one operation"}), 400
+    if len(operations) > MAX_BATCH_SIZE:
+        return jsonify({"error": f"Batch must contain at most {MAX_BATCH_SIZE} operations"}), 413
+
+    # Validate every operation before touching the store so the batch
+    # either applies in full or not at all; the write lock keeps other
+    # writers out between validation and apply
+    with store.write_lock():
+        prepared = []
+        failures = []
+        deleted = set()
+        for index, operation in enumerate(operations):
+            entry, errors = prepare_batch_operation(operation, deleted)
+            if errors:
+                failures.append({"index": index, "status": 400, "details": errors})
+            prepared.append(entry)
+
+        if failures:
+            return jsonify({
+                "error": "Validation failed, no operations were applied",
+                "results": failures
+            }), 400
+
+        results = [
+            {"index": index, **apply_batch_operation(entry)}
+            for index, entry in enumerate(prepared)
+        ]
+
+    return jsonify({
+        "message": f"Applied {len(results)} operations",
+        "results": results,
+        "count": len(results)
+    })
+
+@app.route('/api/books/import', methods=['POST'])
+def import_books():
+    """Import books from a streamed NDJSON or CSV upload"""
+    is_csv = request.mimetype == "text/csv"
+    lines = iter_stream_lines(request.stream, IMPORT_CHUNK_SIZE)
+
+    received = 0
+    imported = 0
+    rejected = 0
+    errors = []
+    pending = []
+
+    # Rows are read, validated and stored in fixed-size batches, so memory
+    # use is bounded by the batch size rather than the upload size
+    for row_number, data in iter_import_rows(lines, is_csv):
+        received += 1
+        if data is None:
+            row_errors = ["Row is not a valid record"]
+        else:
+            row_errors = validate_book_data(data)
+            if not row_errors:
+                try:
+                    pending.append(book_fields(data))
+                except (ValueError, TypeError):
+                    row_errors = ["'year' must be a valid integer"]
+
+        if row_errors:
+            rejected += 1
+            if len(errors) < MAX_IMPORT_ERRORS:
+                errors.append({"row": row_number, "details": row_errors})
+
+        if len(pending) >= IMPORT_BATCH_SIZE:
+            imported += len(store.add_many(pending))
+            pending = []
+
+    if pending:
+        imported += len(store.add_many(pending))
+
+    return jsonify({
+        "message": "Import finished",
+        "received": received,
+        "imported": imported,
+        "rejected": rejected,
+        "errors": errors,
+        "errors_truncated": rejected > len(errors)
+    })
+
 @app.route('/api/info', methods=['GET'])
 def get_api_info():
     """Get API metadata information"""
@@ -179,8 +723,8 @@ def get_api_info():
         "version": "1.0.0",
         "author": "Assistant",
         "description": "A Flask REST API for managing books with CRUD operations",
-        "total_books": len(books),
-        "endpoints_count": 8,
+        "total_books": len(store),
+        "endpoints_count": 13,
         "created": "2024"
     })
 
@@ -223,21 +767,27 @@ def ui():
             const bookForm = document.getElementById("bookForm");
 
             async function fetchBooks() {
-                const res = await fetch(API_BASE);
-                const data = await res.json();
                 bookList.innerHTML = "";
-                data.books.forEach(book => {
-                    const div = document.createElement("div");
-                    div.className = "border p-4 rounded bg-gray-50";
-                    div.innerHTML = `
-                        <h3 class="font-bold">${book.title}</h3>
-                        <p>Author: ${book.author}</p>
-                        <p>Genre: ${book.genre}</p>
-                        <p>Year: ${book.year}</p>
-                        <button onclick="deleteBook(${book.id})" class="mt-2 bg-red-500 text-white px-2 py-1 rounded">Delete</button>
-                    `;
-                    bookList.appendChild(div);
-                });
+                let cursor = null;
+                do {
+                    const res = await fetch(cursor === null ? API_BASE : `${API_BASE}?cursor=${cursor}`);
+                    const data = await res.json();
+                    data.books.forEach(renderBook);
+                    cursor = data.next_cursor;
+                } while (cursor !== null);
+            }
+
+            function renderBook(book) {
+                const div = document.createElement("div");
+                div.className = "border p-4 rounded bg-gray-50";
+                div.innerHTML = `
+                    <h3 class="font-bold">${book.title}</h3>
+                    <p>Author: ${book.author}</p>
+                    <p>Genre: ${book.genre}</p>
+                    <p>Year: ${book.year}</p>
+                    <button onclick="deleteBook(${book.id})" class="mt-2 bg-red-500 text-white px-2 py-1 rounded">Delete</button>
+                `;
+                bookList.appendChild(div);
             }
 
             async function deleteBook(id) {
@@ -273,6 +823,44 @@ def ui():
     </html>
     '''
 
+@app.before_request
+def load_mapped_catalog():
+    """Move a mapped snapshot into the store before requests that need it"""
+    if mapped_catalog is not None and request.endpoint not in MAPPED_ENDPOINTS:
+        materialize_catalog()
+
+@app.after_request
+def wait_for_durability(response):
+    """Hold write responses until the group commit covering them is fsynced"""
+    if mutation_log is not None and request.method in ("POST", "PUT", "DELETE"):
+        mutation_log.wait()
+    return response
+
+@app.after_request
+def compress_response(response):
+    """Gzip large JSON responses for clients that accept it"""
+    if not app.config["COMPRESS_RESPONSES"]:
+        return response
+    if (response.direct_passthrough or response.is_streamed or not response.is_json
+            or response.status_code in (204, 304) or "Content-Encoding" in response.headers):
+        return response
+
+    response.vary.add("Accept-Encoding")
+    if not request.accept_encodings["gzip"]:
+        return response
+    data = response.get_data()
+    if len(data) < app.config["COMPRESS_MIN_SIZE"]:
+        return response
+
+    response.set_data(gzip.compress(data, compresslevel=app.config["COMPRESS_LEVEL"]))
+    response.headers["Content-Encoding"] = "gzip"
+    # The encoded bytes differ from the identity representation, so a
+    # strong ETag is downgraded to weak as other servers do
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
 @app.errorhandler(404)
 def not_found(error):
     """Handle 404 errors"""
@@ -293,11 +881,16 @@ if __name__ == '__main__':
     print("Available endpoints:")
     print("- GET / (Welcome message)")
     print("- GET /health (Health check)")
+    print("- GET /health/runtime (Runtime self-check)")
     print("- GET /api/books (Get all books)")
+    print("- GET /api/books/search?q= (Search books)")
+    print("- GET /api/books/export (Export books as NDJSON)")
     print("- GET /api/books/<id> (Get book by ID)")
     print("- POST /api/books (Create new book)")
     print("- PUT /api/books/<id> (Update book)")
     print("- DELETE /api/books/<id> (Delete book)")
+    print("- POST /api/books:batch (Batch create/update/delete)")
+    print("- POST /api/books/import (Import NDJSON or CSV)")
     print("- GET /api/info (API information)")
     print("\nRunning on http://localhost:5000")
     app.run(debug=True, host='0.0.0.0', port=5000)
@@ -0,0 +1,101 @@
+"""Microbenchmark: API Gateway event -> WSGI environ translation cost.
+
+Run from the repository root:
+
+    python benchmarks/bench_environ.py
+"""
+import os
+import sys
+import timeit
+from io import BytesIO
+from urllib.parse import unquote_plus
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from wsgi_handler import build_environ
+
+HEADERS = {
+    "accept": "application/json",
+    "accept-encoding": "gzip, deflate, br",
+    "accept-language": "en-US,en;q=0.9",
+    "cache-control": "no-cache",
+    "content-type": "application/json",
+    "host": "abc123.execute-api.us-east-1.amazonaws.com",
+    "user-agent": "Mozilla/5.0 (X11; Linux x86_64)",
+    "x-amzn-trace-id": "Root=1-5e8f7f9a-1234567890abcdef",
+    "x-forwarded-for": "203.0.113.10",
+    "x-forwarded-port": "443",
+    "x-forwarded-proto": "https",
+}
+
+V1_EVENT = {
+    "resource": "/{proxy+}",
+    "path": "/api/books",
+    "httpMethod": "GET",
+    "headers": HEADERS,
+    "queryStringParameters": {"limit": "50", "author": "Jane Austen"},
+    "requestContext": {"stage": "prod", "requestId": "c6af9ac6-7b61-11e6-9a41-93e8deadbeef"},
+    "body": None,
+    "isBase64Encoded": False,
+}
+
+V2_EVENT = {
+    "version": "2.0",
+    "routeKey": "$default",
+    "rawPath": "/api/books",
+    "rawQueryString": "limit=50&author=Jane%20Austen",
+    "headers": HEADERS,
+    "queryStringParameters": {"limit": "50", "author": "Jane Austen"},
+    "requestContext": {"http": {"method": "GET", "path": "/api/books", "protocol": "HTTP/1.1"}},
+    "body": None,
+    "isBase64Encoded": False,
+}
+
+
+def legacy_environ(event):
+    """The per-request translation the handler used before the environ template"""
+    if 'requestContext' in event and 'http' in event['requestContext']:
+        path = event['rawPath'] if 'rawPath' in event else '/'
+        method = event['requestContext']['http']['method']
+    else:
+        path = event.get('path', '/')
+        method = event.get('httpMethod', 'GET')
+    headers = event.get('headers', {})
+    query_params = event.get('queryStringParameters') or {}
+    body = b''
+    environ = {
+        'REQUEST_METHOD': method,
+        'SCRIPT_NAME': '',
+        'PATH_INFO': unquote_plus(path),
+        'QUERY_STRING': '&'.join([f"{k}={v}" for k, v in query_params.items()]) if query_params else '',
+        'CONTENT_TYPE': headers.get('content-type', ''),
+        'CONTENT_LENGTH': str(len(body)),
+        'SERVER_NAME': headers.get('host', 'localhost').split(':')[0],
+        'SERVER_PORT': '443',
+        'SERVER_PROTOCOL': 'HTTP/1.1',
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': 'https',
+        'wsgi.input': BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': False,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+    }
+    for key, value in headers.items():
+        key = key.upper().replace('-', '_')
+        if key not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+            environ[f'HTTP_{key}'] = value
+    return environ
+
+
+def measure(func, event, number=100000):
+    """Return the best per-call time in microseconds over a few repeats"""
+    best = min(timeit.repeat(lambda: func(event), number=number, repeat=5))
+    return best / number * 1e6
+
+
+if __name__ == '__main__':
+    print(f"{'payload':<10}{'legacy (us)':>14}{'template (us)':>16}{'speedup':>10}")
+    for name, event in (("v1", V1_EVENT), ("v2", V2_EVENT)):
+        legacy = measure(legacy_environ, event)
+        current = measure(build_environ, event)
+        print(f"{name:<10}{legacy:>14.2f}{current:>16.2f}{legacy / current:>9.2f}x")
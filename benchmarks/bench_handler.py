@@ -0,0 +1,56 @@
+"""Benchmark wsgi_handler.handler in-process by replaying recorded traffic.
+
+Each line of the traffic file is an API Gateway v1/v2 event or a simple
+{"method", "path", "query", "headers", "body"} record. Reports cold-start
+phases (fresh interpreters), warm p50/p99 latency, allocations and RSS.
+
+    python benchmarks/bench_handler.py
+    python benchmarks/bench_handler.py recorded.jsonl --format v2 --iterations 5000
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import local_runtime
+from wsgi_handler import handler, init_container
+
+DEFAULT_TRAFFIC = os.path.join(os.path.dirname(__file__), 'traffic.jsonl')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('traffic', nargs='?', default=DEFAULT_TRAFFIC)
+    parser.add_argument('--format', choices=('v1', 'v2'), default='v1',
+                        help='payload format for simple records')
+    parser.add_argument('--iterations', type=int, default=2000)
+    parser.add_argument('--cold-starts', type=int, default=3)
+    args = parser.parse_args()
+
+    events = local_runtime.load_events(args.traffic, args.format)
+    print(f"Replaying {len(events)} events from {args.traffic} ({args.format})")
+
+    if args.cold_starts:
+        cold = local_runtime.measure_cold_start(events[0], args.cold_starts)
+        print("\nCold start (ms, median of fresh interpreters)")
+        for phase in ('import_seconds', 'init_seconds', 'first_invoke_seconds', 'total_seconds'):
+            value = local_runtime.percentile([run[phase] for run in cold], 0.5) * 1000
+            print(f"  {phase[:-len('_seconds')]:<14}{value:>10.2f}")
+
+    init_container()
+    latencies = local_runtime.measure_warm(handler, events, args.iterations)
+    print(f"\nWarm invocations (us, {args.iterations} runs)")
+    for label, fraction in (('p50', 0.5), ('p90', 0.9), ('p99', 0.99)):
+        print(f"  {label:<14}{local_runtime.percentile(latencies, fraction) * 1e6:>10.1f}")
+    print(f"  {'max':<14}{max(latencies) * 1e6:>10.1f}")
+
+    memory = local_runtime.measure_allocations(handler, events, min(args.iterations, 500))
+    print("\nMemory")
+    print(f"  peak traced per invocation   {memory['mean_peak_bytes'] / 1024:>10.1f} KiB")
+    print(f"  blocks retained/invocation   {memory['retained_blocks_per_invocation']:>10.2f}")
+    print(f"  RSS growth                   {memory['rss_growth_bytes'] / 1024:>10.0f} KiB")
+    print(f"  RSS now                      {local_runtime.current_rss() / 1024 / 1024:>10.1f} MiB")
+
+
+if __name__ == '__main__':
+    main()
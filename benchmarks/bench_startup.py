@@ -0,0 +1,138 @@
+"""Benchmark catalog startup: full WAL replay vs. snapshot plus log tail.
+
+Builds a synthetic catalog (1M books by default) in a temporary directory,
+then times restoring it from a log holding every mutation and from a
+snapshot followed by a short log tail, each into a fresh store with the
+same indexes the app uses.
+
+    python benchmarks/bench_startup.py
+    python benchmarks/bench_startup.py --books 200000 --tail 5000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from search import SearchIndex
+from snapshot import Snapshotter
+from store import BookStore
+from wal import WriteAheadLog
+
+WORDS = ("river", "night", "garden", "empire", "shadow", "winter", "letters", "stone",
+         "house", "glass", "storm", "silver", "island", "machine", "orchard", "voyage")
+AUTHORS = [f"Author {n}" for n in range(5000)]
+GENRES = ("Fiction", "Romance", "Mystery", "History", "Poetry", "Science", "Fantasy")
+
+
+def make_book(rng):
+    return {
+        "title": " ".join(rng.sample(WORDS, 3)) + f" {rng.randrange(100000)}",
+        "author": rng.choice(AUTHORS),
+        "genre": rng.choice(GENRES),
+        "year": rng.randrange(1700, 2025),
+    }
+
+
+def new_store():
+    store = BookStore()
+    store.add_index(SearchIndex())
+    return store
+
+
+def open_log(directory, name):
+    return WriteAheadLog(os.path.join(directory, name), flush_interval=0.05)
+
+
+def apply_tail(store, rng, count):
+    """Mix of updates, deletes and inserts, as after a snapshot"""
+    for _ in range(count):
+        roll = rng.random()
+        book_id = rng.randrange(1, store.next_id)
+        if roll < 0.6 and book_id in store:
+            store.update(book_id, {"title": make_book(rng)["title"]})
+        elif roll < 0.8 and book_id in store:
+            store.delete(book_id)
+        else:
+            store.add(make_book(rng))
+
+
+def build(directory, books, tail):
+    """Write catalog.wal (every mutation) and tail.snap + tail.wal"""
+    rng = random.Random(42)
+    full_log = open_log(directory, "catalog.wal")
+    tail_log = open_log(directory, "tail.wal")
+    full_log.replay(BookStore())
+    tail_log.replay(BookStore())
+
+    store = new_store()
+    store.attach_journal(full_log)
+    for _ in range(books):
+        store.add(make_book(rng))
+    full_log.wait()
+
+    snapshotter = Snapshotter(store, tail_log, os.path.join(directory, "tail.snap"))
+    started = time.perf_counter()
+    snapshotter.snapshot()
+    snapshot_seconds = time.perf_counter() - started
+
+    class Both:
+        def put(self, book, revision, modified):
+            full_log.put(book, revision, modified)
+            tail_log.put(book, revision, modified)
+
+        def delete(self, book_id):
+            full_log.delete(book_id)
+            tail_log.delete(book_id)
+
+    store.attach_journal(Both())
+    apply_tail(store, rng, tail)
+    full_log.close()
+    tail_log.close()
+    return store, snapshot_seconds
+
+
+def restore(directory, log_name, snapshot_name=None):
+    store = new_store()
+    log = open_log(directory, log_name)
+    started = time.perf_counter()
+    if snapshot_name is not None:
+        Snapshotter(store, log, os.path.join(directory, snapshot_name)).load()
+    log.replay(store)
+    seconds = time.perf_counter() - started
+    log.close()
+    return store, seconds
+
+
+def size_mb(directory, *names):
+    return sum(os.path.getsize(os.path.join(directory, name)) for name in names) / 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--books", type=int, default=1000000)
+    parser.add_argument("--tail", type=int, default=10000,
+                        help="mutations logged after the snapshot")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        print(f"Building {args.books} books plus {args.tail} tail mutations...")
+        expected, snapshot_seconds = build(directory, args.books, args.tail)
+        print(f"Snapshot written in {snapshot_seconds:.2f}s\n")
+
+        print(f"{'startup':<22}{'on disk (MB)':>14}{'seconds':>10}")
+        replayed, seconds = restore(directory, "catalog.wal")
+        print(f"{'full log replay':<22}{size_mb(directory, 'catalog.wal'):>14.1f}{seconds:>10.2f}")
+        restored, snap_seconds = restore(directory, "tail.wal", "tail.snap")
+        print(f"{'snapshot + log tail':<22}{size_mb(directory, 'tail.snap', 'tail.wal'):>14.1f}"
+              f"{snap_seconds:>10.2f}")
+        print(f"\nspeedup {seconds / snap_seconds:.1f}x")
+
+        assert len(replayed) == len(restored) == len(expected)
+        assert replayed.next_id == restored.next_id == expected.next_id
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Benchmark storage backends: per-operation latency percentiles.
+
+Loads the same synthetic catalog into each backend, then times the calls
+the API routes make: lookups, listing pages, filters, search and writes.
+
+    python benchmarks/bench_storage.py
+    python benchmarks/bench_storage.py --books 1000000 --iterations 5000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from bench_startup import make_book
+from local_runtime import percentile
+from search import SearchIndex
+from sqlite_store import SqliteStore
+from store import BookStore
+
+
+def open_backends(directory):
+    memory = BookStore()
+    memory.add_index(SearchIndex())
+    yield "memory", memory
+    yield "sqlite", SqliteStore(os.path.join(directory, "catalog.db"))
+
+
+def operations(store, rng, books):
+    """(name, callable) pairs mirroring what each route asks of the store"""
+    def get():
+        store.get(rng.randrange(1, books + 1))
+
+    def list_page():
+        store.page(after=rng.randrange(books), limit=100)
+
+    def filter_page():
+        store.page(author=f"Author {rng.randrange(5000)}", year_from=1900, limit=100)
+
+    def search():
+        store.search(rng.choice(("river", "night", "gard*", "empire stone")), limit=20)
+
+    def update():
+        store.update(rng.randrange(1, books + 1), {"year": rng.randrange(1700, 2025)})
+
+    def add():
+        store.add(make_book(rng))
+
+    return [("get", get), ("page", list_page), ("filter", filter_page),
+            ("search", search), ("update", update), ("add", add)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--books", type=int, default=100000)
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    catalog = [dict(make_book(rng), id=book_id) for book_id in range(1, args.books + 1)]
+
+    with tempfile.TemporaryDirectory() as directory:
+        print(f"{'backend':<10}{'operation':<10}{'p50 (ms)':>10}{'p99 (ms)':>10}")
+        for name, store in open_backends(directory):
+            store.load(catalog)
+            for operation, call in operations(store, random.Random(11), args.books):
+                samples = []
+                for _ in range(args.iterations):
+                    started = time.perf_counter()
+                    call()
+                    samples.append(time.perf_counter() - started)
+                p50 = percentile(samples, 0.5) * 1000
+                p99 = percentile(samples, 0.99) * 1000
+                print(f"{name:<10}{operation:<10}{p50:>10.3f}{p99:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+import mmap
+import os
+import struct
+from array import array
+from bisect import bisect_left
+
+from snapshot import SnapshotError, fsync_directory
+from wal import STRING_FIELDS
+
+# A columnar catalog is a header (magic, book count, next free ID) followed
+# by four sections, each padded to 8 bytes:
+#   ids      int64[count], ascending
+#   years    int32[count]
+#   offsets  uint64[3 * count + 1], where the strings of book i span
+#            heap[offsets[3i + f]:offsets[3i + f + 1]] for field f
+#   heap     the UTF-8 title, author and genre of every book, in order
+# Arrays are stored in native byte order, which is little-endian on every
+# platform Lambda runs on.
+MAGIC = b"BKCOL001"
+HEADER = struct.Struct("<8sqq")
+
+
+def padded(size):
+    return (size + 7) & ~7
+
+
+def is_columnar(path):
+    """Return whether `path` holds a columnar catalog"""
+    with open(path, "rb") as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+def write_columnar(path, books):
+    """Write books as a columnar catalog at `path`, replacing it atomically"""
+    books = sorted(books, key=lambda book: book["id"])
+    ids = array("q", (book["id"] for book in books))
+    years = array("i", (book["year"] for book in books))
+    offsets = array("Q", [0])
+    heap = bytearray()
+    for book in books:
+        for field in STRING_FIELDS:
+            heap += str(book[field]).encode("utf-8")
+            offsets.append(len(heap))
+    next_id = ids[-1] + 1 if ids else 1
+
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, len(ids), next_id))
+        for section in (ids.tobytes(), years.tobytes(), offsets.tobytes()):
+            f.write(section)
+            f.write(bytes(padded(len(section)) - len(section)))
+        f.write(heap)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    fsync_directory(path)
+    return len(ids)
+
+
+class MappedCatalog:
+    """Read-only catalog served straight from a memory-mapped columnar file
+
+    Opening only maps the file, so the cost does not grow with the catalog.
+    get() finds a book with a binary search over the ID column and decodes
+    just that book's strings; pages the OS never touches are never read.
+    """
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.modified = os.stat(path).st_mtime
+
+        if len(self._map) < HEADER.size:
+            raise SnapshotError(f"{path} is truncated")
+        magic, count, self.next_id = HEADER.unpack_from(self._map)
+        if magic != MAGIC:
+            raise SnapshotError(f"{path} is not a columnar catalog")
+
+        view = memoryview(self._map)
+        start = HEADER.size
+        sections = []
+        for typecode, length in (("q", count), ("i", count), ("Q", 3 * count + 1)):
+            size = length * array(typecode).itemsize
+            sections.append(view[start:start + size])
+            start += padded(size)
+        self._heap_start = start
+        if len(self._map) < start:
+            raise SnapshotError(f"{path} is truncated")
+        self._ids = sections[0].cast("q")
+        self._years = sections[1].cast("i")
+        self._offsets = sections[2].cast("Q")
+        if len(self._map) < start + self._offsets[-1]:
+            raise SnapshotError(f"{path} is truncated")
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __contains__(self, book_id):
+        return self._position(book_id) is not None
+
+    def __iter__(self):
+        """Iterate over book records in ID order"""
+        for position in range(len(self._ids)):
+            yield self._book(position)
+
+    def get(self, book_id):
+        """Return the book with the given ID, or None"""
+        position = self._position(book_id)
+        return None if position is None else self._book(position)
+
+    def _position(self, book_id):
+        ids = self._ids
+        position = bisect_left(ids, book_id)
+        if position < len(ids) and ids[position] == book_id:
+            return position
+        return None
+
+    def _book(self, position):
+        book = {"id": self._ids[position]}
+        data = self._map
+        base = self._heap_start
+        offsets = self._offsets
+        index = 3 * position
+        for field in STRING_FIELDS:
+            book[field] = data[base + offsets[index]:base + offsets[index + 1]].decode("utf-8")
+            index += 1
+        book["year"] = self._years[position]
+        return book
@@ -0,0 +1,286 @@
+import json
+import re
+import threading
+
+import requests
+from requests.adapters import BaseAdapter
+
+ERROR_PREFIX = "com.amazonaws.dynamodb.v20120810#"
+
+# Items returned per Scan page; DynamoDB pages by size (1 MB), this fake by
+# count so that pagination shows up with small tables
+SCAN_PAGE_SIZE = 100
+
+
+class FakeError(Exception):
+    def __init__(self, code, message):
+        super().__init__(message)
+        self.code = code
+
+
+def number(value):
+    return float(value["N"]) if "N" in value else value["S"]
+
+
+class FakeDynamoDB(BaseAdapter):
+    """In-process stand-in for the DynamoDB JSON API, for tests
+
+    Mount it on a requests session (or use session()) and point a
+    DynamoClient at any URL: requests are answered from in-memory tables,
+    so the real wire format, signing and retry paths are exercised. Only
+    the operations and expression forms DynamoStore uses are understood.
+
+    `requests` logs every (operation, payload) received. Set
+    `unprocessed_batches` to make the next batch calls process only half
+    their items, and `throttled_calls` to fail the next calls with
+    ProvisionedThroughputExceededException, as a throttled table would, or
+    `unavailable_calls` to answer them with a plain-text 503.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.tables = {}
+        self.requests = []
+        self.unprocessed_batches = 0
+        self.throttled_calls = 0
+        self.unavailable_calls = 0
+        self._lock = threading.Lock()
+
+    def session(self):
+        session = requests.Session()
+        session.mount("http://", self)
+        session.mount("https://", self)
+        return session
+
+    def send(self, request, **kwargs):
+        operation = request.headers["X-Amz-Target"].rpartition(".")[2]
+        payload = json.loads(request.body)
+        with self._lock:
+            self.requests.append((operation, payload))
+            if self.unavailable_calls:
+                self.unavailable_calls -= 1
+                response = requests.Response()
+                response.status_code = 503
+                response._content = b"Service Unavailable"
+                response.request = request
+                response.url = request.url
+                return response
+            try:
+                if "Authorization" not in request.headers:
+                    raise FakeError("MissingAuthenticationTokenException", "Request is missing a signature")
+                if self.throttled_calls:
+                    self.throttled_calls -= 1
+                    raise FakeError("ProvisionedThroughputExceededException", "Throughput exceeded")
+                handler = getattr(self, "_" + re.sub(r"(?<!^)([A-Z])", r"_\1", operation).lower(), None)
+                if handler is None:
+                    raise FakeError("UnknownOperationException", f"{operation} is not supported")
+                status, body = 200, handler(payload)
+            except FakeError as e:
+                status, body = 400, {"__type": ERROR_PREFIX + e.code, "message": str(e)}
+
+        response = requests.Response()
+        response.status_code = status
+        response._content = json.dumps(body).encode("utf-8")
+        response.headers["Content-Type"] = "application/x-amz-json-1.0"
+        response.request = request
+        response.url = request.url
+        return response
+
+    def close(self):
+        pass
+
+    # Tables and keys
+
+    def _create_table(self, payload):
+        name = payload["TableName"]
+        if name in self.tables:
+            raise FakeError("ResourceInUseException", f"Table already exists: {name}")
+        schema = {entry["KeyType"]: entry["AttributeName"] for entry in payload["KeySchema"]}
+        self.tables[name] = {"hash": schema["HASH"], "range": schema.get("RANGE"), "items": {}}
+        return {"TableDescription": {"TableName": name, "TableStatus": "ACTIVE"}}
+
+    def _table(self, name):
+        if name not in self.tables:
+            raise FakeError("ResourceNotFoundException", f"Requested resource not found: {name}")
+        return self.tables[name]
+
+    def _key(self, table, key):
+        names = [table["hash"]] + ([table["range"]] if table["range"] else [])
+        if sorted(key) != sorted(names):
+            raise FakeError("ValidationException", "The provided key element does not match the schema")
+        return tuple(json.dumps(key[name], sort_keys=True) for name in names)
+
+    def _sort_key(self, table, item):
+        return tuple(number(item[name]) for name in (table["hash"], table["range"]) if name)
+
+    # Expressions
+
+    def _check(self, item, expression, payload):
+        """Evaluate a condition or key condition: clauses joined by AND"""
+        names = payload.get("ExpressionAttributeNames", {})
+        values = payload.get("ExpressionAttributeValues", {})
+        item = item or {}
+        for clause in expression.split(" AND "):
+            clause = clause.strip()
+            match = re.fullmatch(r"attribute_(not_)?exists\((#?\w+)\)", clause)
+            if match:
+                if (names.get(match[2], match[2]) in item) == bool(match[1]):
+                    return False
+                continue
+            left, op, right = clause.split()
+            actual = item.get(names.get(left, left))
+            if actual is None:
+                return False
+            actual, expected = number(actual), number(values[right])
+            if not {
+                "=": actual == expected, "<>": actual != expected,
+                "<": actual < expected, "<=": actual <= expected,
+                ">": actual > expected, ">=": actual >= expected,
+            }[op]:
+                return False
+        return True
+
+    def _project(self, item, payload):
+        expression = payload.get("ProjectionExpression")
+        if not expression:
+            return item
+        names = payload.get("ExpressionAttributeNames", {})
+        wanted = [names.get(name.strip(), name.strip()) for name in expression.split(",")]
+        return {name: item[name] for name in wanted if name in item}
+
+    def _conditional(self, table, key, payload):
+        expression = payload.get("ConditionExpression")
+        if expression and not self._check(table["items"].get(key), expression, payload):
+            raise FakeError("ConditionalCheckFailedException", "The conditional request failed")
+
+    # Single items
+
+    def _get_item(self, payload):
+        table = self._table(payload["TableName"])
+        item = table["items"].get(self._key(table, payload["Key"]))
+        return {} if item is None else {"Item": self._project(item, payload)}
+
+    def _put_item(self, payload):
+        table = self._table(payload["TableName"])
+        item = payload["Item"]
+        key = self._key(table, {name: item[name] for name in (table["hash"], table["range"]) if name})
+        self._conditional(table, key, payload)
+        table["items"][key] = item
+        return {}
+
+    def _delete_item(self, payload):
+        table = self._table(payload["TableName"])
+        key = self._key(table, payload["Key"])
+        self._conditional(table, key, payload)
+        table["items"].pop(key, None)
+        return {}
+
+    def _update_item(self, payload):
+        table = self._table(payload["TableName"])
+        key = self._key(table, payload["Key"])
+        self._conditional(table, key, payload)
+        names = payload.get("ExpressionAttributeNames", {})
+        values = payload.get("ExpressionAttributeValues", {})
+        item = dict(table["items"].get(key) or payload["Key"])
+
+        updated = []
+        for action, clauses in re.findall(r"(SET|ADD)\s+(.*?)(?=\s+(?:SET|ADD)\s|$)", payload["UpdateExpression"]):
+            for clause in clauses.split(","):
+                if action == "SET":
+                    name, value = (part.strip() for part in clause.split("="))
+                    name = names.get(name, name)
+                    item[name] = values[value]
+                else:
+                    name, value = clause.split()
+                    name = names.get(name, name)
+                    total = float(item.get(name, {"N": "0"})["N"]) + float(values[value]["N"])
+                    item[name] = {"N": str(int(total)) if total.is_integer() else repr(total)}
+                updated.append(name)
+        table["items"][key] = item
+
+        returns = payload.get("ReturnValues", "NONE")
+        if returns == "ALL_NEW":
+            return {"Attributes": item}
+        if returns == "UPDATED_NEW":
+            return {"Attributes": {name: item[name] for name in updated}}
+        return {}
+
+    # Reads over many items
+
+    def _query(self, payload):
+        table = self._table(payload["TableName"])
+        items = sorted(
+            (item for item in table["items"].values()
+             if self._check(item, payload["KeyConditionExpression"], payload)),
+            key=lambda item: self._sort_key(table, item),
+        )
+        return self._paginate(table, items, payload, payload.get("Limit", len(items) or 1))
+
+    def _scan(self, payload):
+        table = self._table(payload["TableName"])
+        items = sorted(table["items"].values(), key=lambda item: self._sort_key(table, item))
+        return self._paginate(table, items, payload, min(payload.get("Limit", SCAN_PAGE_SIZE), SCAN_PAGE_SIZE))
+
+    def _paginate(self, table, items, payload, limit):
+        start_key = payload.get("ExclusiveStartKey")
+        if start_key:
+            start = self._sort_key(table, start_key)
+            items = [item for item in items if self._sort_key(table, item) > start]
+        page = items[:limit]
+        response = {"Items": [self._project(item, payload) for item in page], "Count": len(page)}
+        if len(items) > limit:
+            last = page[-1]
+            response["LastEvaluatedKey"] = {name: last[name] for name in (table["hash"], table["range"]) if name}
+        return response
+
+    # Batches
+
+    def _split(self, entries, limit, label):
+        if len(entries) > limit:
+            raise FakeError("ValidationException", f"Too many items requested for the {label} call")
+        if self.unprocessed_batches:
+            self.unprocessed_batches -= 1
+            half = len(entries) // 2
+            return entries[:half], entries[half:]
+        return entries, []
+
+    def _batch_get_item(self, payload):
+        responses = {}
+        unprocessed = {}
+        for name, request in payload["RequestItems"].items():
+            table = self._table(name)
+            keys = [self._key(table, key) for key in request["Keys"]]
+            if len(set(keys)) != len(keys):
+                raise FakeError("ValidationException", "Provided list of item keys contains duplicates")
+            done, rest = self._split(request["Keys"], 100, "BatchGetItem")
+            responses[name] = [
+                self._project(table["items"][key], request)
+                for key in map(lambda key: self._key(table, key), done) if key in table["items"]
+            ]
+            if rest:
+                unprocessed[name] = dict(request, Keys=rest)
+        return {"Responses": responses, "UnprocessedKeys": unprocessed}
+
+    def _batch_write_item(self, payload):
+        unprocessed = {}
+        for name, entries in payload["RequestItems"].items():
+            table = self._table(name)
+            keys = []
+            for entry in entries:
+                (kind, request), = entry.items()
+                key = request["Key"] if kind == "DeleteRequest" else {
+                    field: request["Item"][field] for field in (table["hash"], table["range"]) if field
+                }
+                keys.append(self._key(table, key))
+            if len(set(keys)) != len(keys):
+                raise FakeError("ValidationException", "Provided list of item keys contains duplicates")
+            done, rest = self._split(entries, 25, "BatchWriteItem")
+            for entry, key in zip(done, keys):
+                (kind, request), = entry.items()
+                if kind == "PutRequest":
+                    table["items"][key] = request["Item"]
+                else:
+                    table["items"].pop(key, None)
+            if rest:
+                unprocessed[name] = rest
+        return {"UnprocessedItems": unprocessed}
@@ -0,0 +1,664 @@
+import hashlib
+import hmac
+import json
+import os
+import random
+import re
+import threading
+import time
+from contextlib import contextmanager
+from bisect import bisect_right
+from datetime import datetime, timezone
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from indexes import normalize
+from search import SearchIndex
+from storage import REQUEST_KEY_TTL, RevisionMismatch, Storage
+from store import BookStore
+
+API_VERSION = "DynamoDB_20120810"
+
+# Service limits on keys per BatchGetItem and requests per BatchWriteItem
+BATCH_GET_SIZE = 100
+BATCH_WRITE_SIZE = 25
+
+# Retries for throttled calls and unprocessed batch items: full jitter,
+# sleeping up to BASE * 2**attempt seconds, capped at MAX_BACKOFF
+MAX_ATTEMPTS = 8
+BASE_BACKOFF = 0.025
+MAX_BACKOFF = 1.0
+
+# Connections kept open per endpoint, and (connect, read) timeouts in seconds
+POOL_SIZE = 16
+TIMEOUT = (2, 10)
+
+RETRYABLE_ERRORS = {
+    "ProvisionedThroughputExceededException", "ThrottlingException", "RequestLimitExceeded",
+    "InternalServerError", "ServiceUnavailable",
+}
+
+# Books are spread over partitions of BUCKET_SIZE consecutive IDs, with the
+# ID as sort key, so a listing in ID order is one Query per partition. The
+# catalog record (counters for IDs, version and size) has its own key.
+BUCKET_SIZE = 1000
+CATALOG_KEY = {"pk": {"S": "catalog"}, "id": {"N": "0"}}
+
+STRING_ATTRIBUTES = ("title", "author", "genre", "author_key", "genre_key")
+NUMBER_ATTRIBUTES = ("year", "revision", "modified")
+BOOK_FIELDS = ("title", "author", "genre", "year")
+
+# Every attribute in an expression goes through a placeholder, which keeps
+# clear of DynamoDB's reserved words (YEAR among them)
+NAMES = {f"#{name}": name for name in (
+    "pk", "id", "title", "author", "genre", "author_key", "genre_key", "year", "revision", "modified",
+    "last_id", "version", "book_count", "last_modified",
+)}
+
+
+class DynamoError(Exception):
+    """Raised for an error response from the DynamoDB API"""
+
+    def __init__(self, code, message):
+        super().__init__(f"{code}: {message}")
+        self.code = code
+
+
+def attribute_names(*expressions):
+    """Return the ExpressionAttributeNames used by some expressions"""
+    return {name: NAMES[name] for expression in expressions for name in re.findall(r"#\w+", expression)}
+
+
+def default_endpoint(region):
+    """Return the DynamoDB endpoint for this environment
+
+    Inside a LocalStack Lambda the LocalStack gateway is used, otherwise
+    the regional AWS endpoint.
+    """
+    if os.environ.get("AWS_ENDPOINT_URL"):
+        return os.environ["AWS_ENDPOINT_URL"]
+    if os.environ.get("LOCALSTACK_HOSTNAME"):
+        return f"http://{os.environ['LOCALSTACK_HOSTNAME']}:{os.environ.get('EDGE_PORT', '4566')}"
+    return f"https://dynamodb.{region}.amazonaws.com"
+
+
+def sign_v4(method, url, headers, body, region, credentials, service="dynamodb", now=None):
+    """Return `headers` plus the AWS Signature Version 4 headers for a request
+
+    `credentials` is (access key, secret key, session token or None).
+    """
+    access_key, secret_key, token = credentials
+    now = now or datetime.now(timezone.utc)
+    amz_date = now.strftime("%Y%m%dT%H%M%SZ")
+    date = amz_date[:8]
+    parts = urlsplit(url)
+
+    headers = dict(headers)
+    headers["Host"] = parts.netloc
+    headers["X-Amz-Date"] = amz_date
+    if token:
+        headers["X-Amz-Security-Token"] = token
+
+    canonical = sorted((name.lower(), " ".join(str(value).split())) for name, value in headers.items())
+    signed_headers = ";".join(name for name, _ in canonical)
+    canonical_request = "\n".join([
+        method,
+        parts.path or "/",
+        parts.query,
+        "".join(f"{name}:{value}\n" for name, value in canonical),
+        signed_headers,
+        hashlib.sha256(body).hexdigest(),
+    ])
+    scope = f"{date}/{region}/{service}/aws4_request"
+    string_to_sign = "\n".join([
+        "AWS4-HMAC-SHA256", amz_date, scope,
+        hashlib.sha256(canonical_request.encode("utf-8")).hexdigest(),
+    ])
+
+    key = ("AWS4" + secret_key).encode("utf-8")
+    for part in (date, region, service, "aws4_request"):
+        key = hmac.new(key, part.encode("utf-8"), hashlib.sha256).digest()
+    signature = hmac.new(key, string_to_sign.encode("utf-8"), hashlib.sha256).hexdigest()
+    headers["Authorization"] = (
+        f"AWS4-HMAC-SHA256 Credential={access_key}/{scope}, "
+        f"SignedHeaders={signed_headers}, Signature={signature}"
+    )
+    return headers
+
+
+def env_credentials():
+    """Return credentials from the environment, as the Lambda runtime sets them
+
+    Falls back to the dummy "test" keys LocalStack accepts.
+    """
+    return (
+        os.environ.get("AWS_ACCESS_KEY_ID", "test"),
+        os.environ.get("AWS_SECRET_ACCESS_KEY", "test"),
+        os.environ.get("AWS_SESSION_TOKEN"),
+    )
+
+
+class DynamoClient:
+    """Minimal DynamoDB JSON API client over a pooled requests session
+
+    The session keeps up to POOL_SIZE keep-alive connections to the
+    endpoint, so a warm container reuses them across invocations. Throttled
+    calls are retried with jittered exponential backoff, and the batch
+    helpers split requests to the service limits and resubmit unprocessed
+    items the same way.
+    """
+
+    def __init__(self, endpoint=None, region="us-east-1", credentials=None, session=None, sleep=time.sleep):
+        self.region = region
+        self.endpoint = endpoint or default_endpoint(region)
+        self.credentials = credentials or env_credentials()
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=POOL_SIZE)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+        self.session = session
+        self.sleep = sleep
+
+    def call(self, operation, payload):
+        """Invoke one API operation and return its decoded response"""
+        body = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+        for attempt in range(MAX_ATTEMPTS):
+            headers = sign_v4("POST", self.endpoint, {
+                "Content-Type": "application/x-amz-json-1.0",
+                "X-Amz-Target": f"{API_VERSION}.{operation}",
+            }, body, self.region, self.credentials)
+            try:
+                response = self.session.post(self.endpoint, data=body, headers=headers, timeout=TIMEOUT)
+            except requests.ConnectionError:
+                if attempt == MAX_ATTEMPTS - 1:
+                    raise
+                self.backoff(attempt)
+                continue
+
+            if response.status_code == 200:
+                return response.json()
+            try:
+                error = response.json() if response.content else {}
+            except ValueError:
+                # e.g. an HTML error page from a proxy; the status decides
+                error = {}
+            code = error.get("__type", "").rpartition("#")[2] or f"HTTP{response.status_code}"
+            retryable = code in RETRYABLE_ERRORS or response.status_code >= 500 or response.status_code == 429
+            if not retryable or attempt == MAX_ATTEMPTS - 1:
+                raise DynamoError(code, error.get("message") or error.get("Message", ""))
+            self.backoff(attempt)
+
+    def backoff(self, attempt):
+        self.sleep(random.uniform(0, min(MAX_BACKOFF, BASE_BACKOFF * 2 ** attempt)))
+
+    def batch_get(self, table, keys, projection=None):
+        """Fetch items by key with BatchGetItem; return them in no particular order
+
+        Duplicate keys are requested once.
+        """
+        unique = {json.dumps(key, sort_keys=True): key for key in keys}
+        keys = list(unique.values())
+        items = []
+        for start in range(0, len(keys), BATCH_GET_SIZE):
+            request = {"Keys": keys[start:start + BATCH_GET_SIZE], "ConsistentRead": True}
+            if projection:
+                request["ProjectionExpression"] = projection
+                request["ExpressionAttributeNames"] = attribute_names(projection)
+            pending = {table: request}
+            attempt = 0
+            while pending:
+                response = self.call("BatchGetItem", {"RequestItems": pending})
+                items.extend(response.get("Responses", {}).get(table, []))
+                pending = response.get("UnprocessedKeys") or {}
+                if pending:
+                    if attempt == MAX_ATTEMPTS - 1:
+                        raise DynamoError("UnprocessedKeys", f"{table} kept returning unprocessed keys")
+                    self.backoff(attempt)
+                    attempt += 1
+        return items
+
+    def batch_write(self, table, entries):
+        """Apply PutRequest/DeleteRequest entries with BatchWriteItem
+
+        Several writes to the same key coalesce into the last one, since a
+        single BatchWriteItem may not touch a key twice.
+        """
+        coalesced = {}
+        for entry in entries:
+            (kind, request), = entry.items()
+            item = request["Item"] if kind == "PutRequest" else request["Key"]
+            key = (item["pk"]["S"], item["id"]["N"])
+            coalesced.pop(key, None)
+            coalesced[key] = entry
+        entries = list(coalesced.values())
+
+        for start in range(0, len(entries), BATCH_WRITE_SIZE):
+            pending = {table: entries[start:start + BATCH_WRITE_SIZE]}
+            attempt = 0
+            while pending:
+                response = self.call("BatchWriteItem", {"RequestItems": pending})
+                pending = response.get("UnprocessedItems") or {}
+                if pending:
+                    if attempt == MAX_ATTEMPTS - 1:
+                        raise DynamoError("UnprocessedItems", f"{table} kept returning unprocessed items")
+                    self.backoff(attempt)
+                    attempt += 1
+
+
+
+def book_key(book_id):
+    return {"pk": {"S": f"books#{book_id // BUCKET_SIZE}"}, "id": {"N": str(book_id)}}
+
+
+def request_key(key):
+    """Key of the item recording an idempotent add()
+
+    Its ID of 0 keeps it out of scans, like the catalog record.
+    """
+    return {"pk": {"S": f"request#{key}"}, "id": {"N": "0"}}
+
+
+def to_item(book, revision, modified):
+    """Encode a book as a DynamoDB item"""
+    item = book_key(book["id"])
+    values = dict(book, author_key=normalize(book["author"]), genre_key=normalize(book["genre"]),
+                  revision=revision, modified=modified)
+    for name in STRING_ATTRIBUTES:
+        item[name] = {"S": str(values[name])}
+    for name in NUMBER_ATTRIBUTES:
+        item[name] = {"N": repr(values[name])}
+    return item
+
+
+def from_item(item):
+    """Decode the book stored in a DynamoDB item"""
+    book = {"id": int(item["id"]["N"])}
+    for name in BOOK_FIELDS:
+        value = item[name]
+        book[name] = int(value["N"]) if "N" in value else value["S"]
+    return book
+
+
+class DynamoStore(Storage):
+    """Book catalog kept in a DynamoDB table
+
+    The table has a string partition key `pk` and a numeric sort key `id`
+    (see BUCKET_SIZE). Single-book reads are one consistent GetItem; pages
+    of known IDs and bulk writes go through BatchGetItem / BatchWriteItem.
+    Updates and deletes are conditional on the stored revision, so writers
+    in different containers cannot overwrite each other. write_lock() only
+    serializes writers within this process: DynamoDB has no multi-item
+    lock, so a batch is validated atomically but applied item by item.
+
+    DynamoDB has no ordered secondary scans or full-text search, so find()
+    and search() are answered from an in-memory copy of the catalog kept
+    per container. It is rebuilt with a Scan only when the catalog version
+    has moved, which still makes them costly under a steady write load;
+    large catalogs that filter heavily belong in the SQLite backend.
+
+    add() with a key writes the book, then a request item that expires
+    after REQUEST_KEY_TTL (the table's TTL attribute is `expires`). If
+    another container claimed the key in between, the book is deleted
+    again; only a crash between the two writes can still leave a duplicate.
+    """
+
+    def __init__(self, client, table):
+        self.client = client
+        self.table = table
+        self._lock = threading.RLock()
+        # Catalog record cached for the current thread's read_lock() block
+        self._local = threading.local()
+        # (catalog version, BookStore copy) serving find() and search()
+        self._view = None
+        self._view_lock = threading.Lock()
+
+    def create_table(self):
+        """Create the table on demand, e.g. in LocalStack or a test fake"""
+        self.client.call("CreateTable", {
+            "TableName": self.table,
+            "KeySchema": [
+                {"AttributeName": "pk", "KeyType": "HASH"},
+                {"AttributeName": "id", "KeyType": "RANGE"},
+            ],
+            "AttributeDefinitions": [
+                {"AttributeName": "pk", "AttributeType": "S"},
+                {"AttributeName": "id", "AttributeType": "N"},
+            ],
+            "BillingMode": "PAY_PER_REQUEST",
+        })
+
+    def ensure_catalog(self):
+        """Create the catalog record of a new table; return whether it was created"""
+        try:
+            self.client.call("PutItem", {
+                "TableName": self.table,
+                "Item": dict(CATALOG_KEY, last_id={"N": "0"}, version={"N": "0"},
+                             book_count={"N": "0"}, last_modified={"N": repr(time.time())}),
+                "ConditionExpression": "attribute_not_exists(#id)",
+                "ExpressionAttributeNames": attribute_names("#id"),
+            })
+        except DynamoError as e:
+            if e.code == "ConditionalCheckFailedException":
+                return False
+            raise
+        return True
+
+    @contextmanager
+    def read_lock(self):
+        """Read the catalog record at most once for the whole block
+
+        DynamoDB has no read transactions, but version, last_modified,
+        len() and listings inside the block share one read of the counters
+        instead of fetching the record for each.
+        """
+        local = self._local
+        if getattr(local, "depth", 0):
+            local.depth += 1
+            try:
+                yield
+            finally:
+                local.depth -= 1
+            return
+        local.depth = 1
+        local.catalog = None
+        try:
+            yield
+        finally:
+            local.depth = 0
+            local.catalog = None
+
+    @contextmanager
+    def write_lock(self):
+        with self._lock:
+            yield
+
+    @property
+    def version(self):
+        return int(self._catalog()["version"]["N"])
+
+    @property
+    def last_modified(self):
+        return float(self._catalog()["last_modified"]["N"])
+
+    def __len__(self):
+        return int(self._catalog()["book_count"]["N"])
+
+    def __contains__(self, book_id):
+        return self._get_item(book_id, "#id") is not None
+
+    def __iter__(self):
+        after = None
+        while True:
+            chunk, after = self.page(after=after, limit=BUCKET_SIZE)
+            yield from chunk
+            if after is None:
+                return
+
+    def get(self, book_id):
+        item = self._get_item(book_id)
+        return None if item is None else from_item(item)
+
+    def revision(self, book_id):
+        item = self._get_item(book_id, "#revision, #modified")
+        if item is None:
+            return None
+        return int(item["revision"]["N"]), float(item["modified"]["N"])
+
+    def find(self, author=None, genre=None, year_from=None, year_to=None):
+        return self._catalog_view().find(author=author, genre=genre, year_from=year_from, year_to=year_to)
+
+    def count(self, author=None, genre=None, year_from=None, year_to=None):
+        if author is None and genre is None and year_from is None and year_to is None:
+            return len(self)
+        return self._catalog_view().count(author=author, genre=genre, year_from=year_from, year_to=year_to)
+
+    def page(self, after=None, offset=0, limit=100, author=None, genre=None, year_from=None, year_to=None):
+        if author is not None or genre is not None or year_from is not None or year_to is not None:
+            ids = self.find(author=author, genre=genre, year_from=year_from, year_to=year_to)
+            start = (bisect_right(ids, after) if after is not None else 0) + offset
+            window = ids[start:start + limit + 1]
+            items = self.client.batch_get(self.table, [book_key(book_id) for book_id in window])
+            found = {book["id"]: book for book in map(from_item, items)}
+            books = [found[book_id] for book_id in window if book_id in found]
+        else:
+            books = self._query_range(after if after is not None else 0, offset + limit + 1)[offset:]
+
+        if len(books) > limit:
+            return books[:limit], books[limit - 1]["id"]
+        return books, None
+
+    def search(self, query, limit=20):
+        return self._catalog_view().search(query, limit=limit)
+
+    def add(self, fields, key=None):
+        if key is None:
+            return self.add_many([fields])[0]
+        with self.write_lock():
+            request = {"TableName": self.table, "Key": request_key(key), "ConsistentRead": True}
+            if "Item" in self.client.call("GetItem", request):
+                return None
+            book = self.add_many([fields])[0]
+            now = time.time()
+            try:
+                self.client.call("PutItem", {
+                    "TableName": self.table,
+                    "Item": dict(request_key(key), book_id={"N": str(book["id"])},
+                                 expires={"N": str(int(now + REQUEST_KEY_TTL))}),
+                    "ConditionExpression": "attribute_not_exists(#pk)",
+                    "ExpressionAttributeNames": attribute_names("#pk"),
+                })
+            except DynamoError as e:
+                # Either way the add did not count: undo it before reporting
+                self.delete(book["id"])
+                if e.code == "ConditionalCheckFailedException":
+                    return None
+                raise
+            return book
+
+    def add_many(self, fields_list):
+        if not fields_list:
+            return []
+        with self.write_lock():
+            now = time.time()
+            last_id = self._reserve_ids(len(fields_list))
+            books = []
+            for offset, fields in enumerate(fields_list):
+                book = {"id": last_id - len(fields_list) + 1 + offset}
+                book.update(fields)
+                books.append(book)
+            try:
+                if len(books) == 1:
+                    self.client.call("PutItem", {
+                        "TableName": self.table,
+                        "Item": to_item(books[0], 1, now),
+                        "ConditionExpression": "attribute_not_exists(#id)",
+                        "ExpressionAttributeNames": attribute_names("#id"),
+                    })
+                else:
+                    self.client.batch_write(self.table, [
+                        {"PutRequest": {"Item": to_item(book, 1, now)}} for book in books
+                    ])
+            except (DynamoError, requests.RequestException):
+                # Count whatever part of the batch was stored before the
+                # failure; the reserved IDs of the rest are simply skipped
+                written = self.client.batch_get(self.table, [book_key(book["id"]) for book in books], "#id")
+                if written:
+                    self._touch(now, count=len(written))
+                raise
+            self._touch(now, count=len(books))
+        return books
+
+    def update(self, book_id, changes, expected_revision=None):
+        with self.write_lock():
+            while True:
+                item = self._get_item(book_id)
+                if item is None:
+                    return None
+                revision = int(item["revision"]["N"])
+                if expected_revision is not None and revision != expected_revision:
+                    raise RevisionMismatch(book_id, revision, float(item["modified"]["N"]))
+                book = from_item(item)
+                book.update(changes)
+                now = time.time()
+                try:
+                    self.client.call("PutItem", {
+                        "TableName": self.table,
+                        "Item": to_item(book, revision + 1, now),
+                        "ConditionExpression": "#revision = :revision",
+                        "ExpressionAttributeNames": attribute_names("#revision"),
+                        "ExpressionAttributeValues": {":revision": {"N": str(revision)}},
+                    })
+                except DynamoError as e:
+                    # Another container wrote first; re-read and try again
+                    if e.code != "ConditionalCheckFailedException":
+                        raise
+                    continue
+                self._touch(now)
+                return book
+
+    def delete(self, book_id, expected_revision=None):
+        with self.write_lock():
+            while True:
+                item = self._get_item(book_id)
+                if item is None:
+                    return None
+                revision = int(item["revision"]["N"])
+                if expected_revision is not None and revision != expected_revision:
+                    raise RevisionMismatch(book_id, revision, float(item["modified"]["N"]))
+                try:
+                    self.client.call("DeleteItem", {
+                        "TableName": self.table,
+                        "Key": book_key(book_id),
+                        "ConditionExpression": "#revision = :revision",
+                        "ExpressionAttributeNames": attribute_names("#revision"),
+                        "ExpressionAttributeValues": {":revision": {"N": str(revision)}},
+                    })
+                except DynamoError as e:
+                    if e.code != "ConditionalCheckFailedException":
+                        raise
+                    continue
+                self._touch(time.time(), count=-1)
+                return from_item(item)
+
+    def load(self, books):
+        with self.write_lock():
+            books = list(books)
+            now = time.time()
+            old_keys = [{"pk": item["pk"], "id": item["id"]} for item in self._scan("#pk, #id")]
+            self.client.batch_write(self.table, [{"DeleteRequest": {"Key": key}} for key in old_keys])
+            self.client.batch_write(self.table, [
+                {"PutRequest": {"Item": to_item(book, 1, now)}} for book in books
+            ])
+            last_id = max([int(self._catalog()["last_id"]["N"])] + [book["id"] for book in books])
+            self.client.call("UpdateItem", {
+                "TableName": self.table,
+                "Key": CATALOG_KEY,
+                "UpdateExpression": "SET #book_count = :count, #last_id = :last_id, #last_modified = :now"
+                                    " ADD #version :one",
+                "ExpressionAttributeNames": attribute_names("#book_count #last_id #last_modified #version"),
+                "ExpressionAttributeValues": {
+                    ":count": {"N": str(len(books))}, ":last_id": {"N": str(last_id)},
+                    ":now": {"N": repr(now)}, ":one": {"N": "1"},
+                },
+            })
+
+    def _catalog(self):
+        local = self._local
+        cached = getattr(local, "depth", 0)
+        if cached and local.catalog is not None:
+            return local.catalog
+        item = self.client.call("GetItem", {
+            "TableName": self.table, "Key": CATALOG_KEY, "ConsistentRead": True,
+        })["Item"]
+        if cached:
+            local.catalog = item
+        return item
+
+    def _catalog_view(self):
+        """Return an in-memory copy of the catalog at its current version"""
+        with self._view_lock:
+            version = int(self._catalog()["version"]["N"])
+            if self._view is None or self._view[0] != version:
+                # A write racing the Scan only makes the next call rebuild
+                view = BookStore()
+                view.add_index(SearchIndex())
+                view.restore([
+                    (from_item(item), 1, 0.0) for item in self._scan("#id, #title, #author, #genre, #year")
+                ], 1)
+                self._view = (version, view)
+            return self._view[1]
+
+    def _get_item(self, book_id, projection=None):
+        request = {"TableName": self.table, "Key": book_key(book_id), "ConsistentRead": True}
+        if projection:
+            request["ProjectionExpression"] = projection
+            request["ExpressionAttributeNames"] = attribute_names(projection)
+        return self.client.call("GetItem", request).get("Item")
+
+    def _reserve_ids(self, count):
+        """Reserve the next `count` book IDs and return the last of them"""
+        return int(self.client.call("UpdateItem", {
+            "TableName": self.table,
+            "Key": CATALOG_KEY,
+            "UpdateExpression": "ADD #last_id :ids",
+            "ExpressionAttributeNames": attribute_names("#last_id"),
+            "ExpressionAttributeValues": {":ids": {"N": str(count)}},
+            "ReturnValues": "UPDATED_NEW",
+        })["Attributes"]["last_id"]["N"])
+
+    def _touch(self, now, count=0):
+        """Bump the catalog version and adjust the book count"""
+        self.client.call("UpdateItem", {
+            "TableName": self.table,
+            "Key": CATALOG_KEY,
+            "UpdateExpression": "SET #last_modified = :now ADD #version :one, #book_count :count",
+            "ExpressionAttributeNames": attribute_names("#last_modified #version #book_count"),
+            "ExpressionAttributeValues": {
+                ":now": {"N": repr(now)}, ":one": {"N": "1"}, ":count": {"N": str(count)},
+            },
+        })
+
+    def _scan(self, projection):
+        """Yield every book item with the projected attributes"""
+        request = {
+            "TableName": self.table,
+            "ProjectionExpression": projection,
+            "ExpressionAttributeNames": attribute_names(projection),
+        }
+        while True:
+            response = self.client.call("Scan", request)
+            for item in response.get("Items", []):
+                # Skip the catalog record, which has ID 0
+                if item["id"]["N"] != "0":
+                    yield item
+            if "LastEvaluatedKey" not in response:
+                return
+            request["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+    def _query_range(self, after, count):
+        """Return up to `count` books with IDs above `after`, in ID order"""
+        books = []
+        last_bucket = int(self._catalog()["last_id"]["N"]) // BUCKET_SIZE
+        bucket = (after + 1) // BUCKET_SIZE
+        request = {
+            "TableName": self.table,
+            "KeyConditionExpression": "#pk = :pk AND #id > :after",
+            "ExpressionAttributeNames": attribute_names("#pk #id"),
+            "ConsistentRead": True,
+        }
+        while len(books) < count and bucket <= last_bucket:
+            request["ExpressionAttributeValues"] = {
+                ":pk": {"S": f"books#{bucket}"}, ":after": {"N": str(after)},
+            }
+            request["Limit"] = count - len(books)
+            response = self.client.call("Query", request)
+            books.extend(map(from_item, response.get("Items", [])))
+            if "LastEvaluatedKey" in response and len(books) < count:
+                request["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+                continue
+            request.pop("ExclusiveStartKey", None)
+            bucket += 1
+        return books
@@ -0,0 +1,82 @@
+from bisect import bisect_left, bisect_right, insort
+
+
+def normalize(value):
+    """Return the key used to compare field values case-insensitively"""
+    return value.casefold() if isinstance(value, str) else value
+
+
+class HashIndex:
+    """Case-insensitive exact-match index from a field value to book IDs"""
+
+    def __init__(self, field):
+        self.field = field
+        self.fields = (field,)
+        self._ids = {}
+
+    def add(self, book):
+        key = normalize(book.get(self.field))
+        self._ids.setdefault(key, set()).add(book["id"])
+
+    def rebuild(self, books):
+        """Replace the index contents with entries for `books`"""
+        self._ids = {}
+        for book in books:
+            self.add(book)
+
+    def remove(self, book):
+        key = normalize(book.get(self.field))
+        ids = self._ids.get(key)
+        if ids is None:
+            return
+        ids.discard(book["id"])
+        if not ids:
+            del self._ids[key]
+
+    def lookup(self, value):
+        """Return the set of IDs whose field equals `value`"""
+        return self._ids.get(normalize(value), set())
+
+
+class SortedIndex:
+    """Ordered index over a numeric field supporting range scans"""
+
+    def __init__(self, field):
+        self.field = field
+        self.fields = (field,)
+        # (value, id) pairs kept sorted so ranges are two bisects away
+        self._entries = []
+
+    def add(self, book):
+        entry = (book[self.field], book["id"])
+        if not self._entries or entry > self._entries[-1]:
+            self._entries.append(entry)
+        else:
+            insort(self._entries, entry)
+
+    def rebuild(self, books):
+        """Replace the index contents with entries for `books`"""
+        self._entries = sorted((book[self.field], book["id"]) for book in books)
+
+    def remove(self, book):
+        entry = (book[self.field], book["id"])
+        index = bisect_left(self._entries, entry)
+        if index < len(self._entries) and self._entries[index] == entry:
+            del self._entries[index]
+
+    def _bounds(self, low, high):
+        entries = self._entries
+        start = 0 if low is None else bisect_left(entries, (low,))
+        stop = len(entries) if high is None else bisect_right(entries, (high, float("inf")))
+        return start, stop
+
+    def count(self, low=None, high=None):
+        """Return how many IDs range(low, high) would return, without building them"""
+        start, stop = self._bounds(low, high)
+        return max(stop - start, 0)
+
+    def range(self, low=None, high=None):
+        """Return IDs whose field lies within [low, high]; None is unbounded"""
+        entries = self._entries
+        start, stop = self._bounds(low, high)
+        return [entries[index][1] for index in range(start, stop)]
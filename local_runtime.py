@@ -0,0 +1,207 @@
+"""In-process stand-ins for the AWS Lambda runtime, for local testing.
+
+    from local_runtime import invoke_streaming
+    result = invoke_streaming(stream_handler, event)
+
+Also replays recorded API Gateway traffic against a handler and measures
+cold starts, warm latency, allocations and RSS; see
+benchmarks/bench_handler.py for the command-line front end.
+"""
+import json
+import os
+import subprocess
+import sys
+import time
+import tracemalloc
+from urllib.parse import urlencode
+
+from wsgi_handler import STREAM_DELIMITER
+
+ROOT = os.path.abspath(os.path.dirname(__file__))
+
+# Imports the handler in a fresh interpreter and times each cold-start phase
+COLD_START_PROBE = """
+import json, sys, time
+event = json.loads(sys.stdin.read())
+started = time.perf_counter()
+import wsgi_handler
+imported = time.perf_counter()
+wsgi_handler.init_container()
+initialized = time.perf_counter()
+wsgi_handler.handler(event, None)
+finished = time.perf_counter()
+print(json.dumps({
+    "import_seconds": imported - started,
+    "init_seconds": initialized - imported,
+    "first_invoke_seconds": finished - initialized,
+    "total_seconds": finished - started,
+}))
+"""
+
+
+class StreamingResult:
+    """What a client of a response-streaming function would have received"""
+
+    def __init__(self, metadata, body, chunks, first_byte_seconds, total_seconds):
+        self.metadata = metadata
+        self.body = body
+        self.chunks = chunks
+        self.first_byte_seconds = first_byte_seconds
+        self.total_seconds = total_seconds
+
+    @property
+    def status_code(self):
+        return self.metadata.get('statusCode', 200)
+
+    @property
+    def headers(self):
+        return self.metadata.get('headers', {})
+
+
+def invoke_streaming(handler, event, context=None):
+    """Drive a streaming handler the way the Lambda runtime would
+
+    Splits the metadata prelude from the body at the delimiter and records
+    time to first body byte, so streaming behaviour can be checked without
+    deploying.
+    """
+    started = time.perf_counter()
+    stream = bytearray()
+    body_start = None
+    first_byte_seconds = None
+    chunks = 0
+
+    for chunk in handler(event, context):
+        stream += chunk
+        if body_start is None:
+            index = stream.find(STREAM_DELIMITER)
+            if index == -1:
+                continue
+            body_start = index + len(STREAM_DELIMITER)
+        if first_byte_seconds is None and len(stream) > body_start:
+            first_byte_seconds = time.perf_counter() - started
+        if len(stream) > body_start:
+            chunks += 1
+
+    if body_start is None:
+        raise ValueError('Stream ended before the metadata prelude was complete')
+    metadata = json.loads(bytes(stream[:body_start - len(STREAM_DELIMITER)]))
+    return StreamingResult(
+        metadata,
+        bytes(stream[body_start:]),
+        chunks,
+        first_byte_seconds,
+        time.perf_counter() - started,
+    )
+
+
+def make_event(record, payload_format='v1'):
+    """Build an API Gateway event from a recorded request
+
+    Records that already are API Gateway events are returned unchanged.
+    Otherwise a record holds `method`, `path` and optionally `query` (a dict
+    of lists or strings), `headers` and `body` (a string or a JSON value).
+    """
+    if 'httpMethod' in record or 'requestContext' in record:
+        return record
+
+    method = record.get('method', 'GET').upper()
+    path = record.get('path', '/')
+    headers = dict(record.get('headers') or {})
+    query = {
+        name: values if isinstance(values, list) else [values]
+        for name, values in (record.get('query') or {}).items()
+    }
+    body = record.get('body')
+    if body is not None and not isinstance(body, str):
+        body = json.dumps(body)
+        headers.setdefault('content-type', 'application/json')
+
+    if payload_format == 'v2':
+        return {
+            'version': '2.0',
+            'rawPath': path,
+            'rawQueryString': urlencode(query, doseq=True),
+            'headers': headers,
+            'requestContext': {'http': {'method': method, 'path': path}},
+            'body': body,
+            'isBase64Encoded': False,
+        }
+    return {
+        'httpMethod': method,
+        'path': path,
+        'headers': headers,
+        'queryStringParameters': {name: values[-1] for name, values in query.items()} or None,
+        'multiValueQueryStringParameters': query or None,
+        'body': body,
+        'isBase64Encoded': False,
+    }
+
+
+def load_events(path, payload_format='v1'):
+    """Read one recorded request or event per line of a JSONL file"""
+    with open(path) as f:
+        return [make_event(json.loads(line), payload_format) for line in f if line.strip()]
+
+
+def percentile(samples, fraction):
+    """Nearest-rank percentile of a list of numbers"""
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, int(round(fraction * len(ordered))) - 1))
+    return ordered[index]
+
+
+def current_rss():
+    """Resident set size of this process in bytes (Linux)"""
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+
+
+def measure_cold_start(event, runs=5):
+    """Time import, init and first invocation in fresh interpreters"""
+    results = []
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, '-c', COLD_START_PROBE],
+            input=json.dumps(event), cwd=ROOT, stdout=subprocess.PIPE,
+            universal_newlines=True, check=True,
+        ).stdout
+        results.append(json.loads(output.strip().splitlines()[-1]))
+    return results
+
+
+def measure_warm(handler, events, iterations):
+    """Replay events round-robin and return per-invocation latencies in seconds"""
+    latencies = []
+    for index in range(iterations):
+        event = events[index % len(events)]
+        started = time.perf_counter()
+        handler(event, None)
+        latencies.append(time.perf_counter() - started)
+    return latencies
+
+
+def measure_allocations(handler, events, iterations):
+    """Trace memory over a replay
+
+    Returns the mean peak traced bytes per invocation, the mean number of
+    memory blocks left allocated per invocation, and the RSS growth.
+    """
+    rss_before = current_rss()
+    peaks = []
+    tracemalloc.start()
+    try:
+        blocks_before = sys.getallocatedblocks()
+        for index in range(iterations):
+            event = events[index % len(events)]
+            tracemalloc.clear_traces()
+            handler(event, None)
+            peaks.append(tracemalloc.get_traced_memory()[1])
+        blocks_after = sys.getallocatedblocks()
+    finally:
+        tracemalloc.stop()
+    return {
+        'mean_peak_bytes': sum(peaks) / len(peaks),
+        'retained_blocks_per_invocation': (blocks_after - blocks_before) / iterations,
+        'rss_growth_bytes': current_rss() - rss_before,
+    }
@@ -0,0 +1,91 @@
+import base64
+import json
+
+import app
+from app import apply_batch_operation, prepare_batch_operation, store
+
+
+def decode_record(record):
+    """Return the (item identifier, operation) carried by an SQS or Kinesis record"""
+    if 'kinesis' in record:
+        data = base64.b64decode(record['kinesis']['data'])
+        return record['kinesis']['sequenceNumber'], json.loads(data)
+    return record['messageId'], json.loads(record['body'])
+
+
+def record_identifier(record):
+    """Return the item identifier Lambda expects back for a failed record"""
+    return record.get('messageId') or record.get('kinesis', {}).get('sequenceNumber')
+
+
+def request_key(record):
+    """Return a key naming this record across redeliveries, for idempotent creates"""
+    return f"{record.get('eventSourceARN', '')}#{record.get('eventID') or record_identifier(record)}"
+
+
+def is_ordered_source(record):
+    """Whether later records must wait for earlier ones (Kinesis, SQS FIFO)"""
+    return 'kinesis' in record or record.get('eventSourceARN', '').endswith('.fifo')
+
+
+def handler(event, context):
+    """
+    AWS Lambda handler for SQS/Kinesis batches of catalog writes
+
+    Each record carries one operation in the same shape as an item of
+    POST /api/books:batch and is validated the same way. Records that can
+    never succeed (malformed, invalid, or naming a missing book) are logged
+    and dropped rather than retried. Only records that fail with an error
+    from the store are returned as partial batch failures, to be retried
+    and, after too many attempts, sent to the dead-letter queue. Creates
+    are keyed by the record, so a redelivered record adds its book once.
+
+    For ordered sources processing stops at the first failure: Kinesis
+    retries everything from that record on, while SQS FIFO deletes any
+    message not reported, so the failed record and all those after it are
+    returned.
+    """
+    failures = []
+    applied = 0
+    dropped = 0
+    records = event.get('Records', [])
+    app.materialize_catalog()
+
+    # One write lock for the whole batch instead of one per record
+    with store.write_lock():
+        for index, record in enumerate(records):
+            try:
+                item_id, operation = decode_record(record)
+            except (KeyError, ValueError) as e:
+                print(f"Dropped malformed record {record_identifier(record)}: {e}")
+                dropped += 1
+                continue
+
+            try:
+                entry, errors = prepare_batch_operation(operation, set())
+                if errors:
+                    print(f"Dropped record {item_id}: {'; '.join(errors)}")
+                    dropped += 1
+                    continue
+                result = apply_batch_operation(entry, key=request_key(record))
+            except Exception as e:
+                # Store errors such as throttling may pass on a later attempt
+                print(f"Failed record {item_id}: {e!r}")
+                failures.append({'itemIdentifier': item_id})
+                if is_ordered_source(record):
+                    if 'kinesis' not in record:
+                        failures.extend({'itemIdentifier': record_identifier(rest)} for rest in records[index + 1:])
+                    break
+                continue
+
+            if entry[0] == 'create' and result['book'] is None:
+                print(f"Skipped record {item_id}: already applied")
+            else:
+                applied += 1
+
+    # Acknowledge the batch only once its writes are durable
+    if app.mutation_log is not None:
+        app.mutation_log.wait()
+
+    print(f"Applied {applied} catalog writes, dropped {dropped}, {len(failures)} failed")
+    return {'batchItemFailures': failures}
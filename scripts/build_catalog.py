@@ -0,0 +1,31 @@
+"""Convert an NDJSON catalog export into a columnar snapshot.
+
+The result can be shipped alongside the Lambda bundle and named by
+CATALOG_SNAPSHOT; containers map it instead of parsing it.
+
+    curl http://localhost:5000/api/books/export > books.ndjson
+    python scripts/build_catalog.py books.ndjson catalog.col
+"""
+import argparse
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from columnar import write_columnar
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('source', help='NDJSON export, one book per line')
+    parser.add_argument('target', help='columnar snapshot to write')
+    args = parser.parse_args()
+
+    with open(args.source, 'rb') as f:
+        count = write_columnar(args.target, (json.loads(line) for line in f if line.strip()))
+    size = os.path.getsize(args.target)
+    print(f"Wrote {count} books to {args.target} ({size / 1e6:.1f} MB)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,140 @@
+"""Build a minimal AWS Lambda bundle for the handlers in ENTRY_POINTS.
+
+The requirements are installed into a staging directory as manylinux
+wheels for the Python version of the function's `runtime` in
+terraform/main.tf, so compiled speedups match Lambda's Linux runtime
+whatever the build machine is. Only the modules reachable from the entry
+points (found with modulefinder) are copied into the bundle: test runners,
+CLI launchers and package metadata are left behind. The bundle directory
+is kept for import-time profiling and zipped for Terraform. Bytecode is
+precompiled into the bundle because /var/task is read-only on Lambda, so
+otherwise every cold start recompiles every module; run the build with the
+same Python version as the function's runtime.
+
+    python scripts/build_lambda.py
+    python scripts/build_lambda.py --source lambda    # reuse an installed tree
+"""
+import argparse
+import compileall
+import modulefinder
+import os
+import re
+import shutil
+import subprocess
+import sys
+import sysconfig
+import tempfile
+import zipfile
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+# Modules whose handlers the Lambda functions in terraform/main.tf invoke
+ENTRY_POINTS = ('wsgi_handler.py', 'queue_handler.py')
+TERRAFORM_FILE = os.path.join(ROOT, 'terraform', 'main.tf')
+IGNORED = shutil.ignore_patterns('__pycache__', '*.pyc', '*.dist-info', 'bin')
+
+
+def runtime_python_version(terraform_file):
+    """Return e.g. '3.8' from the Lambda `runtime` in a Terraform file"""
+    with open(terraform_file) as f:
+        match = re.search(r'runtime\s*=\s*"python(\d+\.\d+)"', f.read())
+    if match is None:
+        raise SystemExit(f"No python runtime found in {terraform_file}")
+    return match.group(1)
+
+
+def install_requirements(target, requirements, python_version, platform):
+    """pip-install binary wheels of the requirements for the Lambda platform"""
+    subprocess.check_call([
+        sys.executable, '-m', 'pip', 'install', '--quiet', '--no-compile',
+        '--target', target, '-r', requirements,
+        '--platform', platform,
+        '--implementation', 'cp',
+        '--python-version', python_version,
+        '--only-binary', ':all:',
+    ])
+
+
+def reachable_files(source):
+    """Return the top-level files and directories the entry points can import
+
+    Paths under `source` are relative to it; application modules are
+    returned as paths relative to the repository root.
+    """
+    # Search only the repository, the staged requirements and the standard
+    # library, so nothing is silently resolved from the build machine
+    stdlib = sysconfig.get_paths()['stdlib']
+    path = [ROOT, source, stdlib, os.path.join(stdlib, 'lib-dynload'), sysconfig.get_paths()['platstdlib']]
+    finder = modulefinder.ModuleFinder(path=path)
+    # Imported by name rather than with run_script(), which registers every
+    # script as __main__ so that each one replaces the previous
+    for entry_point in ENTRY_POINTS:
+        finder.import_hook(os.path.splitext(entry_point)[0])
+
+    vendored = set()
+    local = set()
+    for module in finder.modules.values():
+        path = module.__file__
+        if not path:
+            continue
+        path = os.path.abspath(path)
+        for base, found in ((source, vendored), (ROOT, local)):
+            if path.startswith(base + os.sep):
+                found.add(os.path.relpath(path, base).split(os.sep)[0])
+                break
+    return sorted(vendored), sorted(local)
+
+
+def build(source, build_dir, output):
+    vendored, local = reachable_files(source)
+
+    if os.path.exists(build_dir):
+        shutil.rmtree(build_dir)
+    os.makedirs(build_dir)
+
+    for base, names in ((source, vendored), (ROOT, local)):
+        for name in names:
+            src = os.path.join(base, name)
+            dst = os.path.join(build_dir, name)
+            if os.path.isdir(src):
+                shutil.copytree(src, dst, ignore=IGNORED)
+            else:
+                shutil.copy2(src, dst)
+
+    compileall.compile_dir(build_dir, quiet=1)
+
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with zipfile.ZipFile(output, 'w', zipfile.ZIP_DEFLATED) as bundle:
+        for folder, _, files in os.walk(build_dir):
+            for name in sorted(files):
+                path = os.path.join(folder, name)
+                bundle.write(path, os.path.relpath(path, build_dir))
+
+    print(f"Bundled {len(local)} application modules and {len(vendored)} packages:")
+    for name in local + vendored:
+        print(f"  {name}")
+    print(f"Wrote {output} ({os.path.getsize(output) / 1024:.0f} KiB)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--source', help='directory with the requirements already installed (skips pip)')
+    parser.add_argument('--requirements', default=os.path.join(ROOT, 'requirements.txt'))
+    parser.add_argument('--platform', default='manylinux2014_x86_64',
+                        help='wheel platform tag; use manylinux2014_aarch64 for arm64 functions')
+    parser.add_argument('--python-version', help='defaults to the runtime in terraform/main.tf')
+    parser.add_argument('--build-dir', default=os.path.join(ROOT, 'build', 'lambda'))
+    parser.add_argument('--output', default=os.path.join(ROOT, 'terraform', 'lambda.zip'))
+    args = parser.parse_args()
+
+    if args.source:
+        build(os.path.abspath(args.source), args.build_dir, args.output)
+        return
+
+    python_version = args.python_version or runtime_python_version(TERRAFORM_FILE)
+    with tempfile.TemporaryDirectory() as staging:
+        install_requirements(staging, args.requirements, python_version, args.platform)
+        build(staging, args.build_dir, args.output)
+
+
+if __name__ == '__main__':
+    main()
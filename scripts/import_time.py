@@ -0,0 +1,65 @@
+"""Profile the cold-start import cost of the Lambda bundle.
+
+Imports wsgi_handler and the Flask app under `python -X importtime` from a
+bundle directory, prints the most expensive imports and fails when the
+total exceeds a budget, so CI catches cold-start regressions.
+
+    python scripts/import_time.py build/lambda --max-ms 500
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+IMPORT_STATEMENT = 'import wsgi_handler; wsgi_handler.get_app()'
+
+
+def profile(bundle):
+    """Return (module, self us, cumulative us, depth) rows from -X importtime"""
+    env = dict(os.environ, PYTHONPATH=bundle, PYTHONDONTWRITEBYTECODE='1')
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', IMPORT_STATEMENT],
+        cwd=bundle, env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+        universal_newlines=True, check=True,
+    )
+
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('bundle', help='unzipped bundle directory, e.g. build/lambda')
+    parser.add_argument('--max-ms', type=float, help='fail if total import time exceeds this')
+    parser.add_argument('--top', type=int, default=15, help='number of imports to list')
+    parser.add_argument('--report', help='also write the raw rows to this file')
+    args = parser.parse_args()
+
+    rows = profile(os.path.abspath(args.bundle))
+    # Top-level rows (depth 0) partition the whole import, so they sum to the total
+    total_ms = sum(cumulative for _, _, cumulative, depth in rows if depth == 0) / 1000
+
+    print(f"{'cumulative ms':>14}{'self ms':>10}  module")
+    for name, self_us, cumulative_us, _ in sorted(rows, key=lambda row: -row[2])[:args.top]:
+        print(f"{cumulative_us / 1000:>14.1f}{self_us / 1000:>10.1f}  {name}")
+    print(f"Total import time: {total_ms:.1f} ms across {len(rows)} modules")
+
+    if args.report:
+        with open(args.report, 'w') as report:
+            report.write('module\tself_us\tcumulative_us\tdepth\n')
+            for row in rows:
+                report.write('\t'.join(str(value) for value in row) + '\n')
+
+    if args.max_ms is not None and total_ms > args.max_ms:
+        print(f"Import time budget of {args.max_ms:.0f} ms exceeded", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,223 @@
+import heapq
+import math
+import re
+from bisect import bisect_left, insort
+from collections import Counter
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+# BM25 tuning constants
+K1 = 1.2
+B = 0.75
+
+# Upper bound on how many vocabulary terms a single prefix may expand to
+MAX_PREFIX_EXPANSION = 64
+
+
+def tokenize(text):
+    """Split text into lower-cased word tokens"""
+    return TOKEN_PATTERN.findall(text.casefold()) if isinstance(text, str) else []
+
+
+def add_up(weights):
+    """Sum weights left to right, the way search() adds up a book's score
+
+    Rounding then keeps a sum of upper bounds at or above every score it
+    covers, which sum()'s compensated float summation would not guarantee.
+    """
+    total = 0.0
+    for weight in weights:
+        total += weight
+    return total
+
+
+class SearchIndex:
+    """Inverted index over book titles and authors ranked with BM25
+
+    Besides each term's postings, books are grouped per term by their
+    (term frequency, length), since every book in a group gets the same
+    BM25 weight for that term. search() visits groups highest weight first
+    and stops once no unvisited book can beat the current top results
+    (MaxScore), so a query costs roughly the size of its answer rather than
+    the length of its posting lists.
+    """
+
+    def __init__(self, fields=("title", "author")):
+        self.fields = tuple(fields)
+        # token -> {book id: term frequency}
+        self._postings = {}
+        # token -> {(term frequency, book length): ascending book IDs}
+        self._groups = {}
+        # Sorted vocabulary so prefix queries are a bisect plus a short scan
+        self._terms = []
+        self._lengths = {}
+        self._total_length = 0
+
+    def __len__(self):
+        return len(self._lengths)
+
+    def add(self, book):
+        tokens = self._tokens(book)
+        book_id = book["id"]
+        length = len(tokens)
+        for token, frequency in Counter(tokens).items():
+            postings = self._postings.get(token)
+            if postings is None:
+                postings = self._postings[token] = {}
+                self._groups[token] = {}
+                insort(self._terms, token)
+            postings[book_id] = frequency
+            group = self._groups[token].setdefault((frequency, length), [])
+            if not group or book_id > group[-1]:
+                group.append(book_id)
+            else:
+                insort(group, book_id)
+        self._lengths[book_id] = length
+        self._total_length += length
+
+    def rebuild(self, books):
+        """Replace the index contents with entries for `books`"""
+        self._postings = {}
+        self._lengths = {}
+        self._total_length = 0
+        for book in books:
+            tokens = self._tokens(book)
+            book_id = book["id"]
+            for token in tokens:
+                postings = self._postings.setdefault(token, {})
+                postings[book_id] = postings.get(book_id, 0) + 1
+            self._lengths[book_id] = len(tokens)
+            self._total_length += len(tokens)
+
+        lengths = self._lengths
+        self._groups = {}
+        for token, postings in self._postings.items():
+            groups = self._groups[token] = {}
+            for book_id, frequency in postings.items():
+                key = (frequency, lengths[book_id])
+                group = groups.get(key)
+                if group is None:
+                    groups[key] = [book_id]
+                else:
+                    group.append(book_id)
+            for group in groups.values():
+                group.sort()
+        # Sort the vocabulary once rather than insorting each new term
+        self._terms = sorted(self._postings)
+
+    def remove(self, book):
+        book_id = book["id"]
+        if book_id not in self._lengths:
+            return
+        length = self._lengths.pop(book_id)
+        for token in set(self._tokens(book)):
+            postings = self._postings.get(token)
+            if postings is None or book_id not in postings:
+                continue
+            key = (postings.pop(book_id), length)
+            groups = self._groups[token]
+            group = groups[key]
+            del group[bisect_left(group, book_id)]
+            if not group:
+                del groups[key]
+            if not postings:
+                del self._postings[token]
+                del self._groups[token]
+                del self._terms[bisect_left(self._terms, token)]
+        self._total_length -= length
+
+    def search(self, query, limit=20):
+        """Return up to `limit` (book id, score) pairs, best match first
+
+        Each query word matches that exact token; a trailing `*` turns it
+        into a prefix match over the vocabulary.
+        """
+        count = len(self._lengths)
+        if not count or limit <= 0:
+            return []
+        average_length = self._total_length / count or 1
+
+        terms = []
+        for word in query.split():
+            prefix = word.endswith("*")
+            for token in tokenize(word):
+                for term in (self._expand(token) if prefix else [token]):
+                    if term in self._postings:
+                        terms.append(term)
+        if not terms:
+            return []
+
+        # Per query term, its groups as (weight, IDs), best first, and the
+        # weight of each (frequency, length) for scoring books in full
+        weights = []
+        queues = []
+        for term in terms:
+            postings = self._postings[term]
+            idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+            term_weights = {
+                key: idf * key[0] * (K1 + 1) / (key[0] + K1 * (1 - B + B * key[1] / average_length))
+                for key in self._groups[term]
+            }
+            weights.append(term_weights)
+            queues.append(sorted(
+                ((weight, self._groups[term][key]) for key, weight in term_weights.items()),
+                key=lambda group: group[0], reverse=True,
+            ))
+        positions = [0] * len(terms)
+        # Upper bound on what each term adds to a book not yet scored
+        bounds = [queue[0][0] for queue in queues]
+
+        lengths = self._lengths
+        postings_list = [self._postings[term] for term in terms]
+        top = []
+        seen = set()
+        while True:
+            current = max(range(len(terms)), key=bounds.__getitem__)
+            if not bounds[current]:
+                break
+            if len(top) == limit and add_up(bounds) < top[0][0]:
+                break
+
+            weight, group = queues[current][positions[current]]
+            positions[current] += 1
+            queue = queues[current]
+            bounds[current] = queue[positions[current]][0] if positions[current] < len(queue) else 0.0
+            bound = add_up(weight if index == current else bounds[index] for index in range(len(terms)))
+
+            for book_id in group:
+                if book_id in seen:
+                    continue
+                # IDs ascend, so later books in the group lose every tie
+                if len(top) == limit and (bound, -book_id) < top[0]:
+                    break
+                seen.add(book_id)
+                length = lengths[book_id]
+                score = 0.0
+                for postings, term_weights in zip(postings_list, weights):
+                    frequency = postings.get(book_id)
+                    if frequency:
+                        score += term_weights[frequency, length]
+                entry = (score, -book_id)
+                if len(top) < limit:
+                    heapq.heappush(top, entry)
+                elif entry > top[0]:
+                    heapq.heapreplace(top, entry)
+
+        return [(-book_id, score) for score, book_id in sorted(top, reverse=True)]
+
+    def _expand(self, prefix):
+        terms = []
+        index = bisect_left(self._terms, prefix)
+        while index < len(self._terms) and len(terms) < MAX_PREFIX_EXPANSION:
+            term = self._terms[index]
+            if not term.startswith(prefix):
+                break
+            terms.append(term)
+            index += 1
+        return terms
+
+    def _tokens(self, book):
+        tokens = []
+        for field in self.fields:
+            tokens.extend(tokenize(book.get(field)))
+        return tokens
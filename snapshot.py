@@ -0,0 +1,159 @@
+import os
+import struct
+import threading
+import traceback
+
+from wal import STRING_FIELDS, STRING_LENGTH
+
+# A snapshot is a header (magic, next free ID, record count) followed by one
+# record per book: id, year, revision and modified time, then the three
+# length-prefixed UTF-8 strings in STRING_FIELDS order.
+MAGIC = b"BKSNAP01"
+HEADER = struct.Struct("<8sqq")
+RECORD = struct.Struct("<qiId")
+
+# Bytes handed to each write() while streaming a snapshot to disk
+WRITE_BUFFER_SIZE = 1024 * 1024
+
+
+class SnapshotError(Exception):
+    """Raised when a file is not a valid catalog snapshot"""
+
+
+def write_snapshot(path, books, revisions, next_id):
+    """Write a catalog snapshot to `path`, replacing it atomically
+
+    The data goes to a temporary file that is fsynced and then renamed over
+    `path`, so readers and a crash mid-write only ever see a whole snapshot.
+    """
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, next_id, len(books)))
+        pack_record = RECORD.pack
+        pack_length = STRING_LENGTH.pack
+        buffer = []
+        size = 0
+        for book_id in sorted(books):
+            book = books[book_id]
+            revision, modified = revisions[book_id]
+            buffer.append(pack_record(book_id, book["year"], revision, modified))
+            for field in STRING_FIELDS:
+                data = str(book[field]).encode("utf-8")
+                buffer.append(pack_length(len(data)))
+                buffer.append(data)
+                size += len(data)
+            size += RECORD.size + 3 * STRING_LENGTH.size
+            if size >= WRITE_BUFFER_SIZE:
+                f.write(b"".join(buffer))
+                buffer.clear()
+                size = 0
+        f.write(b"".join(buffer))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    fsync_directory(path)
+
+
+def read_snapshot(path):
+    """Return (next_id, [(book, revision, modified), ...]) from a snapshot
+
+    Returns None when there is no snapshot at `path`.
+    """
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except FileNotFoundError:
+        return None
+    if len(data) < HEADER.size:
+        raise SnapshotError(f"{path} is truncated")
+    magic, next_id, count = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise SnapshotError(f"{path} is not a catalog snapshot")
+
+    unpack_record = RECORD.unpack_from
+    unpack_length = STRING_LENGTH.unpack_from
+    records = []
+    offset = HEADER.size
+    try:
+        for _ in range(count):
+            book_id, year, revision, modified = unpack_record(data, offset)
+            offset += RECORD.size
+            book = {"id": book_id}
+            for field in STRING_FIELDS:
+                (length,) = unpack_length(data, offset)
+                offset += STRING_LENGTH.size
+                book[field] = data[offset:offset + length].decode("utf-8")
+                offset += length
+            book["year"] = year
+            records.append((book, revision, modified))
+    except struct.error:
+        raise SnapshotError(f"{path} is truncated") from None
+    return next_id, records
+
+
+def fsync_directory(path):
+    """Make a rename inside the directory holding `path` durable"""
+    fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class Snapshotter:
+    """Periodically snapshots a store and compacts its write-ahead log
+
+    Every `interval` seconds, if at least `min_records` mutations have been
+    logged since the last snapshot, the catalog is captured and the log is
+    rotated under the store's write lock, which only costs a dict copy and
+    one fsync. The snapshot itself is written in the background; once it is
+    in place the rotated log segment is no longer needed and is removed.
+    """
+
+    def __init__(self, store, log, path, interval=300.0, min_records=1):
+        self.store = store
+        self.log = log
+        self.path = path
+        self.interval = interval
+        self.min_records = min_records
+        self._stop = threading.Event()
+        self._thread = None
+
+    def load(self):
+        """Restore the store from the snapshot, if one exists; return its size"""
+        snapshot = read_snapshot(self.path)
+        if snapshot is None:
+            return 0
+        next_id, records = snapshot
+        self.store.restore(records, next_id)
+        return len(records)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="snapshotter", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def snapshot(self):
+        """Write a snapshot now and drop the log it makes redundant"""
+        with self.store.write_lock():
+            books, revisions, next_id = self.store.dump()
+            self.log.rotate()
+        write_snapshot(self.path, books, revisions, next_id)
+        self.log.discard_previous()
+        return len(books)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            if self.log.segment_records < self.min_records:
+                continue
+            try:
+                self.snapshot()
+            except Exception:
+                # The log still holds everything, so just try again next time;
+                # letting the error escape would end snapshots for good
+                print(f"Snapshot to {self.path} failed:")
+                traceback.print_exc()
@@ -0,0 +1,30 @@
+import importlib
+from importlib.machinery import EXTENSION_SUFFIXES
+
+# Package -> module that is a compiled extension when the accelerated build
+# is installed, and a pure-Python fallback (or missing) otherwise
+ACCELERATED_MODULES = {
+    "markupsafe": "markupsafe._speedups",
+    "charset_normalizer": "charset_normalizer.md",
+}
+
+
+def is_compiled(module_name):
+    """Whether a module imports from a native extension; None if not installed"""
+    package = module_name.split(".")[0]
+    try:
+        importlib.import_module(package)
+    except ImportError:
+        return None
+    try:
+        module = importlib.import_module(module_name)
+    except ImportError:
+        # e.g. only a Windows .pyd is present on Linux
+        return False
+    path = getattr(module, "__file__", None) or ""
+    return path.endswith(tuple(EXTENSION_SUFFIXES))
+
+
+def check_speedups():
+    """Report which accelerated modules actually loaded"""
+    return {package: is_compiled(module) for package, module in ACCELERATED_MODULES.items()}
@@ -0,0 +1,331 @@
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from indexes import normalize
+from search import tokenize
+from storage import REQUEST_KEY_TTL, RevisionMismatch, Storage
+
+# Books fetched per query while iterating the catalog
+ITER_CHUNK_SIZE = 1000
+
+# Statements each connection keeps compiled; every query below is a fixed
+# string (find(), count() and page() have at most 16 shapes each), so they
+# all stay prepared
+STATEMENT_CACHE_SIZE = 256
+
+BOOK_COLUMNS = ("id", "title", "author", "genre", "year")
+SELECT_BOOK = "SELECT id, title, author, genre, year FROM books"
+
+# author_key / genre_key hold the casefolded values the filters compare, so
+# the indexes serve case-insensitive lookups. The FTS5 table indexes titles
+# and authors for search() and is kept in step by triggers, as is the book
+# count in the single-row catalog table.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS books (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    title TEXT NOT NULL,
+    author TEXT NOT NULL,
+    genre TEXT NOT NULL,
+    year INTEGER NOT NULL,
+    author_key TEXT NOT NULL,
+    genre_key TEXT NOT NULL,
+    revision INTEGER NOT NULL,
+    modified REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS books_author ON books (author_key, id);
+CREATE INDEX IF NOT EXISTS books_genre ON books (genre_key, id);
+CREATE INDEX IF NOT EXISTS books_year ON books (year, id);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS books_fts USING fts5(
+    title, author, content='books', content_rowid='id',
+    tokenize='unicode61 remove_diacritics 0'
+);
+
+CREATE TABLE IF NOT EXISTS catalog (
+    id INTEGER PRIMARY KEY CHECK (id = 0),
+    version INTEGER NOT NULL,
+    last_modified REAL NOT NULL,
+    book_count INTEGER NOT NULL
+);
+
+-- Keys of idempotent add() calls, dropped once older than REQUEST_KEY_TTL
+CREATE TABLE IF NOT EXISTS request_keys (
+    key TEXT PRIMARY KEY,
+    created REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS request_keys_created ON request_keys (created);
+
+CREATE TRIGGER IF NOT EXISTS books_insert AFTER INSERT ON books BEGIN
+    INSERT INTO books_fts (rowid, title, author) VALUES (new.id, new.title, new.author);
+    UPDATE catalog SET book_count = book_count + 1;
+END;
+CREATE TRIGGER IF NOT EXISTS books_delete AFTER DELETE ON books BEGIN
+    INSERT INTO books_fts (books_fts, rowid, title, author) VALUES ('delete', old.id, old.title, old.author);
+    UPDATE catalog SET book_count = book_count - 1;
+END;
+CREATE TRIGGER IF NOT EXISTS books_update AFTER UPDATE OF title, author ON books BEGIN
+    INSERT INTO books_fts (books_fts, rowid, title, author) VALUES ('delete', old.id, old.title, old.author);
+    INSERT INTO books_fts (rowid, title, author) VALUES (new.id, new.title, new.author);
+END;
+"""
+
+INSERT_BOOK = (
+    "INSERT INTO books (title, author, genre, year, author_key, genre_key, revision, modified)"
+    " VALUES (?, ?, ?, ?, ?, ?, 1, ?)"
+)
+LOAD_BOOK = (
+    "INSERT INTO books (id, title, author, genre, year, author_key, genre_key, revision, modified)"
+    " VALUES (?, ?, ?, ?, ?, ?, ?, 1, ?)"
+)
+UPDATE_BOOK = (
+    "UPDATE books SET title = ?, author = ?, genre = ?, year = ?, author_key = ?, genre_key = ?,"
+    " revision = revision + 1, modified = ? WHERE id = ?"
+)
+TOUCH = "UPDATE catalog SET version = version + 1, last_modified = ?"
+# Rank inside the FTS table first so only the top matches are joined
+SEARCH = (
+    "SELECT b.id, b.title, b.author, b.genre, b.year, -m.score FROM ("
+    "SELECT rowid, bm25(books_fts) AS score FROM books_fts WHERE books_fts MATCH ?"
+    " ORDER BY score, rowid LIMIT ?"
+    ") AS m JOIN books AS b ON b.id = m.rowid ORDER BY m.score, b.id"
+)
+
+
+def book_row(book):
+    """Return the column values stored for a book, after any ID"""
+    return (
+        book["title"], book["author"], book["genre"], book["year"],
+        normalize(book["author"]), normalize(book["genre"]),
+    )
+
+
+def filter_clauses(author, genre, year_from, year_to):
+    """Return the WHERE conditions and parameters for find()'s filters"""
+    clauses = []
+    params = []
+    if author is not None:
+        clauses.append("author_key = ?")
+        params.append(normalize(author))
+    if genre is not None:
+        clauses.append("genre_key = ?")
+        params.append(normalize(genre))
+    if year_from is not None:
+        clauses.append("year >= ?")
+        params.append(year_from)
+    if year_to is not None:
+        clauses.append("year <= ?")
+        params.append(year_to)
+    return clauses, params
+
+
+def fts_query(query):
+    """Translate a search() query into an FTS5 expression, or None"""
+    terms = []
+    for word in query.split():
+        suffix = "*" if word.endswith("*") else ""
+        terms.extend(f'"{token}"{suffix}' for token in tokenize(word))
+    return " OR ".join(terms) or None
+
+
+class SqliteStore(Storage):
+    """Book catalog kept in a SQLite database file
+
+    Each thread gets its own connection, opened on first use, so reads run
+    in parallel under WAL journaling while writers queue on SQLite's own
+    lock. Every method is a single statement or transaction; write_lock()
+    and read_lock() wrap several calls in one IMMEDIATE or read transaction
+    and nest, so methods called inside them join the outer transaction.
+    """
+
+    def __init__(self, path, synchronous="FULL"):
+        self.path = path
+        self.synchronous = synchronous
+        self._local = threading.local()
+        self._connections = []
+        self._connections_lock = threading.Lock()
+
+        conn = self._connection()
+        self.created = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'books'"
+        ).fetchone() is None
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.executescript(SCHEMA)
+        conn.execute("INSERT OR IGNORE INTO catalog VALUES (0, 0, ?, 0)", (time.time(),))
+
+    def close(self):
+        """Close every thread's connection"""
+        with self._connections_lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections = []
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, "connection", None)
+        if conn is None:
+            conn = sqlite3.connect(
+                self.path, isolation_level=None, check_same_thread=False,
+                cached_statements=STATEMENT_CACHE_SIZE,
+            )
+            conn.execute(f"PRAGMA synchronous = {self.synchronous}")
+            self._local.connection = conn
+            self._local.depth = 0
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+
+    @contextmanager
+    def _transaction(self, begin):
+        conn = self._connection()
+        local = self._local
+        if local.depth:
+            local.depth += 1
+            try:
+                yield conn
+            finally:
+                local.depth -= 1
+            return
+
+        conn.execute(begin)
+        local.depth = 1
+        try:
+            yield conn
+        except BaseException:
+            local.depth = 0
+            conn.execute("ROLLBACK")
+            raise
+        local.depth = 0
+        conn.execute("COMMIT")
+
+    def read_lock(self):
+        return self._transaction("BEGIN")
+
+    def write_lock(self):
+        return self._transaction("BEGIN IMMEDIATE")
+
+    @property
+    def version(self):
+        return self._connection().execute("SELECT version FROM catalog").fetchone()[0]
+
+    @property
+    def last_modified(self):
+        return self._connection().execute("SELECT last_modified FROM catalog").fetchone()[0]
+
+    def __len__(self):
+        return self._connection().execute("SELECT book_count FROM catalog").fetchone()[0]
+
+    def __contains__(self, book_id):
+        return self._connection().execute("SELECT 1 FROM books WHERE id = ?", (book_id,)).fetchone() is not None
+
+    def __iter__(self):
+        after = None
+        while True:
+            chunk, after = self.page(after=after, limit=ITER_CHUNK_SIZE)
+            yield from chunk
+            if after is None:
+                return
+
+    def get(self, book_id):
+        row = self._connection().execute(SELECT_BOOK + " WHERE id = ?", (book_id,)).fetchone()
+        return None if row is None else dict(zip(BOOK_COLUMNS, row))
+
+    def revision(self, book_id):
+        return self._connection().execute(
+            "SELECT revision, modified FROM books WHERE id = ?", (book_id,)
+        ).fetchone()
+
+    def find(self, author=None, genre=None, year_from=None, year_to=None):
+        clauses, params = filter_clauses(author, genre, year_from, year_to)
+        sql = "SELECT id FROM books"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        rows = self._connection().execute(sql + " ORDER BY id", params)
+        return [book_id for book_id, in rows]
+
+    def count(self, author=None, genre=None, year_from=None, year_to=None):
+        clauses, params = filter_clauses(author, genre, year_from, year_to)
+        if not clauses:
+            return len(self)
+        sql = "SELECT COUNT(*) FROM books WHERE " + " AND ".join(clauses)
+        return self._connection().execute(sql, params).fetchone()[0]
+
+    def page(self, after=None, offset=0, limit=100, author=None, genre=None, year_from=None, year_to=None):
+        # The filters go into the query itself, so a page never needs more
+        # than a fixed handful of parameters however many books match
+        clauses, params = filter_clauses(author, genre, year_from, year_to)
+        clauses.insert(0, "id > ?")
+        params.insert(0, after if after is not None else -1)
+        rows = self._connection().execute(
+            SELECT_BOOK + " WHERE " + " AND ".join(clauses) + " ORDER BY id LIMIT ? OFFSET ?",
+            params + [limit + 1, offset],
+        ).fetchall()
+        books = [dict(zip(BOOK_COLUMNS, row)) for row in rows]
+
+        if len(books) > limit:
+            return books[:limit], books[limit - 1]["id"]
+        return books, None
+
+    def search(self, query, limit=20):
+        match = fts_query(query)
+        if match is None:
+            return []
+        rows = self._connection().execute(SEARCH, (match, limit))
+        return [(dict(zip(BOOK_COLUMNS, row[:5])), row[5]) for row in rows]
+
+    def add(self, fields, key=None):
+        with self.write_lock() as conn:
+            now = time.time()
+            if key is not None:
+                # The key is stored in the same transaction as the book
+                conn.execute("DELETE FROM request_keys WHERE created < ?", (now - REQUEST_KEY_TTL,))
+                if not conn.execute("INSERT OR IGNORE INTO request_keys VALUES (?, ?)", (key, now)).rowcount:
+                    return None
+            book_id = conn.execute(INSERT_BOOK, book_row(fields) + (now,)).lastrowid
+            conn.execute(TOUCH, (now,))
+        book = {"id": book_id}
+        book.update(fields)
+        return book
+
+    def add_many(self, fields_list):
+        with self.write_lock():
+            return [self.add(fields) for fields in fields_list]
+
+    def update(self, book_id, changes, expected_revision=None):
+        with self.write_lock() as conn:
+            book = self.get(book_id)
+            if book is None:
+                return None
+            self._check_revision(book_id, expected_revision)
+            book.update(changes)
+            now = time.time()
+            conn.execute(UPDATE_BOOK, book_row(book) + (now, book_id))
+            conn.execute(TOUCH, (now,))
+        return book
+
+    def delete(self, book_id, expected_revision=None):
+        with self.write_lock() as conn:
+            book = self.get(book_id)
+            if book is None:
+                return None
+            self._check_revision(book_id, expected_revision)
+            conn.execute("DELETE FROM books WHERE id = ?", (book_id,))
+            conn.execute(TOUCH, (time.time(),))
+        return book
+
+    def load(self, books):
+        with self.write_lock() as conn:
+            now = time.time()
+            conn.execute("DELETE FROM books")
+            conn.executemany(LOAD_BOOK, (
+                (book["id"],) + book_row(book) + (now,) for book in books
+            ))
+            conn.execute(TOUCH, (now,))
+
+    def _check_revision(self, book_id, expected_revision):
+        if expected_revision is None:
+            return
+        revision, modified = self.revision(book_id)
+        if revision != expected_revision:
+            raise RevisionMismatch(book_id, revision, modified)
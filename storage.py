@@ -0,0 +1,117 @@
+# How long add() remembers a request key: the longest time SQS keeps a
+# message, and so the latest it can be delivered again
+REQUEST_KEY_TTL = 14 * 24 * 3600
+
+
+class RevisionMismatch(Exception):
+    """Raised when a conditional write finds a newer revision of a book"""
+
+    def __init__(self, book_id, revision, modified):
+        super().__init__(f"Book with ID {book_id} is at revision {revision}")
+        self.book_id = book_id
+        self.revision = revision
+        self.modified = modified
+
+
+class Storage:
+    """Catalog operations the routes in app.py rely on
+
+    Implemented by BookStore (in memory), SqliteStore and DynamoStore;
+    app.py picks one with the STORAGE_BACKEND setting. Books are dicts with id, title,
+    author, genre and year. Returned records must not be modified by the
+    caller.
+
+    `version` is a catalog-wide counter bumped by every mutation, and
+    `last_modified` the time of the latest one; they back the ETag and
+    Last-Modified of the book listing.
+    """
+
+    version = 0
+    last_modified = 0.0
+
+    def __len__(self):
+        raise NotImplementedError
+
+    def __contains__(self, book_id):
+        raise NotImplementedError
+
+    def __iter__(self):
+        """Iterate over book records in ID order without holding a lock throughout"""
+        raise NotImplementedError
+
+    def read_lock(self):
+        """Context manager giving a consistent view across several reads"""
+        raise NotImplementedError
+
+    def write_lock(self):
+        """Context manager making several writes atomic, e.g. validate then apply"""
+        raise NotImplementedError
+
+    def get(self, book_id):
+        """Return the book with the given ID, or None"""
+        raise NotImplementedError
+
+    def revision(self, book_id):
+        """Return the (revision, modified time) of a book, or None"""
+        raise NotImplementedError
+
+    def find(self, author=None, genre=None, year_from=None, year_to=None):
+        """Return the ascending IDs of books matching every given filter
+
+        Author and genre compare case-insensitively; the year range is
+        inclusive.
+        """
+        raise NotImplementedError
+
+    def count(self, author=None, genre=None, year_from=None, year_to=None):
+        """Return how many books match every given filter, as len(find()) would"""
+        raise NotImplementedError
+
+    def page(self, after=None, offset=0, limit=100, author=None, genre=None, year_from=None, year_to=None):
+        """Return up to `limit` books with IDs above `after`, skipping `offset`
+
+        The filters restrict the listing to the books find() would return.
+        The second value is the cursor for the following page, or None when
+        this page reaches the end of the listing.
+        """
+        raise NotImplementedError
+
+    def search(self, query, limit=20):
+        """Return up to `limit` (book, score) pairs for a full-text query
+
+        Query words match title and author tokens; a trailing `*` makes a
+        word a prefix match. Best match first.
+        """
+        raise NotImplementedError
+
+    def add(self, fields, key=None):
+        """Store a new book under the next free ID and return it
+
+        `key`, e.g. the ID of the queue message asking for the book, makes
+        the add idempotent: repeating a key seen within REQUEST_KEY_TTL
+        seconds stores nothing and returns None.
+        """
+        raise NotImplementedError
+
+    def add_many(self, fields_list):
+        """Store several new books in order and return them"""
+        raise NotImplementedError
+
+    def update(self, book_id, changes, expected_revision=None):
+        """Apply a partial update to a book and return it, or None
+
+        With `expected_revision`, raise RevisionMismatch instead of writing
+        if the book has moved on to another revision.
+        """
+        raise NotImplementedError
+
+    def delete(self, book_id, expected_revision=None):
+        """Remove a book and return it, or None
+
+        `expected_revision` works as in update().
+        """
+        raise NotImplementedError
+
+    def load(self, books):
+        """Replace the whole catalog with existing records, keeping their IDs"""
+        raise NotImplementedError
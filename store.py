@@ -0,0 +1,404 @@
+import functools
+import time
+from bisect import bisect_left, bisect_right, insort
+
+from indexes import HashIndex, SortedIndex, normalize
+from locks import ReadWriteLock
+from storage import REQUEST_KEY_TTL, RevisionMismatch, Storage
+
+# Books copied out per read-lock acquisition while iterating the catalog
+ITER_CHUNK_SIZE = 1000
+
+
+def reading(method):
+    """Run a BookStore method under the store's shared read lock"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock.read():
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+def writing(method):
+    """Run a BookStore method under the store's exclusive write lock"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock.write():
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+class BookStore(Storage):
+    """In-memory book catalog keyed by ID
+
+    Safe to share between threads. Writers hold an exclusive lock; scans
+    share a read lock. Records are never modified in place, since updates
+    swap in a new dict. Single-record reads therefore need no lock and
+    always see a consistent book.
+    """
+
+    def __init__(self, books=(), next_id=None):
+        self._lock = ReadWriteLock()
+
+        # id -> book record, plus the ascending ID sequence used for listing.
+        # Deleted IDs stay in the sequence until enough of them pile up to
+        # make a compaction pass worthwhile, so deletes never shift the list.
+        self._books = {}
+        self._ids = []
+        self._stale = 0
+        self.next_id = 1
+
+        # Catalog-wide version bumped by every mutation, and per-book
+        # (revision, modified time) pairs, used for ETags and Last-Modified
+        self.version = 0
+        self.last_modified = time.time()
+        self._revisions = {}
+
+        # Secondary indexes kept in step with every add, update and delete
+        self.authors = HashIndex("author")
+        self.genres = HashIndex("genre")
+        self.years = SortedIndex("year")
+        self._indexes = [self.authors, self.genres, self.years]
+
+        # Index answering search(), if one has been attached
+        self._search_index = None
+
+        # Optional journal (e.g. a WriteAheadLog) told about every mutation
+        self._journal = None
+
+        # Request keys passed to add(), oldest first, with the time each was
+        # used. Like the rest of the store they only last as long as the
+        # process; they are neither journaled nor snapshotted.
+        self._request_keys = {}
+
+        for book in books:
+            self._insert(dict(book))
+
+        if next_id is not None:
+            self.next_id = next_id
+
+    def __len__(self):
+        return len(self._books)
+
+    def __contains__(self, book_id):
+        return book_id in self._books
+
+    def __iter__(self):
+        """Iterate over book records in ID order
+
+        The read lock is only held while each chunk is copied out, so a
+        slow consumer does not hold off writers.
+        """
+        after = None
+        while True:
+            chunk, after = self.page(after=after, limit=ITER_CHUNK_SIZE)
+            yield from chunk
+            if after is None:
+                return
+
+    def read_lock(self):
+        """Hold the read lock, e.g. while querying an attached index"""
+        return self._lock.read()
+
+    def write_lock(self):
+        """Hold the write lock across several calls, e.g. validate then apply"""
+        return self._lock.write()
+
+    @writing
+    def attach_journal(self, journal):
+        """Record every later mutation with journal.put(book, revision, modified) / journal.delete(id)"""
+        self._journal = journal
+
+    @writing
+    def add_index(self, index):
+        """Attach another index and populate it from the current catalog"""
+        for book in self._live_books():
+            index.add(book)
+        self._indexes.append(index)
+        if self._search_index is None and hasattr(index, "search"):
+            self._search_index = index
+
+    @reading
+    def find(self, author=None, genre=None, year_from=None, year_to=None):
+        """Return the ascending IDs of books matching every given filter"""
+        candidates = []
+        if author is not None:
+            candidates.append(self.authors.lookup(author))
+        if genre is not None:
+            candidates.append(self.genres.lookup(genre))
+        by_year = year_from is not None or year_to is not None
+        if not candidates and not by_year:
+            return [book["id"] for book in self._live_books()]
+
+        # Walk the smallest candidate set and check the rest against the
+        # records themselves, so the cost follows the result size. The year
+        # range is only counted unless it is the smallest, as listing it
+        # can cost as much as the whole catalog.
+        smallest = min(candidates, key=len) if candidates else None
+        if by_year and (smallest is None or self.years.count(year_from, year_to) < len(smallest)):
+            smallest = self.years.range(year_from, year_to)
+        author_key = normalize(author)
+        genre_key = normalize(genre)
+        result = []
+        for book_id in smallest:
+            book = self._books[book_id]
+            if author is not None and normalize(book["author"]) != author_key:
+                continue
+            if genre is not None and normalize(book["genre"]) != genre_key:
+                continue
+            if year_from is not None and book["year"] < year_from:
+                continue
+            if year_to is not None and book["year"] > year_to:
+                continue
+            result.append(book_id)
+        result.sort()
+        return result
+
+    @reading
+    def count(self, author=None, genre=None, year_from=None, year_to=None):
+        """Return how many books match every given filter, as len(find()) would"""
+        by_year = year_from is not None or year_to is not None
+        if author is None and genre is None:
+            return self.years.count(year_from, year_to) if by_year else len(self._books)
+        if not by_year and (author is None or genre is None):
+            index = self.authors if genre is None else self.genres
+            return len(index.lookup(genre if author is None else author))
+        return len(self.find(author=author, genre=genre, year_from=year_from, year_to=year_to))
+
+    @reading
+    def page(self, after=None, offset=0, limit=100, author=None, genre=None, year_from=None, year_to=None):
+        """Return up to `limit` books with IDs above `after`, skipping `offset`
+
+        The filters restrict the listing to the books find() would return.
+        The second value is the cursor for the following page, or None when
+        this page reaches the end of the listing.
+        """
+        if author is None and genre is None and year_from is None and year_to is None:
+            ids = self._ids
+        else:
+            ids = self.find(author=author, genre=genre, year_from=year_from, year_to=year_to)
+        books = self._books
+        start = bisect_right(ids, after) if after is not None else 0
+
+        result = []
+        for index in range(start, len(ids)):
+            book = books.get(ids[index])
+            if book is None:
+                continue
+            if offset:
+                offset -= 1
+                continue
+            if len(result) == limit:
+                return result, result[-1]["id"]
+            result.append(book)
+        return result, None
+
+    @reading
+    def search(self, query, limit=20):
+        """Return up to `limit` (book, score) pairs from the attached SearchIndex"""
+        if self._search_index is None:
+            return []
+        matches = self._search_index.search(query, limit=limit)
+        return [(self._books[book_id], score) for book_id, score in matches]
+
+    def get(self, book_id):
+        """Return the book with the given ID, or None"""
+        return self._books.get(book_id)
+
+    def revision(self, book_id):
+        """Return the (revision, modified time) of a book, or None"""
+        return self._revisions.get(book_id)
+
+    @writing
+    def add(self, fields, key=None):
+        """Store a new book under the next free ID and return it
+
+        A repeated `key` stores nothing and returns None.
+        """
+        if key is not None and key in self._request_keys:
+            return None
+        book = {"id": self.next_id}
+        book.update(fields)
+        self._insert(book)
+        if key is not None:
+            self._remember_request_key(key)
+        return book
+
+    @writing
+    def put(self, book, revision=None, modified=None):
+        """Insert a record under its own ID, replacing any existing one
+
+        With the `revision` and `modified` time a journal logged, the record
+        keeps them instead of counting as a new revision.
+        """
+        book = dict(book)
+        if book["id"] in self._books:
+            book = self.update(book["id"], book)
+        else:
+            self._insert(book)
+        if revision is not None:
+            self._revisions[book["id"]] = (revision, modified)
+        return book
+
+    @writing
+    def load(self, books):
+        """Replace the whole catalog with existing records, keeping their IDs
+
+        Like restore(), indexes are rebuilt in one pass. Every loaded book
+        starts at revision 1; a journal is told about the replacement once
+        the new catalog is in place.
+        """
+        removed = list(self._books)
+        now = time.time()
+        self._replace([(dict(book), 1, now) for book in books], self.next_id)
+        if self._journal is not None:
+            for book_id in removed:
+                self._journal.delete(book_id)
+            for book_id in self._ids:
+                self._journal.put(self._books[book_id], *self._revisions[book_id])
+
+    @writing
+    def restore(self, records, next_id):
+        """Replace the whole catalog with (book, revision, modified) records
+
+        Used to load a snapshot before a journal is attached; indexes are
+        rebuilt in one pass instead of record by record, and nothing is
+        journaled.
+        """
+        self._replace(records, next_id)
+
+    def _replace(self, records, next_id):
+        books = {book["id"]: book for book, _, _ in records}
+        if len(books) != len(records):
+            raise KeyError("Duplicate book IDs in the new catalog")
+        self._books = books
+        self._ids = sorted(books)
+        self._stale = 0
+        self._revisions = {book["id"]: (revision, modified) for book, revision, modified in records}
+        for index in self._indexes:
+            index.rebuild(books.values())
+        self.next_id = max(next_id, self._ids[-1] + 1 if self._ids else 1)
+        self._touch()
+
+    @reading
+    def dump(self):
+        """Return copies of the (book map, revision map, next ID) for a snapshot
+
+        Records are never modified in place, so shallow copies stay a
+        consistent view of this moment after the lock is released.
+        """
+        return dict(self._books), dict(self._revisions), self.next_id
+
+    @writing
+    def add_many(self, fields_list):
+        """Store several new books in order and return them"""
+        return [self.add(fields) for fields in fields_list]
+
+    @writing
+    def update(self, book_id, changes, expected_revision=None):
+        """Apply a partial update to a book and return it, or None
+
+        With `expected_revision`, raise RevisionMismatch instead of writing
+        if the book has moved on to another revision.
+        """
+        book = self._books.get(book_id)
+        if book is None:
+            return None
+        self._check_revision(book_id, expected_revision)
+
+        affected = [
+            index for index in self._indexes
+            if any(field in changes and changes[field] != book.get(field) for field in index.fields)
+        ]
+        for index in affected:
+            index.remove(book)
+        book = dict(book)
+        book.update(changes)
+        self._books[book_id] = book
+        for index in affected:
+            index.add(book)
+
+        self._revisions[book_id] = (self._revisions[book_id][0] + 1, self._touch())
+        if self._journal is not None:
+            self._journal.put(book, *self._revisions[book["id"]])
+        return book
+
+    @writing
+    def delete(self, book_id, expected_revision=None):
+        """Remove a book and return it, or None
+
+        `expected_revision` works as in update().
+        """
+        if book_id not in self._books:
+            return None
+        self._check_revision(book_id, expected_revision)
+        book = self._books.pop(book_id)
+        for index in self._indexes:
+            index.remove(book)
+        del self._revisions[book_id]
+        self._touch()
+        if self._journal is not None:
+            self._journal.delete(book_id)
+
+        self._stale += 1
+        if self._stale > len(self._books):
+            self._compact()
+        return book
+
+    def _insert(self, book):
+        book_id = book["id"]
+        if book_id in self._books:
+            raise KeyError(f"Book with ID {book_id} already exists")
+
+        self._books[book_id] = book
+        for index in self._indexes:
+            index.add(book)
+        if not self._ids or book_id > self._ids[-1]:
+            self._ids.append(book_id)
+        else:
+            index = bisect_left(self._ids, book_id)
+            if index < len(self._ids) and self._ids[index] == book_id:
+                # Re-inserting a deleted ID reuses its stale slot
+                self._stale -= 1
+            else:
+                insort(self._ids, book_id)
+
+        if book_id >= self.next_id:
+            self.next_id = book_id + 1
+        self._revisions[book_id] = (1, self._touch())
+        if self._journal is not None:
+            self._journal.put(book, *self._revisions[book["id"]])
+
+    def _remember_request_key(self, key):
+        keys = self._request_keys
+        now = time.time()
+        while keys:
+            oldest = next(iter(keys))
+            if keys[oldest] > now - REQUEST_KEY_TTL:
+                break
+            del keys[oldest]
+        keys[key] = now
+
+    def _live_books(self):
+        books = self._books
+        for book_id in self._ids:
+            book = books.get(book_id)
+            if book is not None:
+                yield book
+
+    def _check_revision(self, book_id, expected_revision):
+        if expected_revision is None:
+            return
+        revision, modified = self._revisions[book_id]
+        if revision != expected_revision:
+            raise RevisionMismatch(book_id, revision, modified)
+
+    def _touch(self):
+        self.version += 1
+        self.last_modified = time.time()
+        return self.last_modified
+
+    def _compact(self):
+        books = self._books
+        self._ids = [book_id for book_id in self._ids if book_id in books]
+        self._stale = 0
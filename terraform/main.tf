@@ -10,6 +10,8 @@ provider "aws" {
     apigateway     = "http://localhost:4566"
     lambda         = "http://localhost:4566"
     iam            = "http://localhost:4566"
+    sqs            = "http://localhost:4566"
+    dynamodb       = "http://localhost:4566"
   }
 }
 
@@ -29,6 +31,55 @@ resource "aws_iam_role" "lambda_exec_role" {
   })
 }
 
+# Persistent catalog shared by every Lambda container: books are partitioned
+# by ID range (pk) and sorted by ID, see dynamo_store.py
+resource "aws_dynamodb_table" "books" {
+  name         = "library-books"
+  billing_mode = "PAY_PER_REQUEST"
+  hash_key     = "pk"
+  range_key    = "id"
+
+  attribute {
+    name = "pk"
+    type = "S"
+  }
+
+  attribute {
+    name = "id"
+    type = "N"
+  }
+
+  # Expires the records of idempotent queue writes
+  ttl {
+    attribute_name = "expires"
+    enabled        = true
+  }
+}
+
+resource "aws_iam_role_policy" "lambda_dynamodb" {
+  name = "library-books-access"
+  role = aws_iam_role.lambda_exec_role.id
+  policy = jsonencode({
+    Version = "2012-10-17"
+    Statement = [
+      {
+        Effect = "Allow"
+        Action = [
+          "dynamodb:GetItem",
+          "dynamodb:PutItem",
+          "dynamodb:UpdateItem",
+          "dynamodb:DeleteItem",
+          "dynamodb:Query",
+          "dynamodb:Scan",
+          "dynamodb:BatchGetItem",
+          "dynamodb:BatchWriteItem",
+        ]
+        Resource = aws_dynamodb_table.books.arn
+      }
+    ]
+  })
+}
+
 resource "aws_lambda_function" "library_api" {
   filename         = "lambda.zip"
   function_name    = "library-api"
@@ -38,10 +89,69 @@ resource "aws_lambda_function" "library_api" {
   source_code_hash = filebase64sha256("lambda.zip")
   timeout         = 30
   memory_size     = 256
+
+  environment {
+    variables = {
+      COMPRESS_RESPONSES = "1"
+      STORAGE_BACKEND    = "dynamodb"
+      DYNAMODB_TABLE     = aws_dynamodb_table.books.name
+    }
+  }
+}
+
+resource "aws_iam_role_policy_attachment" "lambda_sqs" {
+  role       = aws_iam_role.lambda_exec_role.name
+  policy_arn = "arn:aws:iam::aws:policy/service-role/AWSLambdaSQSQueueExecutionRole"
+}
+
+# Writes that keep failing with store errors end up here after
+# maxReceiveCount attempts instead of being retried forever
+resource "aws_sqs_queue" "catalog_writes_dlq" {
+  name                      = "library-catalog-writes-dlq"
+  message_retention_seconds = 1209600
+}
+
+# Bulk catalog writes arrive as batches of queue messages
+resource "aws_sqs_queue" "catalog_writes" {
+  name                       = "library-catalog-writes"
+  visibility_timeout_seconds = 60
+  redrive_policy = jsonencode({
+    deadLetterTargetArn = aws_sqs_queue.catalog_writes_dlq.arn
+    maxReceiveCount     = 5
+  })
+}
+
+resource "aws_lambda_function" "catalog_writer" {
+  filename         = "lambda.zip"
+  function_name    = "library-catalog-writer"
+  handler          = "queue_handler.handler"
+  runtime          = "python3.8"
+  role            = aws_iam_role.lambda_exec_role.arn
+  source_code_hash = filebase64sha256("lambda.zip")
+  timeout         = 30
+  memory_size     = 256
+
+  environment {
+    variables = {
+      STORAGE_BACKEND = "dynamodb"
+      DYNAMODB_TABLE  = aws_dynamodb_table.books.name
+    }
+  }
+}
+
+resource "aws_lambda_event_source_mapping" "catalog_writes" {
+  event_source_arn                   = aws_sqs_queue.catalog_writes.arn
+  function_name                      = aws_lambda_function.catalog_writer.arn
+  batch_size                         = 500
+  maximum_batching_window_in_seconds = 5
+  function_response_types            = ["ReportBatchItemFailures"]
 }
 
 resource "aws_api_gateway_rest_api" "api" {
   name = "library-api"
+
+  # Let the Lambda return base64-encoded binary and gzip-compressed bodies
+  binary_media_types = ["*/*"]
 }
 
 resource "aws_api_gateway_resource" "proxy" {
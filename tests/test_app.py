@@ -1,6 +1,9 @@
 import pytest
 import sys
 import os
+import gzip
+import json
+import time
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 from app import app
 
@@ -70,4 +73,210 @@ def test_api_info(client):
     response = client.get('/api/info')
     assert response.status_code == 200
     data = response.get_json()
-    assert data['project_name'] == 'Library API'
\ No newline at end of file
+    assert data['project_name'] == 'Library API'
+
+def test_get_books_paginated(client):
+    response = client.get('/api/books?limit=1')
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data['count'] == 1
+    assert data['next_cursor'] == data['books'][0]['id']
+
+    response = client.get(f"/api/books?limit=1&cursor={data['next_cursor']}")
+    next_page = response.get_json()
+    assert next_page['books'][0]['id'] > data['books'][0]['id']
+
+def test_get_books_invalid_limit(client):
+    response = client.get('/api/books?limit=abc')
+    assert response.status_code == 400
+    assert 'details' in response.get_json()
+
+def test_get_books_rejects_deep_offset(client):
+    assert client.get('/api/books?offset=10000').status_code == 200
+    response = client.get('/api/books?offset=10001')
+    assert response.status_code == 400
+    assert "cursor" in response.get_json()['details'][0]
+
+def test_get_books_filtered(client):
+    response = client.get('/api/books?author=george orwell&year_from=1900&year_to=1999')
+    assert response.status_code == 200
+    data = response.get_json()
+    assert [book['title'] for book in data['books']] == ['1984']
+    assert data['total'] == 1
+
+def test_search_books(client):
+    response = client.get('/api/books/search?q=orwell')
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data['books'][0]['title'] == '1984'
+
+def test_search_books_requires_query(client):
+    response = client.get('/api/books/search')
+    assert response.status_code == 400
+
+def test_batch_operations(client):
+    operations = [
+        {"op": "create", "book": {"title": "Dune", "author": "Frank Herbert", "genre": "Science Fiction", "year": 1965}},
+        {"op": "update", "id": 2, "book": {"genre": "Classic"}},
+    ]
+    response = client.post('/api/books:batch', json={"operations": operations})
+    assert response.status_code == 200
+    results = response.get_json()['results']
+    assert results[0]['status'] == 201
+    assert results[0]['book']['title'] == 'Dune'
+    assert results[1]['book']['genre'] == 'Classic'
+
+def test_batch_ndjson_is_atomic(client):
+    body = '\n'.join([
+        '{"op": "create", "book": {"title": "Emma", "author": "Jane Austen", "genre": "Romance", "year": 1815}}',
+        '{"op": "delete", "id": 9999}',
+    ])
+    response = client.post('/api/books:batch', data=body, content_type='application/x-ndjson')
+    assert response.status_code == 400
+    assert response.get_json()['results'][0]['index'] == 1
+
+    search = client.get('/api/books/search?q=emma').get_json()
+    assert search['count'] == 0
+
+def test_export_books_ndjson(client):
+    response = client.get('/api/books/export')
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+    assert response.is_streamed
+    lines = response.get_data(as_text=True).splitlines()
+    records = [json.loads(line) for line in lines]
+    assert len(records) == client.get('/api/info').get_json()['total_books']
+    assert all('id' in record for record in records)
+
+def test_import_csv(client):
+    body = 'title,author,genre,year\nMiddlemarch,George Eliot,Fiction,1871\nBroken,,Fiction,1900\n'
+    response = client.post('/api/books/import', data=body, content_type='text/csv')
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data['imported'] == 1
+    assert data['rejected'] == 1
+    assert data['errors'][0]['row'] == 3
+
+def test_import_ndjson_streams_in_chunks(client, monkeypatch):
+    import app as app_module
+    monkeypatch.setattr(app_module, 'IMPORT_CHUNK_SIZE', 16)
+    body = '{"title": "Ulysses", "author": "James Joyce", "genre": "Modernist", "year": 1922}\nnot json\n'
+    response = client.post('/api/books/import', data=body, content_type='application/x-ndjson')
+    data = response.get_json()
+    assert data['imported'] == 1
+    assert data['errors'] == [{"row": 2, "details": ["Row is not a valid record"]}]
+
+def test_conditional_get_book(client):
+    response = client.get('/api/books/2')
+    etag = response.headers['ETag']
+    assert response.headers['Last-Modified']
+
+    cached = client.get('/api/books/2', headers={'If-None-Match': etag})
+    assert cached.status_code == 304
+    assert cached.data == b''
+
+    client.put('/api/books/2', json={"year": 1950})
+    changed = client.get('/api/books/2', headers={'If-None-Match': etag})
+    assert changed.status_code == 200
+    assert changed.headers['ETag'] != etag
+
+def test_conditional_get_books_list(client, monkeypatch):
+    import app as app_module
+    monkeypatch.setattr(app_module.store, 'last_modified', time.time() - 10)
+    response = client.get('/api/books')
+    cached = client.get('/api/books', headers={
+        'If-Modified-Since': response.headers['Last-Modified']
+    })
+    assert cached.status_code == 304
+
+def test_if_modified_since_sees_writes_in_the_same_second(client):
+    created = client.post('/api/books', json={
+        "title": "Walden", "author": "Henry David Thoreau", "genre": "Essay", "year": 1854
+    })
+    book_id = created.get_json()['book']['id']
+    response = client.get(f'/api/books/{book_id}')
+    client.put(f'/api/books/{book_id}', json={"year": 1855})
+    changed = client.get(f'/api/books/{book_id}', headers={
+        'If-Modified-Since': response.headers['Last-Modified']
+    })
+    assert changed.status_code == 200
+
+def test_etags_differ_between_catalogs(client):
+    import app as app_module
+    books = list(app_module.store)
+    etags = []
+    for _ in range(2):
+        # A freshly loaded catalog starts over at revision 1
+        app_module.store.load(books)
+        response = client.get(f'/api/books/{books[0]["id"]}')
+        etags.append((response.headers['ETag'], client.get('/api/books').headers['ETag']))
+    assert etags[0][0] != etags[1][0]
+    assert etags[0][1] != etags[1][1]
+
+def test_put_with_stale_if_match(client):
+    etag = client.get('/api/books/3').headers['ETag']
+    response = client.put('/api/books/3', json={"year": 1814}, headers={'If-Match': etag})
+    assert response.status_code == 200
+    assert response.get_json()['revision'] == 2
+    assert response.headers['ETag'] != etag
+
+    stale = client.put('/api/books/3', json={"year": 1815}, headers={'If-Match': etag})
+    assert stale.status_code == 412
+    assert stale.get_json()['revision'] == 2
+
+def test_delete_with_stale_if_match(client):
+    created = client.post('/api/books', json={
+        "title": "Walden", "author": "Henry David Thoreau", "genre": "Essay", "year": 1854
+    })
+    book_id = created.get_json()['book']['id']
+    response = client.delete(f'/api/books/{book_id}', headers={'If-Match': '"book-0-0"'})
+    assert response.status_code == 412
+    response = client.delete(f'/api/books/{book_id}', headers={'If-Match': created.headers['ETag']})
+    assert response.status_code == 200
+
+def test_write_to_book_deleted_mid_request(client, monkeypatch):
+    import app as app_module
+    # The route finds the book, then it is deleted before the write
+    monkeypatch.setattr(app_module, 'find_book_by_id', lambda book_id: {"id": book_id})
+    headers = {'If-Match': '"book-9999-1"'}
+    assert client.put('/api/books/9999', json={"year": 1900}, headers=headers).status_code == 404
+    assert client.put('/api/books/9999', json={"year": 1900}).status_code == 404
+    assert client.delete('/api/books/9999', headers=headers).status_code == 404
+
+def test_gzip_large_json_responses(client):
+    app.config['COMPRESS_RESPONSES'] = True
+    app.config['COMPRESS_MIN_SIZE'] = 10
+    try:
+        response = client.get('/api/books', headers={'Accept-Encoding': 'gzip'})
+        assert response.headers['Content-Encoding'] == 'gzip'
+        assert response.headers['ETag'].startswith('W/')
+        assert 'books' in json.loads(gzip.decompress(response.data))
+
+        cached = client.get('/api/books', headers={'If-None-Match': response.headers['ETag']})
+        assert cached.status_code == 304
+
+        plain = client.get('/api/books')
+        assert 'Content-Encoding' not in plain.headers
+    finally:
+        app.config['COMPRESS_RESPONSES'] = False
+
+def test_put_with_gzip_etag_as_if_match(client):
+    app.config['COMPRESS_RESPONSES'] = True
+    app.config['COMPRESS_MIN_SIZE'] = 10
+    try:
+        etag = client.get('/api/books/4', headers={'Accept-Encoding': 'gzip'}).headers['ETag']
+        assert etag.startswith('W/')
+        response = client.put('/api/books/4', json={"year": 1900}, headers={'If-Match': etag})
+        assert response.status_code == 200
+
+        stale = client.put('/api/books/4', json={"year": 1901}, headers={'If-Match': etag})
+        assert stale.status_code == 412
+    finally:
+        app.config['COMPRESS_RESPONSES'] = False
+
+def test_runtime_check(client):
+    response = client.get('/health/runtime')
+    assert response.status_code == 200
+    data = response.get_json()
+    assert 'markupsafe' in data['accelerated_modules']
+    assert data['accelerated_modules']['markupsafe'] in (True, False)
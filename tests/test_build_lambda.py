@@ -0,0 +1,20 @@
+import re
+import sys
+import os
+import zipfile
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'scripts')))
+from build_lambda import TERRAFORM_FILE, build
+
+
+def test_bundle_contains_every_terraform_handler(tmp_path):
+    source = tmp_path / "site-packages"
+    source.mkdir()
+    output = tmp_path / "lambda.zip"
+    build(str(source), str(tmp_path / "build"), str(output))
+
+    with open(TERRAFORM_FILE) as f:
+        handlers = re.findall(r'handler\s*=\s*"(\w+)\.\w+"', f.read())
+    assert handlers
+    names = zipfile.ZipFile(str(output)).namelist()
+    for module in handlers:
+        assert f"{module}.py" in names
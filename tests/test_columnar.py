@@ -0,0 +1,40 @@
+import pytest
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from columnar import MappedCatalog, is_columnar, write_columnar
+from snapshot import SnapshotError
+
+BOOKS = [
+    {"id": 7, "title": "Émile", "author": "Rousseau", "genre": "Philosophy", "year": 1762},
+    {"id": 2, "title": "", "author": "Anonymous", "genre": "Epic", "year": -700},
+    {"id": 40, "title": "Candide", "author": "Voltaire", "genre": "Satire", "year": 1759},
+]
+
+def test_mapped_lookups(tmp_path):
+    path = str(tmp_path / "books.col")
+    assert write_columnar(path, BOOKS) == 3
+    assert is_columnar(path)
+
+    catalog = MappedCatalog(path)
+    assert len(catalog) == 3
+    assert catalog.next_id == 41
+    assert catalog.get(7) == BOOKS[0]
+    assert catalog.get(2) == BOOKS[1]
+    assert catalog.get(3) is None
+    assert 40 in catalog and 41 not in catalog
+    assert [book["id"] for book in catalog] == [2, 7, 40]
+
+def test_empty_catalog(tmp_path):
+    path = str(tmp_path / "books.col")
+    write_columnar(path, [])
+    catalog = MappedCatalog(path)
+    assert len(catalog) == 0
+    assert catalog.get(1) is None
+
+def test_truncated_catalog_is_rejected(tmp_path):
+    path = tmp_path / "books.col"
+    write_columnar(str(path), BOOKS)
+    path.write_bytes(path.read_bytes()[:-5])
+    with pytest.raises(SnapshotError):
+        MappedCatalog(str(path))
@@ -0,0 +1,167 @@
+import pytest
+import sys
+import os
+from datetime import datetime, timezone
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import dynamo_store
+from dynamo_fake import FakeDynamoDB
+from dynamo_store import DynamoClient, DynamoError, DynamoStore, sign_v4
+from storage import RevisionMismatch
+
+
+def open_store(fake, sleeps=None):
+    sleeps = [] if sleeps is None else sleeps
+    client = DynamoClient("http://dynamodb.local", credentials=("key", "secret", None),
+                          session=fake.session(), sleep=sleeps.append)
+    store = DynamoStore(client, "books")
+    store.create_table()
+    store.ensure_catalog()
+    return store
+
+def operations(fake):
+    return [operation for operation, _ in fake.requests]
+
+def new_books(count):
+    return [{"title": f"Book {n}", "author": "A", "genre": "G", "year": 2000 + n} for n in range(count)]
+
+def test_sign_v4_matches_aws_test_suite():
+    # "get-vanilla" from the AWS Signature Version 4 test suite
+    headers = sign_v4(
+        "GET", "https://example.amazonaws.com/", {}, b"", "us-east-1",
+        ("AKIDEXAMPLE", "wJalrXUtnFEMI/K7MDENG+bPxRfiCYEXAMPLEKEY", None),
+        service="service", now=datetime(2015, 8, 30, 12, 36, tzinfo=timezone.utc),
+    )
+    assert headers["Authorization"] == (
+        "AWS4-HMAC-SHA256 Credential=AKIDEXAMPLE/20150830/us-east-1/service/aws4_request, "
+        "SignedHeaders=host;x-amz-date, "
+        "Signature=5fa00fa31553b73ebf1942676e86291e8372ff2a2260956d9b8aae1d763fbf31"
+    )
+
+def test_bulk_writes_and_reads_are_batched(monkeypatch):
+    monkeypatch.setattr(dynamo_store, "BUCKET_SIZE", 10)
+    fake = FakeDynamoDB()
+    store = open_store(fake)
+    fake.requests.clear()
+
+    books = store.add_many(new_books(60))
+    assert [book["id"] for book in books] == list(range(1, 61))
+    assert operations(fake) == ["UpdateItem"] + ["BatchWriteItem"] * 3 + ["UpdateItem"]
+
+    fake.requests.clear()
+    page, cursor = store.page(year_from=2010, year_to=2049, limit=40)
+    assert operations(fake) == ["GetItem", "Scan", "BatchGetItem"]
+    assert [book["id"] for book in page] == store.find(year_from=2010, year_to=2049) and cursor is None
+
+    # Listing walks the ID partitions in order
+    page, cursor = store.page(after=5, offset=2, limit=20)
+    assert [book["id"] for book in page] == list(range(8, 28)) and cursor == 27
+    assert [book["id"] for book in store] == list(range(1, 61))
+
+def test_unprocessed_items_are_retried_with_backoff():
+    fake = FakeDynamoDB()
+    sleeps = []
+    store = open_store(fake, sleeps)
+
+    fake.unprocessed_batches = 3
+    store.add_many(new_books(20))
+    assert len(store) == 20 and len(list(store)) == 20
+    assert len(sleeps) == 3
+    assert all(0 <= seconds <= dynamo_store.MAX_BACKOFF for seconds in sleeps)
+
+    fake.unprocessed_batches = 2
+    page, _ = store.page(year_from=0, limit=20)
+    assert len(page) == 20
+    assert len(sleeps) == 5
+
+def test_batches_coalesce_duplicate_keys():
+    fake = FakeDynamoDB()
+    store = open_store(fake)
+    book = store.add(new_books(1)[0])
+    key = dynamo_store.book_key(book["id"])
+    store.client.batch_write("books", [
+        {"PutRequest": {"Item": dynamo_store.to_item(dict(book, title="First"), 1, 0.0)}},
+        {"PutRequest": {"Item": dynamo_store.to_item(dict(book, title="Second"), 1, 0.0)}},
+    ])
+    assert store.get(book["id"])["title"] == "Second"
+    assert len(store.client.batch_get("books", [key, key])) == 1
+
+def test_throttled_calls_are_retried_then_surface():
+    fake = FakeDynamoDB()
+    sleeps = []
+    store = open_store(fake, sleeps)
+    fake.throttled_calls = 2
+    assert store.add(new_books(1)[0])["id"] == 1
+    assert len(sleeps) == 2
+
+    fake.throttled_calls = dynamo_store.MAX_ATTEMPTS
+    with pytest.raises(DynamoError) as error:
+        store.get(1)
+    assert error.value.code == "ProvisionedThroughputExceededException"
+
+def test_non_json_errors_are_retried_by_status():
+    fake = FakeDynamoDB()
+    sleeps = []
+    store = open_store(fake, sleeps)
+    fake.unavailable_calls = 2
+    assert len(store) == 0
+    assert len(sleeps) == 2
+
+    fake.unavailable_calls = dynamo_store.MAX_ATTEMPTS
+    with pytest.raises(DynamoError) as error:
+        store.get(1)
+    assert error.value.code == "HTTP503"
+
+def test_failed_batch_counts_only_stored_books():
+    fake = FakeDynamoDB()
+    store = open_store(fake)
+    store.add_many(new_books(3))
+
+    # Every batch call stores only half of its books, until retries run out
+    fake.unprocessed_batches = dynamo_store.MAX_ATTEMPTS
+    with pytest.raises(DynamoError):
+        store.add_many(new_books(20))
+    stored = len(list(store))
+    assert 3 < stored < 23
+    assert len(store) == stored
+
+def test_read_lock_reads_catalog_record_once():
+    fake = FakeDynamoDB()
+    store = open_store(fake)
+    store.add_many(new_books(3))
+    fake.requests.clear()
+    with store.read_lock():
+        assert (store.version, len(store)) == (1, 3)
+        assert store.last_modified > 0
+        assert len(store.page(limit=10)[0]) == 3
+    assert operations(fake) == ["GetItem", "Query"]
+    assert len(store) == 3
+    assert operations(fake) == ["GetItem", "Query", "GetItem"]
+
+def test_find_and_search_reuse_view_until_catalog_changes():
+    fake = FakeDynamoDB()
+    store = open_store(fake)
+    store.add_many(new_books(5))
+    assert store.find(year_from=2003) == [4, 5]
+    fake.requests.clear()
+
+    assert [book["id"] for book, _ in store.search("book")][:2] == [1, 2]
+    assert store.find(year_to=2000) == [1]
+    assert operations(fake) == ["GetItem", "GetItem"]
+
+    store.update(1, {"year": 2010})
+    fake.requests.clear()
+    assert store.find(year_from=2003) == [1, 4, 5]
+    assert operations(fake) == ["GetItem", "Scan"]
+
+def test_conditional_writes_across_containers():
+    fake = FakeDynamoDB()
+    first = open_store(fake)
+    second = DynamoStore(first.client, "books")
+    book = first.add(new_books(1)[0])
+
+    second.update(book["id"], {"title": "Changed elsewhere"})
+    with pytest.raises(RevisionMismatch):
+        first.update(book["id"], {"title": "Stale"}, expected_revision=1)
+    assert first.update(book["id"], {"year": 1999})["title"] == "Changed elsewhere"
+    assert first.revision(book["id"])[0] == 3
+    assert not second.ensure_catalog()
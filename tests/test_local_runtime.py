@@ -0,0 +1,31 @@
+import json
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from local_runtime import load_events, make_event, measure_warm, percentile
+from wsgi_handler import handler
+
+
+def test_make_event_v1_and_v2_agree():
+    record = {"method": "get", "path": "/api/books", "query": {"author": "Jane Austen", "limit": ["1"]}}
+    v1 = handler(make_event(record, "v1"), None)
+    v2 = handler(make_event(record, "v2"), None)
+    assert v1["statusCode"] == v2["statusCode"] == 200
+    assert json.loads(v1["body"])["books"] == json.loads(v2["body"])["books"]
+
+def test_make_event_passes_through_gateway_events():
+    event = {"httpMethod": "GET", "path": "/health"}
+    assert make_event(event) is event
+
+def test_replay_recorded_traffic(tmp_path):
+    traffic = tmp_path / "traffic.jsonl"
+    traffic.write_text('{"method": "GET", "path": "/health"}\n\n{"method": "GET", "path": "/api/info"}\n')
+    events = load_events(str(traffic))
+    assert len(events) == 2
+    assert len(measure_warm(handler, events, 5)) == 5
+
+def test_percentile():
+    samples = list(range(1, 101))
+    assert percentile(samples, 0.5) == 50
+    assert percentile(samples, 0.99) == 99
+    assert percentile([7], 0.99) == 7
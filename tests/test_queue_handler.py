@@ -0,0 +1,79 @@
+import base64
+import json
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from app import store
+from queue_handler import handler
+
+
+def sqs_record(message_id, operation, queue="arn:aws:sqs:us-east-1:000000000000:catalog-writes"):
+    return {"messageId": message_id, "body": json.dumps(operation), "eventSourceARN": queue}
+
+def kinesis_record(sequence_number, operation):
+    data = base64.b64encode(json.dumps(operation).encode("utf-8")).decode("ascii")
+    return {"kinesis": {"sequenceNumber": sequence_number, "data": data}}
+
+def create(title, year=1990):
+    return {"op": "create", "book": {"title": title, "author": "Toni Morrison", "genre": "Novel", "year": year}}
+
+def failing_on(monkeypatch, title):
+    """Make store.add raise, as a throttled backend would, for one title"""
+    add = store.add
+    def flaky_add(fields, key=None):
+        if fields["title"] == title:
+            raise RuntimeError("ProvisionedThroughputExceededException")
+        return add(fields, key=key)
+    monkeypatch.setattr(store, "add", flaky_add)
+
+def test_sqs_batch_drops_invalid_records():
+    before = len(store)
+    event = {"Records": [
+        sqs_record("m1", create("Beloved", 1987)),
+        sqs_record("m2", {"op": "create", "book": {"title": "No Author"}}),
+        {"messageId": "m3", "body": "not json"},
+        sqs_record("m4", {"op": "delete", "id": 999999}),
+        sqs_record("m5", create("Jazz", 1992)),
+    ]}
+    assert handler(event, None) == {"batchItemFailures": []}
+    assert len(store) == before + 2
+    assert len(store.find(author="Toni Morrison")) == 2
+
+def test_sqs_batch_reports_store_errors(monkeypatch):
+    before = len(store)
+    failing_on(monkeypatch, "Sula")
+    event = {"Records": [sqs_record("m6", create("Sula")), sqs_record("m7", create("Home"))]}
+    assert handler(event, None) == {"batchItemFailures": [{"itemIdentifier": "m6"}]}
+    assert len(store) == before + 1
+
+def test_redelivered_create_is_applied_once():
+    before = len(store)
+    event = {"Records": [sqs_record("m8", create("Paradise"))]}
+    handler(event, None)
+    assert handler(event, None) == {"batchItemFailures": []}
+    assert len(store) == before + 1
+
+def test_kinesis_batch_stops_at_first_store_error(monkeypatch):
+    before = len(store)
+    failing_on(monkeypatch, "Love")
+    event = {"Records": [
+        kinesis_record("1", {"op": "delete", "id": 999999}),
+        kinesis_record("2", create("Love")),
+        kinesis_record("3", create("A Mercy")),
+    ]}
+    assert handler(event, None) == {"batchItemFailures": [{"itemIdentifier": "2"}]}
+    assert len(store) == before
+
+def test_fifo_batch_returns_records_after_store_error(monkeypatch):
+    before = len(store)
+    failing_on(monkeypatch, "God Help the Child")
+    queue = "arn:aws:sqs:us-east-1:000000000000:catalog-writes.fifo"
+    event = {"Records": [
+        sqs_record("f1", create("God Help the Child"), queue),
+        sqs_record("f2", create("Tar Baby"), queue),
+        sqs_record("f3", create("Song of Solomon"), queue),
+    ]}
+    assert handler(event, None) == {"batchItemFailures": [
+        {"itemIdentifier": "f1"}, {"itemIdentifier": "f2"}, {"itemIdentifier": "f3"},
+    ]}
+    assert len(store) == before
@@ -0,0 +1,49 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from search import SearchIndex, tokenize
+
+
+def build_index():
+    index = SearchIndex()
+    index.add({"id": 1, "title": "The Hobbit", "author": "J. R. R. Tolkien"})
+    index.add({"id": 2, "title": "The Lord of the Rings", "author": "J. R. R. Tolkien"})
+    index.add({"id": 3, "title": "Hobbit Homes", "author": "Anne Other"})
+    return index
+
+def test_tokenize():
+    assert tokenize("The Lord of the Rings!") == ["the", "lord", "of", "the", "rings"]
+    assert tokenize(None) == []
+
+def test_token_query_ranks_best_match_first():
+    index = build_index()
+    ids = [book_id for book_id, _ in index.search("hobbit tolkien")]
+    assert ids[0] == 1
+    assert set(ids) == {1, 2, 3}
+
+def test_prefix_query():
+    index = build_index()
+    assert {book_id for book_id, _ in index.search("tolk*")} == {1, 2}
+    assert index.search("tolk") == []
+
+def test_remove_updates_postings():
+    index = build_index()
+    index.remove({"id": 3, "title": "Hobbit Homes", "author": "Anne Other"})
+    assert [book_id for book_id, _ in index.search("hobbit")] == [1]
+    assert index.search("homes") == []
+
+def test_pruned_results_match_full_ranking():
+    index = SearchIndex()
+    words = ["river", "stone", "night", "garden", "empire"]
+    books = [
+        {"id": book_id, "author": f"Author {book_id % 7}",
+         "title": " ".join(words[(book_id * step) % 5] for step in range(1, book_id % 4 + 2))}
+        for book_id in range(1, 301)
+    ]
+    for book in books:
+        index.add(book)
+    index.remove(books[9])
+    for query in ("river", "river stone", "author 3", "gard* night", "empire empire"):
+        full = index.search(query, limit=1000)
+        for limit in (1, 5, 20):
+            assert index.search(query, limit=limit) == full[:limit]
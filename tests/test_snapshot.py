@@ -0,0 +1,99 @@
+import pytest
+import sys
+import os
+import threading
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from search import SearchIndex
+from snapshot import SnapshotError, Snapshotter, read_snapshot
+from store import BookStore
+from wal import WriteAheadLog, read_records
+
+
+def open_store(tmp_path, flush_interval=0):
+    store = BookStore([{"id": 1, "title": "Seed", "author": "A", "genre": "G", "year": 2000}])
+    search_index = SearchIndex()
+    store.add_index(search_index)
+    log = WriteAheadLog(str(tmp_path / "catalog.wal"), flush_interval)
+    snapshotter = Snapshotter(store, log, str(tmp_path / "catalog.snap"))
+    snapshotter.load()
+    log.replay(store)
+    store.attach_journal(log)
+    return store, log, snapshotter, search_index
+
+def test_snapshot_truncates_log_and_restores_with_tail(tmp_path):
+    store, log, snapshotter, _ = open_store(tmp_path)
+    store.add({"title": "Émile", "author": "Rousseau", "genre": "Philosophy", "year": 1762})
+    store.update(1, {"title": "Seed, revised"})
+    assert snapshotter.snapshot() == 2
+    assert list(read_records(log.path)) == []
+    assert not os.path.exists(log.previous_path)
+
+    store.add({"title": "Candide", "author": "Voltaire", "genre": "Satire", "year": 1759})
+    store.delete(2)
+    log.close()
+
+    restored, log, _, search_index = open_store(tmp_path)
+    log.close()
+    assert list(restored) == list(store)
+    assert restored.next_id == 4
+    assert restored.revision(1) == store.revision(1)
+    assert restored.find(year_from=1700, year_to=1800) == [3]
+    assert [book_id for book_id, _ in search_index.search("voltaire")] == [3]
+
+def test_crash_before_snapshot_replays_previous_segment(tmp_path):
+    store, log, _, _ = open_store(tmp_path)
+    store.add({"title": "Before rotation", "author": "A", "genre": "G", "year": 1990})
+    with store.write_lock():
+        log.rotate()
+    store.add({"title": "After rotation", "author": "A", "genre": "G", "year": 1991})
+    log.close()
+
+    restored, log, _, _ = open_store(tmp_path)
+    log.close()
+    assert [book["title"] for book in restored] == ["Seed", "Before rotation", "After rotation"]
+
+def test_background_snapshots_with_group_commit(tmp_path):
+    store, log, snapshotter, _ = open_store(tmp_path, flush_interval=0.005)
+    snapshotter.interval = 0.01
+    snapshotter.start()
+    for year in range(1900, 2000):
+        store.add({"title": "T", "author": "A", "genre": "G", "year": year})
+    log.wait()
+    snapshotter.stop()
+    snapshotter.snapshot()
+    log.close()
+
+    next_id, records = read_snapshot(snapshotter.path)
+    assert next_id == 102
+    assert len(records) == 101
+    assert list(read_records(log.path)) == []
+
+def test_background_snapshots_survive_a_failure(tmp_path, capsys):
+    store, log, snapshotter, _ = open_store(tmp_path)
+    store.add({"title": "T", "author": "A", "genre": "G", "year": 1900})
+    attempts = []
+    done = threading.Event()
+    snapshot = snapshotter.snapshot
+
+    def flaky_snapshot():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise ValueError("unexpected")
+        done.set()
+        return snapshot()
+
+    snapshotter.snapshot = flaky_snapshot
+    snapshotter.interval = 0.01
+    snapshotter.start()
+    assert done.wait(5)
+    snapshotter.stop()
+    log.close()
+    captured = capsys.readouterr()
+    assert "failed" in captured.out and "ValueError: unexpected" in captured.err
+    assert len(read_snapshot(snapshotter.path)[1]) == 2
+
+def test_corrupt_snapshot_is_rejected(tmp_path):
+    path = tmp_path / "catalog.snap"
+    path.write_bytes(b"not a snapshot at all")
+    with pytest.raises(SnapshotError):
+        read_snapshot(str(path))
@@ -0,0 +1,170 @@
+import pytest
+import sys
+import os
+import threading
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from dynamo_fake import FakeDynamoDB
+from dynamo_store import DynamoClient, DynamoStore
+from search import SearchIndex
+from sqlite_store import SqliteStore
+from storage import RevisionMismatch
+from store import BookStore
+
+BOOKS = [
+    {"id": 1, "title": "Pride and Prejudice", "author": "Jane Austen", "genre": "Romance", "year": 1813},
+    {"id": 2, "title": "Emma", "author": "Jane Austen", "genre": "Romance", "year": 1815},
+    {"id": 3, "title": "Persuasion", "author": "Jane Austen", "genre": "Romance", "year": 1817},
+    {"id": 4, "title": "Dracula", "author": "Bram Stoker", "genre": "Horror", "year": 1897},
+    {"id": 5, "title": "Frankenstein", "author": "Mary Shelley", "genre": "Horror", "year": 1818},
+]
+
+
+def fake_dynamo_store(fake=None):
+    fake = fake or FakeDynamoDB()
+    client = DynamoClient("http://dynamodb.local", credentials=("key", "secret", None),
+                          session=fake.session(), sleep=lambda seconds: None)
+    store = DynamoStore(client, "books")
+    store.create_table()
+    store.ensure_catalog()
+    return store
+
+
+@pytest.fixture(params=["memory", "sqlite", "dynamodb"])
+def store(request, tmp_path):
+    """Every backend must pass the same contract"""
+    if request.param == "memory":
+        store = BookStore()
+        store.add_index(SearchIndex())
+    elif request.param == "sqlite":
+        store = SqliteStore(str(tmp_path / "catalog.db"))
+    else:
+        store = fake_dynamo_store()
+    store.load(BOOKS)
+    yield store
+    if request.param == "sqlite":
+        store.close()
+
+def test_reads(store):
+    assert len(store) == 5
+    assert 3 in store and 9 not in store
+    assert store.get(4) == BOOKS[3]
+    assert store.get(9) is None
+    assert store.revision(4)[0] == 1
+    assert list(store) == BOOKS
+
+def test_find_and_page(store):
+    assert store.find(author="JANE AUSTEN") == [1, 2, 3]
+    assert store.find(genre="horror", year_from=1850) == [4]
+    assert store.find(year_from=1815, year_to=1818) == [2, 3, 5]
+
+    page, cursor = store.page(limit=2)
+    assert [book["id"] for book in page] == [1, 2] and cursor == 2
+    page, cursor = store.page(after=cursor, offset=1, limit=2)
+    assert [book["id"] for book in page] == [4, 5] and cursor is None
+    page, cursor = store.page(year_from=1815, year_to=1818, after=2, limit=1)
+    assert [book["id"] for book in page] == [3] and cursor == 3
+    page, cursor = store.page(author="jane austen", genre="ROMANCE", offset=1)
+    assert [book["id"] for book in page] == [2, 3] and cursor is None
+
+    assert store.count() == 5
+    assert store.count(author="JANE AUSTEN") == 3
+    assert store.count(genre="horror") == 2
+    assert store.count(year_from=1815, year_to=1818) == 3
+    assert store.count(author="jane austen", year_to=1815) == 2
+
+def test_search_ranks_matches(store):
+    results = store.search("austen persuasion")
+    assert [book["id"] for book, _ in results][0] == 3
+    assert {book["id"] for book, _ in results} == {1, 2, 3}
+    assert [book["id"] for book, _ in store.search("frank*")] == [5]
+    assert store.search("nothing") == []
+
+def test_writes_track_revisions_and_version(store):
+    version = store.version
+    book = store.add({"title": "Mansfield Park", "author": "Jane Austen", "genre": "Romance", "year": 1814})
+    assert book["id"] == 6 and store.get(6) == book
+    assert store.update(6, {"year": 1815}, expected_revision=1)["year"] == 1815
+    with pytest.raises(RevisionMismatch):
+        store.update(6, {"year": 1816}, expected_revision=1)
+    with pytest.raises(RevisionMismatch):
+        store.delete(6, expected_revision=1)
+    assert store.revision(6)[0] == 2
+    assert store.delete(6)["title"] == "Mansfield Park"
+    assert store.delete(6) is None
+    assert store.update(6, {"year": 1}) is None
+    assert store.version == version + 3
+    assert store.find(year_from=1815, year_to=1815) == [2]
+    fields = [{"title": title, "author": "A", "genre": "G", "year": 2000} for title in ("X", "Y")]
+    assert [book["id"] for book in store.add_many(fields)] == [7, 8]
+
+def test_keyed_add_is_idempotent(store):
+    fields = {"title": "Sanditon", "author": "Jane Austen", "genre": "Romance", "year": 1817}
+    book = store.add(fields, key="queue#m1")
+    assert book["id"] == 6
+    assert store.add(fields, key="queue#m1") is None
+    assert store.add(fields, key="queue#m2")["id"] == 7
+    assert len(store) == 7
+    assert store.find(author="jane austen") == [1, 2, 3, 6, 7]
+
+def test_write_lock_groups_calls(store):
+    with store.write_lock():
+        store.add({"title": "A", "author": "B", "genre": "C", "year": 1})
+        store.delete(1)
+    assert len(store) == 5
+    assert 1 not in store
+
+def test_sqlite_survives_reopen_and_rolls_back(tmp_path):
+    path = str(tmp_path / "catalog.db")
+    store = SqliteStore(path)
+    assert store.created
+    store.load(BOOKS)
+    with pytest.raises(RuntimeError):
+        with store.write_lock():
+            store.delete(1)
+            raise RuntimeError("abort")
+    store.update(2, {"title": "Emma, revised"})
+    store.close()
+
+    reopened = SqliteStore(path)
+    assert not reopened.created
+    assert reopened.get(1) == BOOKS[0]
+    assert reopened.get(2)["title"] == "Emma, revised"
+    assert reopened.revision(2)[0] == 2
+    reopened.close()
+
+def test_sqlite_pages_large_filtered_listings(tmp_path):
+    store = SqliteStore(str(tmp_path / "catalog.db"), synchronous="OFF")
+    store.load([
+        {"id": book_id, "title": "T", "author": "Prolific" if book_id % 2 else "Other", "genre": "G", "year": 2000}
+        for book_id in range(1, 5001)
+    ])
+    ids = []
+    page, cursor = store.page(author="prolific", limit=1000)
+    while True:
+        ids.extend(book["id"] for book in page)
+        if cursor is None:
+            break
+        page, cursor = store.page(author="prolific", after=cursor, limit=1000)
+    assert ids == list(range(1, 5001, 2))
+    assert store.count(author="prolific", year_from=2000) == 2500
+    store.close()
+
+def test_sqlite_concurrent_writers_lose_no_updates(tmp_path):
+    store = SqliteStore(str(tmp_path / "catalog.db"), synchronous="OFF")
+    store.load(BOOKS)
+
+    def worker():
+        for _ in range(25):
+            with store.write_lock():
+                year = store.get(1)["year"]
+                store.update(1, {"year": year + 1})
+            assert store.get(2) is not None
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert store.get(1)["year"] == 1813 + 200
+    assert store.revision(1)[0] == 201
+    store.close()
@@ -0,0 +1,181 @@
+import pytest
+import sys
+import os
+import threading
+import time
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from store import BookStore, RevisionMismatch
+
+
+def make_store(count=5):
+    return BookStore([
+        {"id": i, "title": f"Book {i}", "author": "Author", "genre": "Genre", "year": 2000}
+        for i in range(1, count + 1)
+    ])
+
+def test_lookup_by_id():
+    store = make_store()
+    assert store.get(3)["title"] == "Book 3"
+    assert store.get(42) is None
+    assert 3 in store
+
+def test_add_allocates_next_id():
+    store = make_store()
+    book = store.add({"title": "New", "author": "A", "genre": "G", "year": 2020})
+    assert book["id"] == 6
+    assert store.get(6) is book
+    assert len(store) == 6
+
+def test_update_and_delete():
+    store = make_store()
+    assert store.update(2, {"title": "Changed"})["title"] == "Changed"
+    assert store.delete(2)["id"] == 2
+    assert store.get(2) is None
+    assert store.delete(2) is None
+    assert store.update(2, {"title": "Gone"}) is None
+
+def test_iteration_keeps_id_order_across_compaction():
+    store = make_store(10)
+    for book_id in (2, 4, 6, 8, 10, 1):
+        store.delete(book_id)
+    store.add({"title": "New", "author": "A", "genre": "G", "year": 2020})
+    assert [book["id"] for book in store] == [3, 5, 7, 9, 11]
+
+def test_page_with_cursor_and_offset():
+    store = make_store(10)
+    store.delete(4)
+    page, cursor = store.page(limit=3)
+    assert [book["id"] for book in page] == [1, 2, 3]
+    assert cursor == 3
+    page, cursor = store.page(after=cursor, limit=3)
+    assert [book["id"] for book in page] == [5, 6, 7]
+    page, cursor = store.page(after=cursor, offset=1, limit=3)
+    assert [book["id"] for book in page] == [9, 10]
+    assert cursor is None
+
+def test_find_uses_maintained_indexes():
+    store = make_store(0)
+    store.add({"title": "A", "author": "Ann", "genre": "Poetry", "year": 1990})
+    store.add({"title": "B", "author": "Bob", "genre": "Poetry", "year": 2005})
+    store.add({"title": "C", "author": "Ann", "genre": "Drama", "year": 2010})
+    assert store.find(author="ann") == [1, 3]
+    assert store.find(genre="Poetry", year_from=2000) == [2]
+    assert store.find(year_from=1995, year_to=2010) == [2, 3]
+
+    store.update(1, {"author": "Bob", "year": 2001})
+    store.delete(3)
+    assert store.find(author="Ann") == []
+    assert store.find(author="Bob", year_to=2002) == [1]
+
+def test_find_only_lists_year_range_when_smallest(monkeypatch):
+    store = make_store(100)
+    store.add({"title": "Rare", "author": "Rare Author", "genre": "Genre", "year": 1990})
+    listed = []
+    original = store.years.range
+    monkeypatch.setattr(store.years, "range", lambda *args: listed.append(args) or original(*args))
+
+    assert store.find(author="rare author", year_from=0) == [101]
+    assert listed == []
+    assert store.find(genre="Genre", year_to=1995) == [101]
+    assert listed == [(None, 1995)]
+    assert store.years.count(2001, 1999) == 0
+
+def test_load_replaces_catalog_and_journals_it():
+    store = make_store(3)
+    journal = []
+
+    class Journal:
+        def put(self, book, revision, modified):
+            journal.append(("put", book["id"]))
+
+        def delete(self, book_id):
+            journal.append(("delete", book_id))
+
+    store.attach_journal(Journal())
+    store.load([
+        {"id": 7, "title": "Seven", "author": "Ann", "genre": "Drama", "year": 1990},
+        {"id": 4, "title": "Four", "author": "Bob", "genre": "Drama", "year": 2000},
+    ])
+    assert [book["id"] for book in store] == [4, 7]
+    assert store.find(genre="drama", year_to=1995) == [7]
+    assert store.revision(4)[0] == 1
+    assert store.add({"title": "New", "author": "A", "genre": "G", "year": 2020})["id"] == 8
+    assert journal[:5] == [("delete", 1), ("delete", 2), ("delete", 3), ("put", 4), ("put", 7)]
+    with pytest.raises(KeyError):
+        store.load([{"id": 1, "title": "A", "author": "A", "genre": "G", "year": 1}] * 2)
+    assert len(store) == 3
+
+def test_revisions_and_version_track_mutations():
+    store = make_store(2)
+    version = store.version
+    assert store.revision(1)[0] == 1
+    store.update(1, {"title": "Changed"})
+    assert store.revision(1)[0] == 2
+    store.delete(2)
+    assert store.revision(2) is None
+    assert store.version == version + 2
+
+def test_conditional_writes_check_revision():
+    store = make_store(1)
+    store.update(1, {"title": "Changed"}, expected_revision=1)
+    with pytest.raises(RevisionMismatch):
+        store.update(1, {"title": "Again"}, expected_revision=1)
+    with pytest.raises(RevisionMismatch):
+        store.delete(1, expected_revision=1)
+    assert store.delete(1, expected_revision=2)["title"] == "Changed"
+
+def test_nested_read_with_queued_writer():
+    store = make_store()
+    reading = threading.Event()
+    results = []
+
+    def reader():
+        with store.read_lock():
+            reading.set()
+            while not store._lock._waiting_writers:
+                time.sleep(0.001)
+            results.append(store.page(limit=2)[0])
+
+    def writer():
+        reading.wait()
+        store.delete(1)
+
+    threads = [threading.Thread(target=reader, daemon=True), threading.Thread(target=writer, daemon=True)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+    assert not any(thread.is_alive() for thread in threads)
+    assert [book["id"] for book in results[0]] == [1, 2]
+    assert store.get(1) is None
+
+def test_concurrent_writers_lose_no_updates():
+    store = make_store(1)
+    store.update(1, {"year": 0})
+    clients = 64
+    rounds = 25
+    created = []
+
+    def client():
+        for _ in range(rounds):
+            created.append(store.add({"title": "T", "author": "A", "genre": "G", "year": 2000})["id"])
+            # Read-modify-write, retried whenever another client got there first
+            while True:
+                revision, _ = store.revision(1)
+                book = store.get(1)
+                try:
+                    store.update(1, {"year": book["year"] + 1}, expected_revision=revision)
+                    break
+                except RevisionMismatch:
+                    pass
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(set(created)) == clients * rounds
+    assert len(store) == clients * rounds + 1
+    assert store.get(1)["year"] == clients * rounds
+    assert store.find(year_from=2000, year_to=2000) == sorted(created)
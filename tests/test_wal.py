@@ -0,0 +1,75 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from store import BookStore
+from wal import WriteAheadLog, read_records
+
+
+def seed():
+    return BookStore([{"id": 1, "title": "Seed", "author": "A", "genre": "G", "year": 2000}])
+
+def open_store(path, flush_interval):
+    store = seed()
+    log = WriteAheadLog(path, flush_interval)
+    log.replay(store)
+    store.attach_journal(log)
+    return store, log
+
+def test_replay_restores_mutations(tmp_path):
+    path = str(tmp_path / "catalog.wal")
+    store, log = open_store(path, 0)
+    store.add({"title": "Émile", "author": "Rousseau", "genre": "Philosophy", "year": 1762})
+    store.update(1, {"title": "Seed, revised"})
+    store.delete(2)
+    store.add({"title": "Candide", "author": "Voltaire", "genre": "Satire", "year": 1759})
+    log.close()
+
+    restored, log = open_store(path, 0)
+    log.close()
+    assert list(restored) == list(store)
+    assert restored.next_id == 4
+    assert restored.revision(1)[0] == 2
+
+def test_group_commit_waits_for_fsync(tmp_path):
+    path = str(tmp_path / "catalog.wal")
+    store, log = open_store(path, 0.005)
+    for year in range(1900, 1950):
+        store.add({"title": "T", "author": "A", "genre": "G", "year": year})
+    log.wait()
+    assert len(list(read_records(path))) == 50
+    log.close()
+
+def test_torn_tail_is_discarded(tmp_path):
+    path = str(tmp_path / "catalog.wal")
+    store, log = open_store(path, 0)
+    store.add({"title": "Kept", "author": "A", "genre": "G", "year": 1999})
+    log.close()
+    with open(path, "ab") as f:
+        f.write(b"\x20\x00\x00\x00garbage")
+
+    restored, log = open_store(path, 0)
+    restored.add({"title": "After crash", "author": "A", "genre": "G", "year": 2001})
+    log.close()
+    assert [op for _, op, _ in read_records(path)] == ["put", "put"]
+    assert [book["title"] for book in open_store(path, 0)[0]] == ["Seed", "Kept", "After crash"]
+
+def test_replay_keeps_revisions_over_covered_records(tmp_path):
+    path = str(tmp_path / "catalog.wal")
+    store, log = open_store(path, 0)
+    store.update(1, {"year": 2001})
+    store.update(1, {"year": 2002})
+    store.add({"title": "Added", "author": "A", "genre": "G", "year": 2003})
+    log.close()
+
+    restored, log = open_store(path, 0)
+    log.close()
+    assert restored.revision(1) == store.revision(1)
+    assert restored.revision(2) == store.revision(2)
+
+    # A snapshot already holding these records must end up unchanged
+    covered = BookStore()
+    books, revisions, next_id = store.dump()
+    covered.restore([(book, *revisions[book_id]) for book_id, book in books.items()], next_id)
+    WriteAheadLog(path, 0).replay(covered)
+    assert covered.revision(1) == store.revision(1)
+    assert covered.revision(2) == store.revision(2)
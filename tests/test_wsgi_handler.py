@@ -0,0 +1,193 @@
+import pytest
+import base64
+import gzip
+import json
+import sys
+import os
+import subprocess
+from urllib.parse import urlencode
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from app import app
+import wsgi_handler
+from local_runtime import invoke_streaming
+from columnar import write_columnar
+from wsgi_handler import (
+    build_environ, build_response, get_app, handler, header_key, load_catalog, stream_handler
+)
+
+
+def v1_event(method, path, body=None, headers=None, is_base64=False):
+    return {
+        "httpMethod": method,
+        "path": path,
+        "headers": headers or {},
+        "queryStringParameters": None,
+        "body": body,
+        "isBase64Encoded": is_base64,
+    }
+
+def test_get_health():
+    response = handler(v1_event("GET", "/health"), None)
+    assert response["statusCode"] == 200
+    assert json.loads(response["body"]) == {"status": "OK"}
+
+def test_multibyte_body_round_trip():
+    book = {"title": "Crime and Punishment — Преступление", "author": "Фёдор Достоевский", "genre": "Novel", "year": 1866}
+    response = handler(v1_event("POST", "/api/books", json.dumps(book, ensure_ascii=False),
+                                {"content-type": "application/json"}), None)
+    assert response["statusCode"] == 201
+    assert json.loads(response["body"])["book"]["author"] == book["author"]
+
+def test_base64_body_is_decoded_as_bytes():
+    book = {"title": "Les Misérables", "author": "Victor Hugo", "genre": "Novel", "year": 1862}
+    body = base64.b64encode(json.dumps(book, ensure_ascii=False).encode("utf-8")).decode("ascii")
+    response = handler(v1_event("POST", "/api/books", body, {"content-type": "application/json"}, True), None)
+    assert response["statusCode"] == 201
+    assert json.loads(response["body"])["book"]["title"] == book["title"]
+
+def test_compressed_response_is_base64_encoded():
+    app.config['COMPRESS_RESPONSES'] = True
+    app.config['COMPRESS_MIN_SIZE'] = 10
+    try:
+        response = handler(v1_event("GET", "/api/books", headers={"accept-encoding": "gzip"}), None)
+    finally:
+        app.config['COMPRESS_RESPONSES'] = False
+    assert response["isBase64Encoded"] is True
+    assert response["headers"]["Content-Encoding"] == "gzip"
+    data = json.loads(gzip.decompress(base64.b64decode(response["body"])))
+    assert "books" in data
+
+def test_text_response_is_not_base64_encoded():
+    response = handler(v1_event("GET", "/ui"), None)
+    assert response["isBase64Encoded"] is False
+    assert "Library Manager" in response["body"]
+
+def test_build_environ_maps_headers_case_insensitively():
+    environ = build_environ(v1_event("POST", "/api/books", "{}", {
+        "Content-Type": "application/json",
+        "Host": "example.com:443",
+        "X-Request-Id": "abc",
+    }))
+    assert environ["CONTENT_TYPE"] == "application/json"
+    assert environ["CONTENT_LENGTH"] == "2"
+    assert environ["SERVER_NAME"] == "example.com"
+    assert environ["HTTP_X_REQUEST_ID"] == "abc"
+    assert "HTTP_CONTENT_TYPE" not in environ
+    assert header_key("X-Request-Id") == "HTTP_X_REQUEST_ID"
+
+def test_v1_multi_value_query_and_headers():
+    event = v1_event("GET", "/api/books")
+    event["multiValueQueryStringParameters"] = {"author": ["Jane Austen"], "tag": ["a&b", "c"]}
+    event["multiValueHeaders"] = {"Cookie": ["a=1", "b=2"], "Accept": ["text/html", "application/json"]}
+    environ = build_environ(event)
+    assert environ["QUERY_STRING"] == "author=Jane+Austen&tag=a%26b&tag=c"
+    assert environ["HTTP_COOKIE"] == "a=1; b=2"
+    assert environ["HTTP_ACCEPT"] == "text/html, application/json"
+
+def test_v1_query_string_matches_urlencode():
+    event = v1_event("GET", "/api/books/search")
+    event["queryStringParameters"] = {"q": "Émile & co", "limit": "5", "a b": "100%"}
+    expected = urlencode(event["queryStringParameters"])
+    assert build_environ(event)["QUERY_STRING"] == expected
+    assert build_environ(event)["QUERY_STRING"] == expected
+
+def test_v2_raw_query_string_and_cookies():
+    event = {
+        "version": "2.0",
+        "rawPath": "/api/books/search",
+        "rawQueryString": "q=jane%20austen&limit=1",
+        "cookies": ["a=1", "b=2"],
+        "headers": {"host": "example.com"},
+        "requestContext": {"http": {"method": "GET"}},
+    }
+    environ = build_environ(event)
+    assert environ["QUERY_STRING"] == "q=jane%20austen&limit=1"
+    assert environ["HTTP_COOKIE"] == "a=1; b=2"
+
+    response = handler(event, None)
+    assert json.loads(response["body"])["query"] == "jane austen"
+
+def test_repeated_response_headers_are_preserved():
+    headers = [("Content-Type", "text/plain"), ("Set-Cookie", "a=1"), ("Set-Cookie", "b=2")]
+    v1 = build_response(v1_event("GET", "/"), 200, headers, b"ok")
+    assert v1["headers"] == {"Content-Type": "text/plain"}
+    assert v1["multiValueHeaders"] == {"Set-Cookie": ["a=1", "b=2"]}
+
+    v2 = build_response({"version": "2.0"}, 200, headers, b"ok")
+    assert v2["cookies"] == ["a=1", "b=2"]
+    assert "Set-Cookie" not in v2["headers"]
+
+def test_get_app_returns_flask_app():
+    assert get_app() is app
+
+def test_cold_start_skips_speedups_check():
+    # charset_normalizer is only imported by the /health/runtime check
+    code = "import sys, wsgi_handler; wsgi_handler.get_app(); print('charset_normalizer' in sys.modules)"
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    result = subprocess.run([sys.executable, "-c", code], cwd=root, capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == "False"
+
+def test_catalog_snapshot_init_hook(tmp_path, monkeypatch):
+    export = handler(v1_event("GET", "/api/books/export"), None)["body"]
+    snapshot = tmp_path / "books.ndjson"
+    snapshot.write_text(export)
+    monkeypatch.setenv("CATALOG_SNAPSHOT", str(snapshot))
+
+    load_catalog(app)
+    reloaded = handler(v1_event("GET", "/api/books/export"), None)["body"]
+    assert reloaded == export
+
+def test_catalog_snapshot_needs_memory_backend(tmp_path, monkeypatch):
+    import app as app_module
+    snapshot = tmp_path / "books.ndjson"
+    snapshot.write_text('{"id": 1, "title": "Only", "author": "A", "genre": "G", "year": 2000}\n')
+    monkeypatch.setenv("CATALOG_SNAPSHOT", str(snapshot))
+    monkeypatch.setitem(app.config, "STORAGE_BACKEND", "sqlite")
+    before = len(app_module.store)
+
+    load_catalog(app)
+    assert len(app_module.store) == before
+    with pytest.raises(ValueError):
+        app_module.load_catalog_snapshot(str(snapshot))
+
+def test_stream_handler_streams_export():
+    result = invoke_streaming(stream_handler, v1_event("GET", "/api/books/export"))
+    assert result.status_code == 200
+    assert result.headers["Content-Type"] == "application/x-ndjson"
+    records = [json.loads(line) for line in result.body.splitlines()]
+    buffered = handler(v1_event("GET", "/api/books/export"), None)["body"]
+    assert records == [json.loads(line) for line in buffered.splitlines()]
+    assert result.first_byte_seconds is not None
+
+def test_stream_handler_coalesces_chunks(monkeypatch):
+    monkeypatch.setattr(wsgi_handler, "STREAM_CHUNK_SIZE", 1)
+    unbuffered = invoke_streaming(stream_handler, v1_event("GET", "/api/books/export"))
+    assert unbuffered.chunks == len(unbuffered.body.splitlines())
+
+    monkeypatch.setattr(wsgi_handler, "STREAM_CHUNK_SIZE", 1024 * 1024)
+    coalesced = invoke_streaming(stream_handler, v1_event("GET", "/api/books/export"))
+    assert coalesced.chunks == 1
+    assert coalesced.body == unbuffered.body
+
+def test_columnar_snapshot_serves_lookups_before_loading(tmp_path, monkeypatch):
+    import app as app_module
+    books = list(app_module.store)
+    snapshot = tmp_path / "books.col"
+    write_columnar(str(snapshot), books + [
+        {"id": 9000, "title": "Mapped", "author": "M", "genre": "G", "year": 1999},
+    ])
+    monkeypatch.setenv("CATALOG_SNAPSHOT", str(snapshot))
+
+    load_catalog(app)
+    try:
+        response = handler(v1_event("GET", "/api/books/9000"), None)
+        assert json.loads(response["body"])["title"] == "Mapped"
+        assert response["headers"]["ETag"].startswith('"book-9000-1-')
+        assert 9000 not in app_module.store
+
+        handler(v1_event("GET", "/api/books"), None)
+        assert app_module.mapped_catalog is None
+        assert app_module.store.get(9000)["title"] == "Mapped"
+    finally:
+        app_module.materialize_catalog()
+        app_module.store.load(books)
@@ -0,0 +1,253 @@
+import atexit
+import os
+import struct
+import threading
+import zlib
+
+# Each record is a header (body length, CRC32 of body) followed by the body.
+# PUT bodies carry the whole book: op, id, year, revision and modified time,
+# then three length-prefixed UTF-8 strings; DELETE bodies carry only op and
+# id. Logs written before revisions were recorded hold LEGACY_PUT records,
+# which are still replayed.
+HEADER = struct.Struct("<II")
+LEGACY_PUT_BODY = struct.Struct("<Bqi")
+PUT_BODY = struct.Struct("<BqiId")
+DELETE_BODY = struct.Struct("<Bq")
+STRING_LENGTH = struct.Struct("<I")
+
+LEGACY_PUT = 1
+DELETE = 2
+PUT = 3
+
+STRING_FIELDS = ("title", "author", "genre")
+
+
+def encode_put(book, revision, modified):
+    """Encode a book record and its (revision, modified time) as a PUT log record"""
+    parts = [PUT_BODY.pack(PUT, book["id"], book["year"], revision, modified)]
+    for field in STRING_FIELDS:
+        data = str(book[field]).encode("utf-8")
+        parts.append(STRING_LENGTH.pack(len(data)))
+        parts.append(data)
+    return frame(b"".join(parts))
+
+
+def encode_delete(book_id):
+    """Encode a book deletion as a DELETE log record"""
+    return frame(DELETE_BODY.pack(DELETE, book_id))
+
+
+def frame(body):
+    return HEADER.pack(len(body), zlib.crc32(body)) + body
+
+
+def decode_body(body):
+    """Return ("put", (book, revision, modified)) or ("delete", book id) for a record body
+
+    Revision and modified time are None for a LEGACY_PUT record.
+    """
+    if body[0] == DELETE:
+        _, book_id = DELETE_BODY.unpack_from(body)
+        return "delete", book_id
+
+    if body[0] == LEGACY_PUT:
+        _, book_id, year = LEGACY_PUT_BODY.unpack_from(body)
+        revision = modified = None
+        offset = LEGACY_PUT_BODY.size
+    else:
+        _, book_id, year, revision, modified = PUT_BODY.unpack_from(body)
+        offset = PUT_BODY.size
+    book = {"id": book_id}
+    for field in STRING_FIELDS:
+        (length,) = STRING_LENGTH.unpack_from(body, offset)
+        offset += STRING_LENGTH.size
+        book[field] = body[offset:offset + length].decode("utf-8")
+        offset += length
+    book["year"] = year
+    return "put", (book, revision, modified)
+
+
+def read_records(path):
+    """Yield (end offset, op, value) for every intact record in a log file
+
+    Stops at the first truncated or corrupt record, which is what a crash
+    in the middle of an append leaves behind.
+    """
+    try:
+        f = open(path, "rb")
+    except FileNotFoundError:
+        return
+    with f:
+        offset = 0
+        while True:
+            header = f.read(HEADER.size)
+            if len(header) < HEADER.size:
+                return
+            length, checksum = HEADER.unpack(header)
+            body = f.read(length)
+            if len(body) < length or zlib.crc32(body) != checksum:
+                return
+            offset += HEADER.size + length
+            op, value = decode_body(body)
+            yield offset, op, value
+
+
+class WriteAheadLog:
+    """Append-only mutation log with group commit
+
+    Appends go to an in-memory buffer. A background thread writes the
+    buffer and fsyncs it every `flush_interval` seconds, so one sequential
+    write and one fsync cover every mutation in that window. wait() blocks
+    until everything appended so far is durable. With a flush interval of
+    0 every append is written and fsynced before it returns.
+
+    rotate() starts a new segment, keeping the old one at `path` + ".prev"
+    until discard_previous() is called once a snapshot covers it. Replay
+    reads the previous segment, if any, before the current one.
+    """
+
+    def __init__(self, path, flush_interval=0.01):
+        self.path = path
+        self.previous_path = path + ".prev"
+        self.flush_interval = flush_interval
+        # Records appended to the current segment since the last rotation
+        self.segment_records = 0
+        self._cond = threading.Condition()
+        # Held while writing to or swapping the log file, so a rotation can
+        # never reorder a buffer the flusher has already taken
+        self._io = threading.Lock()
+        self._buffer = bytearray()
+        self._appended = 0
+        self._durable = 0
+        self._closed = False
+        self._file = None
+        self._thread = None
+
+    def replay(self, store):
+        """Apply the logged mutations to a store, then open the log for appends
+
+        A torn record at the end of the file is cut off so new appends start
+        from the last intact record.
+        """
+        count = 0
+        for _, op, value in read_records(self.previous_path):
+            self._apply(store, op, value)
+            count += 1
+        end = 0
+        for end, op, value in read_records(self.path):
+            self._apply(store, op, value)
+            count += 1
+        # Everything replayed is still waiting for a snapshot to cover it
+        self.segment_records = count
+
+        self._file = open(self.path, "ab")
+        if self._file.tell() != end:
+            self._file.truncate(end)
+            self._file.seek(end)
+        if self.flush_interval > 0:
+            self._thread = threading.Thread(target=self._flush_loop, name="wal-flusher", daemon=True)
+            self._thread.start()
+        atexit.register(self.close)
+        return count
+
+    def put(self, book, revision, modified):
+        self._append(encode_put(book, revision, modified))
+
+    @staticmethod
+    def _apply(store, op, value):
+        if op == "put":
+            store.put(*value)
+        else:
+            store.delete(value)
+
+    def delete(self, book_id):
+        self._append(encode_delete(book_id))
+
+    def wait(self):
+        """Block until every record appended so far has been fsynced"""
+        with self._cond:
+            target = self._appended
+            if self._thread is None:
+                return
+            while self._durable < target and not self._closed:
+                self._cond.wait()
+
+    def rotate(self):
+        """Make everything appended so far durable and start a new segment
+
+        Callers must stop mutations first (e.g. hold the store's write lock)
+        so the rotation point matches the state they snapshot. If a previous
+        segment is still waiting for its snapshot, the current segment keeps
+        growing instead, so replay may apply records the snapshot already
+        covers. That leaves the same state because every record carries a
+        whole book with its revision and modified time, or a delete.
+        """
+        with self._io, self._cond:
+            data = bytes(self._buffer)
+            self._buffer.clear()
+            self._write(data)
+            self._durable = self._appended
+            self._cond.notify_all()
+            if os.path.exists(self.previous_path):
+                return False
+            self._file.close()
+            os.replace(self.path, self.previous_path)
+            self._file = open(self.path, "ab")
+            self.segment_records = 0
+            return True
+
+    def discard_previous(self):
+        """Remove the previous segment once a snapshot includes its records"""
+        try:
+            os.remove(self.previous_path)
+        except FileNotFoundError:
+            pass
+
+    def close(self):
+        """Flush outstanding records and stop the background flusher"""
+        with self._cond:
+            if self._closed or self._file is None:
+                return
+            self._closed = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+        with self._io:
+            self._write(bytes(self._buffer))
+            self._file.close()
+
+    def _append(self, record):
+        with self._cond:
+            self._buffer += record
+            self._appended += 1
+            self.segment_records += 1
+            if self._thread is None:
+                self._write(bytes(self._buffer))
+                self._buffer.clear()
+                self._durable = self._appended
+
+    def _flush_loop(self):
+        while True:
+            with self._cond:
+                self._cond.wait(self.flush_interval)
+                if self._closed:
+                    return
+                if not self._buffer:
+                    continue
+            with self._io:
+                with self._cond:
+                    data = bytes(self._buffer)
+                    self._buffer.clear()
+                    target = self._appended
+                # Write outside the condition so appends keep flowing into
+                # the buffer
+                self._write(data)
+            with self._cond:
+                self._durable = max(self._durable, target)
+                self._cond.notify_all()
+
+    def _write(self, data):
+        if data:
+            self._file.write(data)
+            self._file.flush()
+            os.fsync(self._file.fileno())
@@ -1,79 +1,331 @@
 import json
 import base64
-from io import StringIO
+from io import BytesIO
+from itertools import chain
+import os
 import sys
-from urllib.parse import unquote_plus
+from urllib.parse import quote_plus, unquote_to_bytes
 
-from app import app
+# The Flask app (and with it all of Flask) is imported on first use rather
+# than at module import, keeping the handler module itself cheap to load
+_app = None
 
-def handler(event, context):
-    """
-    AWS Lambda handler that converts API Gateway events to Flask requests
-    """
-    
-    # Handle different event formats (API Gateway v1 vs v2)
-    if 'requestContext' in event and 'http' in event['requestContext']:
+def get_app():
+    """Import and return the Flask application on first use"""
+    global _app
+    if _app is None:
+        from app import app
+        _app = app
+    return _app
+
+# Non-text/* content types that are still safe to return as UTF-8 text
+TEXT_CONTENT_TYPES = (
+    'application/json',
+    'application/javascript',
+    'application/xml',
+    'application/x-ndjson',
+)
+
+def is_text_response(headers):
+    """Whether a response body can be passed to API Gateway as plain text"""
+    if headers.get('Content-Encoding', 'identity') != 'identity':
+        return False
+    mimetype = headers.get('Content-Type', '').split(';')[0].strip().lower()
+    return (
+        mimetype.startswith('text/')
+        or mimetype in TEXT_CONTENT_TYPES
+        or mimetype.endswith('+json')
+        or mimetype.endswith('+xml')
+    )
+
+# WSGI environ entries that are the same for every invocation; each
+# request starts from a copy of this template
+BASE_ENVIRON = {
+    'REQUEST_METHOD': 'GET',
+    'SCRIPT_NAME': '',
+    'PATH_INFO': '/',
+    'QUERY_STRING': '',
+    'CONTENT_TYPE': '',
+    'CONTENT_LENGTH': '0',
+    'SERVER_NAME': 'localhost',
+    'SERVER_PORT': '443',
+    'SERVER_PROTOCOL': 'HTTP/1.1',
+    'wsgi.version': (1, 0),
+    'wsgi.url_scheme': 'https',
+    'wsgi.errors': sys.stderr,
+    'wsgi.multithread': False,
+    'wsgi.multiprocess': False,
+    'wsgi.run_once': False,
+}
+
+# Header name -> environ key, filled in as header names are first seen.
+# Clients can send arbitrary names, so the table stops growing at a cap.
+HEADER_KEYS = {}
+MAX_HEADER_KEYS = 1024
+
+def header_key(name):
+    """Return the WSGI environ key for an HTTP header name"""
+    key = HEADER_KEYS.get(name)
+    if key is None:
+        key = name.upper().replace('-', '_')
+        if key not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+            key = 'HTTP_' + key
+        if len(HEADER_KEYS) < MAX_HEADER_KEYS:
+            HEADER_KEYS[name] = key
+    return key
+
+def is_v2_event(event):
+    """Whether an event uses the API Gateway v2 (HTTP API) payload format"""
+    return event.get('version') == '2.0' or 'http' in (event.get('requestContext') or {})
+
+# Query parameter name or value -> its form-encoded text, filled in as
+# strings are first seen and capped like HEADER_KEYS
+QUOTED = {}
+MAX_QUOTED = 4096
+
+def quote_component(text):
+    """Form-encode a query parameter name or value, as urlencode() does"""
+    quoted = QUOTED.get(text)
+    if quoted is None:
+        quoted = quote_plus(text)
+        if len(QUOTED) < MAX_QUOTED:
+            QUOTED[text] = quoted
+    return quoted
+
+def build_query_string(event):
+    """Return the raw query string of a v1 or v2 event"""
+    # v2 passes the query string through untouched, so use it as-is
+    raw = event.get('rawQueryString')
+    if raw is not None:
+        return raw
+    # v1 only has decoded parameters; re-encode them, keeping repeated keys
+    multi_value_params = event.get('multiValueQueryStringParameters')
+    if multi_value_params:
+        return '&'.join([
+            quote_component(name) + '=' + quote_component(value)
+            for name, values in multi_value_params.items()
+            for value in values
+        ])
+    params = event.get('queryStringParameters')
+    if params:
+        return '&'.join([
+            quote_component(name) + '=' + quote_component(value)
+            for name, value in params.items()
+        ])
+    return ''
+
+def build_environ(event):
+    """Translate an API Gateway (v1 or v2) event into a WSGI environ"""
+    if is_v2_event(event):
         # API Gateway v2 format
-        path = event['rawPath'] if 'rawPath' in event else '/'
+        path = event.get('rawPath', '/')
         method = event['requestContext']['http']['method']
-        headers = event.get('headers', {})
-        query_params = event.get('queryStringParameters') or {}
-        body = event.get('body', '')
     else:
         # API Gateway v1 format or other
         path = event.get('path', '/')
         method = event.get('httpMethod', 'GET')
-        headers = event.get('headers', {})
-        query_params = event.get('queryStringParameters') or {}
-        body = event.get('body', '')
+    body = event.get('body')
     
-    # Handle base64 encoded body
-    if event.get('isBase64Encoded', False) and body:
-        body = base64.b64decode(body).decode('utf-8')
+    # Keep the body as bytes: WSGI input is a byte stream, and the length
+    # has to be counted in bytes, not characters
+    if not body:
+        body = b''
+    elif event.get('isBase64Encoded', False):
+        body = base64.b64decode(body)
+    else:
+        body = body.encode('utf-8')
     
-    # Create WSGI environ
-    environ = {
-        'REQUEST_METHOD': method,
-        'SCRIPT_NAME': '',
-        'PATH_INFO': unquote_plus(path),
-        'QUERY_STRING': '&'.join([f"{k}={v}" for k, v in query_params.items()]) if query_params else '',
-        'CONTENT_TYPE': headers.get('content-type', ''),
-        'CONTENT_LENGTH': str(len(body)) if body else '0',
-        'SERVER_NAME': headers.get('host', 'localhost').split(':')[0],
-        'SERVER_PORT': '443',
-        'SERVER_PROTOCOL': 'HTTP/1.1',
-        'wsgi.version': (1, 0),
-        'wsgi.url_scheme': 'https',
-        'wsgi.input': StringIO(body),
-        'wsgi.errors': sys.stderr,
-        'wsgi.multithread': False,
-        'wsgi.multiprocess': False,
-        'wsgi.run_once': False,
-    }
+    environ = BASE_ENVIRON.copy()
+    multi_value_headers = event.get('multiValueHeaders')
+    if multi_value_headers:
+        # v1 repeats a header's values here; join them the way HTTP does
+        for name, values in multi_value_headers.items():
+            key = header_key(name)
+            environ[key] = ('; ' if key == 'HTTP_COOKIE' else ', ').join(values)
+    else:
+        for name, value in (event.get('headers') or {}).items():
+            environ[header_key(name)] = value
+    if event.get('cookies'):
+        # v2 strips Cookie headers out into their own list
+        environ['HTTP_COOKIE'] = '; '.join(event['cookies'])
     
-    # Add headers to environ
-    for key, value in headers.items():
-        key = key.upper().replace('-', '_')
-        if key not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
-            environ[f'HTTP_{key}'] = value
+    environ['REQUEST_METHOD'] = method
+    # PEP 3333: PATH_INFO holds the decoded bytes as a latin-1 string, and
+    # '+' is a literal plus in a path
+    environ['PATH_INFO'] = unquote_to_bytes(path).decode('latin-1')
+    environ['QUERY_STRING'] = build_query_string(event)
+    environ['CONTENT_LENGTH'] = str(len(body))
+    environ['SERVER_NAME'] = environ.get('HTTP_HOST', 'localhost').split(':')[0]
+    environ['wsgi.input'] = BytesIO(body)
+    return environ
+
+# Functions run once per container by init_container(), after the app is
+# imported; register more with register_init_hook()
+INIT_HOOKS = []
+_initialized = False
+
+def register_init_hook(hook):
+    """Run `hook(app)` once per container during init_container()"""
+    INIT_HOOKS.append(hook)
+    return hook
+
+@register_init_hook
+def load_catalog(app):
+    """Load the catalog snapshot named by CATALOG_SNAPSHOT, if any
+
+    Ignored unless the catalog lives in memory, since a persistent backend
+    already holds the current catalog.
+    """
+    path = os.environ.get('CATALOG_SNAPSHOT')
+    if path and app.config['STORAGE_BACKEND'] != 'memory':
+        print(f"Ignoring CATALOG_SNAPSHOT={path} with the {app.config['STORAGE_BACKEND']} backend")
+    elif path:
+        from app import load_catalog_snapshot
+        print(f"Loaded {load_catalog_snapshot(path)} books from {path}")
+
+def init_container():
+    """Prepare warm state shared by every invocation in this container
+
+    Pushes one app context that all requests reuse (so nothing may rely on
+    `g` being reset between requests), runs the init hooks, and sends a
+    warm-up request through the handler so routing, the JSON provider and
+    the response classes are ready before the first real event.
+    """
+    global _initialized
+    if _initialized:
+        return
+
+    app = get_app()
+    app.app_context().push()
+    for hook in INIT_HOOKS:
+        hook(app)
+    _initialized = True
+    handler({'httpMethod': 'GET', 'path': '/health', 'headers': {}}, None)
+
+def build_response(event, status, headers, body):
+    """Translate a WSGI status, header list and body into an API Gateway response"""
+    # Binary and compressed bodies travel base64-encoded; text is decoded
+    # only at this boundary
+    single_headers = dict(headers)
+    is_base64 = not is_text_response(single_headers)
+    if not is_base64:
+        try:
+            body = body.decode('utf-8')
+        except UnicodeDecodeError:
+            is_base64 = True
+    if is_base64:
+        body = base64.b64encode(body).decode('ascii')
+
+    response = {
+        'statusCode': status,
+        'body': body,
+        'isBase64Encoded': is_base64
+    }
+
+    # Repeated headers (Set-Cookie above all) would collapse in a plain dict
+    grouped = {}
+    for name, value in headers:
+        grouped.setdefault(name, []).append(value)
+    repeated = {name: values for name, values in grouped.items() if len(values) > 1}
+
+    if is_v2_event(event):
+        cookies = grouped.pop('Set-Cookie', None)
+        if cookies:
+            response['cookies'] = cookies
+        response['headers'] = {name: ', '.join(values) for name, values in grouped.items()}
+    else:
+        response['headers'] = {name: values[0] for name, values in grouped.items() if len(values) == 1}
+        if repeated:
+            response['multiValueHeaders'] = repeated
+    return response
+
+def handler(event, context):
+    """
+    AWS Lambda handler that converts API Gateway events to Flask requests
+    """
+    if not _initialized:
+        init_container()
+    environ = build_environ(event)
     
     # Capture response
     response_data = {}
     
     def start_response(status, response_headers, exc_info=None):
         response_data['status'] = int(status.split(' ')[0])
-        response_data['headers'] = dict(response_headers)
+        response_data['headers'] = response_headers
         return lambda x: None
     
-    # Call Flask app
-    with app.app_context():
-        response = app.wsgi_app(environ, start_response)
-        response_body = b''.join(response).decode('utf-8')
+    # Call Flask app; the request context reuses the container's app context
+    response = _app.wsgi_app(environ, start_response)
+    try:
+        response_body = b''.join(response)
+    finally:
+        if hasattr(response, 'close'):
+            response.close()
     
     # Return API Gateway response format
-    return {
-        'statusCode': response_data.get('status', 200),
-        'headers': response_data.get('headers', {}),
-        'body': response_body,
-        'isBase64Encoded': False
-    }
\ No newline at end of file
+    return build_response(
+        event,
+        response_data.get('status', 200),
+        response_data.get('headers', []),
+        response_body
+    )
+
+# Lambda response streaming: a JSON metadata prelude, eight NUL bytes, then
+# the raw body. Small body pieces are coalesced up to STREAM_CHUNK_SIZE.
+STREAM_DELIMITER = b'\x00' * 8
+STREAM_CHUNK_SIZE = 32 * 1024
+
+def stream_handler(event, context):
+    """
+    Response-streaming variant of handler: yields the metadata prelude and
+    then body chunks as the Flask response iterator produces them, so time
+    to first byte does not depend on the size of the response
+    """
+    if not _initialized:
+        init_container()
+    environ = build_environ(event)
+    
+    response_data = {}
+    
+    def start_response(status, response_headers, exc_info=None):
+        response_data['status'] = int(status.split(' ')[0])
+        response_data['headers'] = response_headers
+        return lambda x: None
+    
+    response = _app.wsgi_app(environ, start_response)
+    try:
+        chunks = iter(response)
+        # Some WSGI apps only call start_response once iteration begins
+        first = next(chunks, b'')
+        
+        headers = {}
+        cookies = []
+        for name, value in response_data.get('headers', []):
+            if name.lower() == 'set-cookie':
+                cookies.append(value)
+            elif name in headers:
+                headers[name] += ', ' + value
+            else:
+                headers[name] = value
+        metadata = {'statusCode': response_data.get('status', 200), 'headers': headers}
+        if cookies:
+            metadata['cookies'] = cookies
+        yield json.dumps(metadata).encode('utf-8') + STREAM_DELIMITER
+        
+        buffer = bytearray()
+        for chunk in chain((first,), chunks):
+            buffer += chunk
+            if len(buffer) >= STREAM_CHUNK_SIZE:
+                yield bytes(buffer)
+                buffer.clear()
+        if buffer:
+            yield bytes(buffer)
+    finally:
+        if hasattr(response, 'close'):
+            response.close()
+
+# On Lambda, do the container setup during the init phase rather than in
+# the first invocation
+if 'AWS_LAMBDA_FUNCTION_NAME' in os.environ:
+    init_container()